@@ -1,34 +1,207 @@
-from fastapi import APIRouter, HTTPException
-from data_base import CustomMovieRepository, RatingRepository
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from email.utils import formatdate, parsedate_to_datetime
+from pydantic import BaseModel
+from typing import List, Optional
+from posters import PLACEHOLDER_URL
+from recommender import recommender
+from storage import CustomMovieRepository, RatingRepository, run_io
+from tmdb_client import atmdb
+import json
 import requests
 import os
+import threading
 
 router = APIRouter(prefix="/api")
 
-TMDB_API_KEY = "41d18781051e38c1a3a35fa10bfbc9b2"
-TMDB_BASE_URL = "https://api.themoviedb.org/3"
+DEFAULT_POSTER = PLACEHOLDER_URL   # las plantillas lo cambian por el cartel con el título
+MAX_BULK = 10000            # películas por petición en las operaciones masivas
+MAX_PAGE = 1000             # límite máximo de ?limit= en /api/movies
+STREAM_BATCH = 500          # películas leídas del repositorio por lote al hacer streaming
+BODY_CACHE_MAX = 256        # respuestas serializadas por versión del catálogo
+MAX_BATCH = 100             # ids por petición en /api/movies/batch
+CUSTOM_PREFIX = "custom:"   # en /api/movies/batch: id de película propia, no de TMDB
+MAX_TOP = 100               # límite máximo de ?limit= en /api/movies/top
+
+
+# ============================
+# HTTP CACHING (ETag / 304)
+# ============================
+_body_cache = {}            # clave -> JSON serializado de la versión _body_cache_etag
+_body_cache_etag = None
+_body_cache_lock = threading.Lock()
+
+
+def cache_headers(version):
+    return {
+        "ETag": version["etag"],
+        "Last-Modified": formatdate(version["last_modified"], usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+
+
+def not_modified(request: Request, etag, last_modified):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [t.strip() for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return last_modified <= since
+
+    return False
+
+
+def cached_json(request: Request, key, build):
+    """
+    Respuesta JSON ligada a la versión del catálogo de películas propias:
+    ETag + Last-Modified y el cuerpo serializado se reutiliza mientras la
+    versión no cambie. El 304 solo se da cuando hay cuerpo (en la cache o
+    recién construido): si build() lanza un 404, el cliente recibe el 404
+    aunque su ETag sea el actual o mande If-None-Match: *.
+    """
+    global _body_cache_etag
+
+    version = CustomMovieRepository.version()
+    etag = version["etag"]
+    headers = cache_headers(version)
+
+    with _body_cache_lock:
+        if _body_cache_etag != etag:
+            _body_cache.clear()
+            _body_cache_etag = etag
+        body = _body_cache.get(key)
+
+    if body is None:
+        body = json.dumps(build(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        with _body_cache_lock:
+            if _body_cache_etag == etag:
+                # Cada cursor de paginación es una clave: se acota el número
+                if len(_body_cache) >= BODY_CACHE_MAX:
+                    _body_cache.clear()
+                _body_cache[key] = body
+
+    if not_modified(request, etag, version["last_modified"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 # ============================
 # GET ALL CUSTOM MOVIES
 # ============================
+def iter_movies(after=0, limit=None):
+    """
+    Recorre el catálogo por cursor (id > after) en lotes de STREAM_BATCH.
+    Cada lote es una consulta nueva, así que nunca hay más de un lote en memoria.
+    """
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = STREAM_BATCH if remaining is None else min(STREAM_BATCH, remaining)
+        batch = CustomMovieRepository.page_movies(after, size)
+        yield from batch
+        if len(batch) < size:
+            return
+        after = batch[-1]["id"]
+        if remaining is not None:
+            remaining -= len(batch)
+
+
+def ndjson_lines(movies):
+    for movie in movies:
+        yield json.dumps(movie, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
 @router.get("/movies")
-def get_movies():
-    return {"movies": CustomMovieRepository.load_movies()}
+def get_movies(request: Request,
+               after: int = 0,
+               limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE),
+               format: str = "json"):
+    """
+    Sin parámetros: el catálogo completo. Con ?after=<id>&limit=n: una página
+    ordenada por id y el cursor de la siguiente (next_after, null al final).
+    Con ?format=ndjson: una película por línea, generada en streaming. Ese
+    cuerpo se lee por lotes mientras se envía y puede mezclar versiones del
+    catálogo, así que va sin ETag ni Last-Modified (y nunca da 304).
+    """
+    if format == "ndjson":
+        return StreamingResponse(ndjson_lines(iter_movies(after, limit)),
+                                 media_type="application/x-ndjson", headers={"Cache-Control": "no-cache"})
+
+    if limit is None and not after:
+        return cached_json(request, "movies", lambda: {"movies": CustomMovieRepository.load_movies()})
+
+    def build():
+        page = CustomMovieRepository.page_movies(after, limit or MAX_PAGE)
+        full = len(page) == (limit or MAX_PAGE)
+        return {"movies": page, "next_after": page[-1]["id"] if full else None}
+
+    return cached_json(request, ("page", after, limit), build)
+
+
+# ============================
+# MULTI-GET (TMDB + PROPIAS)
+# ============================
+def parse_batch_ids(ids):
+    """"550,custom:100001" -> [(False, 550), (True, 100001)], sin repetidos."""
+    wanted = []
+    for token in ids.split(","):
+        token = token.strip()
+        if token:
+            custom = token.startswith(CUSTOM_PREFIX)
+            wanted.append((custom, int(token[len(CUSTOM_PREFIX):] if custom else token)))
+    return list(dict.fromkeys(wanted))
+
+
+@router.get("/movies/batch")
+async def get_movies_batch(ids: str):
+    """
+    ?ids=550,603,custom:100001 -> películas en el orden pedido (sin repetidos).
+    Propias y de TMDB comparten ids, así que las propias llevan el prefijo
+    "custom:" y salen del repositorio (con "custom": true); las de TMDB se
+    piden en paralelo y, si otra petición ya está pidiendo el mismo id, se
+    comparte la respuesta. "missing" devuelve los ids tal como se pidieron.
+    """
+    try:
+        wanted = parse_batch_ids(ids)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers (custom:<id> for own movies)")
+    if len(wanted) > MAX_BATCH:
+        raise HTTPException(status_code=413, detail=f"Maximum {MAX_BATCH} ids per request")
+
+    def custom_movies():
+        return {(True, mid): {**m, "custom": True} for custom, mid in wanted
+                if custom and (m := CustomMovieRepository.get_movie(mid)) is not None}
+
+    found = await run_io(custom_movies)
+    tmdb_found = await atmdb.movies([mid for custom, mid in wanted if not custom])
+    found.update(((False, mid), m) for mid, m in tmdb_found.items())
+
+    return {
+        "movies": [found[key] for key in wanted if found.get(key)],
+        "missing": [f"{CUSTOM_PREFIX}{mid}" if custom else mid for custom, mid in wanted
+                    if not found.get((custom, mid))],
+    }
 
 
 # ============================
 # GET MOVIE BY ID
 # ============================
 @router.get("/movie/{movie_id}")
-def get_movie(movie_id: int):
-    movies = CustomMovieRepository.load_movies()
-    movie = next((m for m in movies if m["id"] == movie_id), None)
+def get_movie(request: Request, movie_id: int):
+    def build():
+        movie = CustomMovieRepository.get_movie(movie_id)
 
-    if movie is None:
-        raise HTTPException(status_code=404, detail="Movie not found")
+        if movie is None:
+            raise HTTPException(status_code=404, detail="Movie not found")
+
+        return movie
 
-    return movie
+    return cached_json(request, ("movie", movie_id), build)
 
 
 # ============================
@@ -36,7 +209,7 @@ def get_movie(movie_id: int):
 # ============================
 @router.post("/movie/add")
 def add_movie(title: str, description: str, poster: str = None):
-    poster = poster or "https://via.placeholder.com/300x450?text=No+Image"
+    poster = poster or DEFAULT_POSTER
     new_id = CustomMovieRepository.add_movie(title, description, poster)
 
     return {"message": "created", "id": new_id}
@@ -54,6 +227,52 @@ def delete_movie(movie_id: int):
     return {"message": "deleted", "id": movie_id}
 
 
+# ============================
+# BULK ADD / DELETE
+# ============================
+class NewMovie(BaseModel):
+    title: str
+    description: str
+    poster: Optional[str] = None
+
+
+class BulkAdd(BaseModel):
+    movies: List[NewMovie]
+
+
+class BulkDelete(BaseModel):
+    ids: List[int]
+
+
+def check_bulk_size(n):
+    if n > MAX_BULK:
+        raise HTTPException(status_code=413, detail=f"Maximum {MAX_BULK} movies per request")
+
+
+@router.post("/movies/bulk")
+def add_movies_bulk(body: BulkAdd):
+    """Alta de muchas películas con una sola escritura."""
+    check_bulk_size(len(body.movies))
+    ids = CustomMovieRepository.add_movies([
+        {"title": m.title, "description": m.description, "poster": m.poster or DEFAULT_POSTER}
+        for m in body.movies
+    ])
+    return {"message": "created", "ids": ids}
+
+
+@router.delete("/movies/bulk")
+def delete_movies_bulk(body: BulkDelete):
+    """Borrado de muchas películas con una sola escritura; informa de las que no existían."""
+    check_bulk_size(len(body.ids))
+    deleted = CustomMovieRepository.delete_movies(body.ids)
+    found = set(deleted)
+    return {
+        "message": "deleted",
+        "ids": deleted,
+        "missing": [mid for mid in dict.fromkeys(body.ids) if mid not in found],
+    }
+
+
 # ============================
 # LIKE / DISLIKE MOVIE
 # ============================
@@ -68,27 +287,47 @@ def rate_movie(movie_id: int, user: str, rating: int):
         raise HTTPException(status_code=400, detail="Invalid rating")
 
     RatingRepository.rate_movie(user, movie_id, rating)
+    if rating > 0:
+        recommender.add(user, movie_id, "rating")
+    else:
+        recommender.remove(user, movie_id, "rating")
 
     return {"message": "rating updated"}
 
 
+# ============================
+# TOP RATED
+# ============================
+@router.get("/movies/top")
+def get_top_movies(limit: int = Query(10, ge=1, le=MAX_TOP)):
+    """
+    Películas mejor valoradas por la cota inferior de Wilson (likes frente a
+    dislikes): sale del ranking que se mantiene al valorar, no se ordena nada.
+    """
+    return {"movies": RatingRepository.top_movies(limit)}
+
+
+@router.get("/movie/{movie_id}/rating")
+def get_movie_rating(movie_id: int):
+    return RatingRepository.movie_stats(movie_id)
+
+
 # ============================
 # GET TRAILER VIA TMDB
 # ============================
 @router.get("/movie/{movie_id}/trailer")
-def get_trailer(movie_id: int):
-    r = requests.get(
-        f"{TMDB_BASE_URL}/movie/{movie_id}/videos",
-        params={"api_key": TMDB_API_KEY, "language": "es-ES"}
-    ).json()
-
-    videos = r.get("results", [])
-    trailers = [v for v in videos if v["type"] == "Trailer" and v["site"] == "YouTube"]
+async def get_trailer(movie_id: int):
+    # Misma entrada de cache que la página de detalle (append_to_response)
+    try:
+        youtube_key = (await atmdb.movie_details(movie_id))["trailer_key"]
+    except requests.HTTPError:
+        raise HTTPException(status_code=404, detail="Trailer not found")
+    except requests.RequestException:
+        raise HTTPException(status_code=503, detail="TMDB unavailable")
 
-    if not trailers:
+    if not youtube_key:
         raise HTTPException(status_code=404, detail="Trailer not found")
 
-    youtube_key = trailers[0]["key"]
     youtube_url = f"https://www.youtube.com/embed/{youtube_key}"
 
     return {"trailer_url": youtube_url}
@@ -1,27 +1,53 @@
 from fastapi import FastAPI, Request, Form, HTTPException
-from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
-from fastapi.staticfiles import StaticFiles
-from starlette.middleware.sessions import SessionMiddleware
+from fastapi.responses import PlainTextResponse, RedirectResponse
 import os, json, csv, requests
+from itertools import islice
+
+import metrics
+from api import router as api_router
+from catalog import Catalog
+from data_base import TitleRepository
+from fragments import FragmentCache, bytecode_cache, data_version
+from likes_index import LikesIndex
+from posters import poster_cache, poster_url, router as posters_router
+from recommender import recommender, signals_from
+from sessions import ServerSessionMiddleware, session_store
+from static_assets import StaticAssets
+from storage import RatingRepository, UserRepository, run_io
+from tmdb_client import DEFAULT_LANGUAGE, atmdb, tmdb
 
 # -----------------------------------------------------------------------------------
 # CONFIGURACIÓN
 # -----------------------------------------------------------------------------------
 
 app = FastAPI()
-app.add_middleware(SessionMiddleware, secret_key="supersecretkey")
+app.add_middleware(ServerSessionMiddleware, store=session_store)   # la cookie solo lleva el id
+app.add_middleware(metrics.MetricsMiddleware)   # tiempos por ruta: ver /admin/metrics
 
-templates = Jinja2Templates(directory="templates")
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# /static: nombres con hash y variantes .gz/.br (ver static_assets.py build)
+static_assets = StaticAssets()
+app.mount("/static", static_assets, name="static")
 
-TMDB_API_KEY = "41d18781051e38c1a3a35fa10bfbc9b2"
-TMDB_BASE_URL = "https://api.themoviedb.org/3"
+templates = metrics.TimedTemplates(directory="templates", bytecode_cache=bytecode_cache())
+templates.env.globals["poster_url"] = poster_url
+templates.env.globals["static_url"] = static_assets.url
+fragments = FragmentCache(templates)     # rejilla y ficha de película, comunes a todos los usuarios
+app.include_router(api_router)
+app.include_router(posters_router)     # /posters/{size}/{path}: pósters de TMDB servidos desde disco
 
 DATA_FILE = os.path.join("data", "users.csv")
 CUSTOM_MOVIES_FILE = os.path.join("data", "custom_movies.json")
 LIKES_FILE = os.path.join("data", "likes.json")
 
+ADMIN_PAGE_SIZE = 50
+RECOMMENDATIONS = 8
+# Campos que usa _movie_detail.html: la ficha cacheada cambia solo si cambian ellos
+DETAIL_FIELDS = ("id", "title", "poster_path", "poster", "genres", "overview", "trailer_key")
+PREFETCH_PREVIOUS_PAGE = True
+
+# Catálogo local generado con `python catalog.py ingest` (None si no existe)
+local_catalog = Catalog.open()
+
 os.makedirs("data", exist_ok=True)
 
 # -----------------------------------------------------------------------------------
@@ -41,42 +67,54 @@ def require_user(request: Request):
 # USUARIOS
 # -----------------------------------------------------------------------------------
 
+# Búsquedas contra un índice en memoria (data_base.UserIndex) que solo relee el CSV si cambia
 def load_users():
-    if not os.path.exists(DATA_FILE):
-        return []
-    with open(DATA_FILE, encoding="utf-8") as f:
-        return list(csv.DictReader(f))
+    return UserRepository.load_users()
 
 def save_user(username, email, password):
-    exists = os.path.exists(DATA_FILE)
-    with open(DATA_FILE, "a", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=["username", "email", "password"])
-        if not exists:
-            writer.writeheader()
-        writer.writerow({"username": username, "email": email, "password": password})
+    UserRepository.save_user(username, email, password)
 
 def validate_login(identifier, password):
-    for u in load_users():
-        if (u["username"] == identifier or u["email"] == identifier) and u["password"] == password:
-            return u["username"]   # 👈 SIEMPRE USERNAME
-    return None
+    return UserRepository.authenticate(identifier, password)   # 👈 SIEMPRE USERNAME
 
 def user_exists(username, email):
-    return any(u["username"] == username or u["email"] == email for u in load_users())
+    return UserRepository.user_exists(username, email)
 
 # -----------------------------------------------------------------------------------
 # LIKES
 # -----------------------------------------------------------------------------------
 
+# Snapshot en likes.json + log append-only en likes.log (ver event_log.py).
+# El índice en memoria se construye al arrancar y se mantiene en cada like.
+likes_index = LikesIndex(LIKES_FILE)
+likes_index.refresh()
+
 def load_likes():
-    if not os.path.exists(LIKES_FILE):
-        return {}
-    with open(LIKES_FILE, encoding="utf-8") as f:
-        return json.load(f)
+    return likes_index.as_dict()
+
+# Vecinos item-item precalculados a partir de likes y valoraciones positivas;
+# cada like/unlike/valoración posterior los actualiza de forma incremental.
+recommender.build(signals_from(load_likes(), RatingRepository.load_ratings()))
+
+# -----------------------------------------------------------------------------------
+# TÍTULOS
+# -----------------------------------------------------------------------------------
 
-def save_likes(data):
-    with open(LIKES_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+def movie_titles(movie_ids):
+    # Cache local primero, TMDB en paralelo solo para los que faltan
+    movie_ids = set(movie_ids)
+    titles = TitleRepository.get_titles(movie_ids)
+    missing = movie_ids - titles.keys()
+    if missing:
+        fetched = {mid: t for mid, t in tmdb.titles(missing).items() if t}
+        TitleRepository.save_titles(fetched)
+        titles.update(fetched)
+    return titles
+
+async def remember_titles(movie_ids):
+    # Como movie_titles, pero por atmdb y sin bloquear hilos (tarea de fondo)
+    movies = await atmdb.movies(movie_ids)
+    await run_io(TitleRepository.save_titles, {mid: m["title"] for mid, m in movies.items() if m and m.get("title")})
 
 # -----------------------------------------------------------------------------------
 # ROOT / AUTH
@@ -134,37 +172,73 @@ def logout(request: Request):
 # DASHBOARD
 # -----------------------------------------------------------------------------------
 
+def prefetch_neighbours(query, page, total_pages):
+    # Solo lanza tareas de fondo (fuera de las métricas de la ruta), no espera a
+    # TMDB. Va por atmdb: comparte el single-flight con las peticiones del dashboard
+    if page < total_pages:
+        atmdb.prefetch_page(page + 1, query)
+    if PREFETCH_PREVIOUS_PAGE and page > 1:
+        atmdb.prefetch_page(page - 1, query)
+
+def fill_posters(movies):
+    """
+    El catálogo local no siempre trae cartel: se toma de las fichas de TMDB
+    que ya estén en cache. Devuelve los ids que siguen sin él.
+    """
+    missing = [m["id"] for m in movies if not m.get("poster_path") and not m.get("custom")]
+    found = tmdb.cached_poster_paths(missing)
+    for m in movies:
+        if m["id"] in found:
+            m["poster_path"] = found[m["id"]]
+    return [mid for mid in missing if mid not in found]
+
+def prefetch_posters(movie_ids):
+    # En segundo plano: las fichas que falten quedan en cache para la próxima visita
+    for mid in movie_ids:
+        atmdb.prefetch_movie(mid)
+
+# Handlers async: mientras se espera a TMDB no se ocupa ningún hilo del
+# threadpool; los ficheros y el catálogo se leen en el pool de storage.run_io.
 @app.get("/dashboard")
-def dashboard(request: Request, page: int = 1, query: str = ""):
+async def dashboard(request: Request, page: int = 1, query: str = ""):
     user = require_user(request)
     if not user:
         return RedirectResponse("/login", status_code=302)
 
-    params = {
-        "api_key": TMDB_API_KEY,
-        "language": "es-ES",
-        "page": page
-    }
-
-    if query:
-        params["query"] = query
-        movies = requests.get(f"{TMDB_BASE_URL}/search/movie", params=params).json()["results"]
-    else:
-        movies = requests.get(f"{TMDB_BASE_URL}/discover/movie", params=params).json()["results"]
-
-    likes = load_likes()
-    likes_map = {str(m["id"]): sum(m["id"] in v for v in likes.values()) for m in movies}
+    flash = pop_flash(request)
+    local = None
+    try:
+        if query:
+            # Primero el catálogo local; TMDB solo si no hay ningún resultado
+            local = await run_io(local_catalog.search, query, page) if local_catalog else None
+            if local and local["total_results"]:
+                data = local
+                prefetch_posters(fill_posters(data["results"]))
+            else:
+                data = await atmdb.search(query, page=page)
+                prefetch_neighbours(query, page, data.get("total_pages", 0))
+        else:
+            data = await atmdb.discover(page=page)
+            prefetch_neighbours("", page, data.get("total_pages", 0))
+    except requests.RequestException:
+        # TMDB caído o limitado y nada en cache: página vacía (o lo que haya en local) con aviso
+        data = local or {"results": []}
+        flash = {"message": "TMDB no responde ahora mismo, prueba de nuevo en unos segundos", "category": "error"}
+    movies = data.get("results") or []
+
+    # La rejilla se renderiza una vez por página de resultados; los likes se pegan aparte
+    grid = fragments.get("_movie_grid.html", (DEFAULT_LANGUAGE, data_version(movies)), movies_api=movies)
+    counts = await run_io(likes_index.counts, grid.movie_ids)
 
     return templates.TemplateResponse("dashboard.html", {
         "request": request,
-        "movies_api": movies,
+        "grid": grid.fill(counts),
         "page": page,
         "prev_page": page - 1 if page > 1 else None,
         "next_page": page + 1,
         "query": query,
         "user": user,
-        "flash": pop_flash(request),
-        "likes_map": likes_map
+        "flash": flash,
     })
 
 # -----------------------------------------------------------------------------------
@@ -172,28 +246,62 @@ def dashboard(request: Request, page: int = 1, query: str = ""):
 # -----------------------------------------------------------------------------------
 
 @app.get("/movie/{movie_id}")
-def movie_detail(request: Request, movie_id: int):
+async def movie_detail(request: Request, movie_id: int):
     user = require_user(request)
     if not user:
         return RedirectResponse("/login", status_code=302)
 
-    movie = requests.get(
-        f"{TMDB_BASE_URL}/movie/{movie_id}",
-        params={"api_key": TMDB_API_KEY, "language": "es-ES"}
-    ).json()
+    # Detalle, vídeos y similares en una sola petición a TMDB (cero si está en cache)
+    try:
+        movie = await atmdb.movie_details(movie_id)
+    except requests.HTTPError:
+        raise HTTPException(status_code=404, detail="Movie not found")
+    except requests.RequestException:
+        raise HTTPException(status_code=503, detail="TMDB unavailable")
+
+    shown = {k: movie.get(k) for k in DETAIL_FIELDS}
+    detail = fragments.get("_movie_detail.html", (DEFAULT_LANGUAGE, movie_id, data_version(shown)),
+                           movie=movie, movie_id=movie_id, trailer_key=movie["trailer_key"])
+    likes = await run_io(likes_index.count, movie_id)
+    recommendations, missing = await run_io(build_recommendations, movie_id, movie)
 
-    likes = sum(movie_id in v for v in load_likes().values())
+    # Títulos desconocidos: se piden en segundo plano y salen en la próxima visita
+    if missing:
+        atmdb.spawn(remember_titles(missing))
 
     return templates.TemplateResponse("movie.html", {
         "request": request,
         "movie": movie,
-        "recommendations": [],
-        "likes": likes,
+        "detail": detail.fill({movie_id: likes}),
+        "recommendations": recommendations,
         "user": user,
         "flash": pop_flash(request),
-        "trailer_key": None
     })
 
+def build_recommendations(movie_id, movie):
+    """
+    Vecinos del recomendador local con título ya conocido (cache de títulos o
+    la lista "similar" que trae la propia respuesta); si no hay ninguno, las
+    similares de TMDB. Devuelve también los ids locales sin título.
+    """
+    tmdb_similar = {m["id"]: m for m in (movie.get("similar") or {}).get("results", [])}
+    local = [mid for mid, _ in recommender.similar(movie_id, RECOMMENDATIONS)]
+    titles = TitleRepository.get_titles(local)
+    posters = tmdb.cached_poster_paths(mid for mid in local if mid not in tmdb_similar)
+
+    recommendations, missing = [], set()
+    for mid in local:
+        if mid in tmdb_similar:
+            recommendations.append(tmdb_similar[mid])
+        elif mid in titles:
+            recommendations.append({"id": mid, "title": titles[mid], "poster_path": posters.get(mid)})
+        else:
+            missing.add(mid)
+
+    if not recommendations:
+        recommendations = list(tmdb_similar.values())[:RECOMMENDATIONS]
+    return recommendations, missing
+
 # -----------------------------------------------------------------------------------
 # LIKE API
 # -----------------------------------------------------------------------------------
@@ -204,13 +312,8 @@ def like_movie(request: Request, movie_id: int):
     if not user:
         raise HTTPException(status_code=401)
 
-    likes = load_likes()
-    likes.setdefault(user, [])
-
-    if movie_id not in likes[user]:
-        likes[user].append(movie_id)
-
-    save_likes(likes)
+    if likes_index.like(user, movie_id):
+        recommender.add(user, movie_id)
     return {"status": "ok"}
 
 # -----------------------------------------------------------------------------------
@@ -218,41 +321,74 @@ def like_movie(request: Request, movie_id: int):
 # -----------------------------------------------------------------------------------
 
 @app.get("/admin")
-def admin_panel(request: Request):
+def admin_panel(request: Request, page: int = 1):
     user = require_user(request)
     if user != "admin":
         set_flash(request, "Acceso denegado", "error")
         return RedirectResponse("/login", status_code=302)
 
     likes = load_likes()
-    rows = []
+    total = sum(len(ids) for ids in likes.values())
+    pages = max(1, -(-total // ADMIN_PAGE_SIZE))
+    page = min(max(page, 1), pages)
 
-    for u, ids in likes.items():
-        for mid in ids:
-            r = requests.get(
-                f"{TMDB_BASE_URL}/movie/{mid}",
-                params={"api_key": TMDB_API_KEY, "language": "es-ES"}
-            )
-            title = r.json().get("title", f"ID {mid}") if r.status_code == 200 else f"ID {mid}"
-            rows.append({"user": u, "movie_id": mid, "title": title})
+    # Solo se materializan las filas de la página pedida
+    start = (page - 1) * ADMIN_PAGE_SIZE
+    pairs = list(islice(
+        ((u, mid) for u, ids in likes.items() for mid in ids),
+        start, start + ADMIN_PAGE_SIZE
+    ))
+
+    titles = movie_titles(mid for _, mid in pairs)
+
+    rows = [
+        {"user": u, "movie_id": mid, "title": titles.get(mid, f"ID {mid}")}
+        for u, mid in pairs
+    ]
 
     return templates.TemplateResponse("admin.html", {
         "request": request,
         "user": user,
         "likes_list": rows,
+        "page": page,
+        "prev_page": page - 1 if page > 1 else None,
+        "next_page": page + 1 if page < pages else None,
+        "total_pages": pages,
+        "total_likes": total,
+        "route_metrics": metrics.registry.snapshot()["routes"],
         "flash": pop_flash(request)
     })
 
+@app.get("/admin/cache-stats")
+def cache_stats(request: Request):
+    if require_user(request) != "admin":
+        raise HTTPException(status_code=403)
+    return tmdb.stats()
+
+@app.get("/admin/metrics")
+def route_metrics(request: Request, format: str = "json"):
+    if require_user(request) != "admin":
+        raise HTTPException(status_code=403)
+
+    if format == "prometheus":
+        return PlainTextResponse(metrics.registry.prometheus(),
+                                 media_type="text/plain; version=0.0.4")
+
+    data = metrics.registry.snapshot()
+    data["fragments"] = fragments.stats()
+    data["posters"] = dict(poster_cache.stats)
+    if metrics.profiler is not None:
+        data["slowest"] = metrics.profiler.slowest()
+    return data
+
 @app.post("/admin/delete-like/{username}/{movie_id}")
 def delete_like(request: Request, username: str, movie_id: int):
     user = require_user(request)
     if user != "admin":
         return RedirectResponse("/login", status_code=302)
 
-    likes = load_likes()
-    if username in likes and movie_id in likes[username]:
-        likes[username].remove(movie_id)
-        save_likes(likes)
+    if likes_index.unlike(username, movie_id):
+        recommender.remove(username, movie_id)
         set_flash(request, "Like eliminado", "success")
 
     return RedirectResponse("/admin", status_code=302)
@@ -0,0 +1,133 @@
+"""
+Throughput del dashboard async frente a la latencia de TMDB.
+
+    python -m benchmarks.async_dashboard --latencies 100,300,1000 --concurrency 200
+
+Cada petición es una búsqueda distinta (fallo de cache: siempre va a TMDB).
+Con handlers síncronos el máximo sería THREADPOOL_TOKENS / latencia (un hilo
+ocupado por petición mientras espera); con handlers async el límite es la
+concurrencia del cliente y --tmdb-concurrency (CINE_TMDB_CONCURRENCY en la app).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import sys
+import time
+
+import httpx
+
+from benchmarks.fake_tmdb import start_fake_tmdb
+from benchmarks.run import Recorder, prepare_workspace, start_app, summarize
+
+DEFAULT_OUTPUT = "bench_async_dashboard.json"
+THREADPOOL_TOKENS = 40      # hilos por defecto de anyio para handlers síncronos
+ROUTE = "GET /dashboard"
+
+
+async def _searches(client, rec, i, prefix, args):
+    for k in range(args.per_user):
+        started = time.perf_counter()
+        try:
+            r = await client.get(f"/dashboard?query={prefix}q{i}x{k}")
+            failed = r.status_code != 200
+        except httpx.HTTPError:
+            failed = True
+        rec.latencies[ROUTE].append(time.perf_counter() - started)
+        if failed:
+            rec.errors[ROUTE] += 1
+
+
+async def _run_users(base_url, latency_ms, args):
+    """
+    Usuarios virtuales con un cliente async (200 hilos de requests competirían
+    por la CPU con el propio servidor). Primero todos hacen login y solo
+    después se mide la tanda de búsquedas.
+    """
+    rec = Recorder(base_url)
+    prefix = f"l{latency_ms:g}"
+    limits = httpx.Limits(max_connections=None)
+    clients = [httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60)
+               for _ in range(args.concurrency)]
+    try:
+        await asyncio.gather(*(
+            c.post("/login", data={"identifier": f"user{i % args.users}", "password": f"pw{i % args.users}"})
+            for i, c in enumerate(clients)
+        ))
+        started = time.perf_counter()
+        await asyncio.gather(*(_searches(c, rec, i, prefix, args) for i, c in enumerate(clients)))
+        return summarize(rec, time.perf_counter() - started)
+    finally:
+        for c in clients:
+            await c.aclose()
+
+
+def run_latency(base_url, latency_ms, args):
+    summary = asyncio.run(_run_users(base_url, latency_ms, args))
+    route = summary["routes"][ROUTE]
+    route["sync_bound_rps"] = round(THREADPOOL_TOKENS / (latency_ms / 1000), 1)
+    route["async_bound_rps"] = round(min(args.concurrency, args.tmdb_concurrency) / (latency_ms / 1000), 1)
+    return {"latency_ms": latency_ms, **route}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dashboard async con TMDB lento")
+    parser.add_argument("--latencies", default="100,300,1000", help="latencias de TMDB (ms)")
+    parser.add_argument("--concurrency", type=int, default=200, help="usuarios simultáneos")
+    parser.add_argument("--per-user", type=int, default=5, help="búsquedas por usuario")
+    parser.add_argument("--tmdb-concurrency", type=int, help="peticiones simultáneas de la app a TMDB (por defecto, las de tmdb_client)")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args(argv)
+
+    latencies = [float(v) for v in args.latencies.split(",") if v]
+    output = os.path.abspath(args.output)
+
+    workspace = prepare_workspace(args.users, 0)
+    cwd = os.getcwd()
+    os.chdir(workspace)
+    fake, tmdb_url = start_fake_tmdb(latencies[0] / 1000)
+    server, base_url = start_app(tmdb_url)
+    from tmdb_client import atmdb
+    if args.tmdb_concurrency:
+        atmdb.max_concurrency = args.tmdb_concurrency
+    args.tmdb_concurrency = atmdb.max_concurrency
+
+    try:
+        results = {
+            "meta": {
+                "timestamp": int(time.time()),
+                "python": platform.python_version(),
+                "concurrency": args.concurrency,
+                "per_user": args.per_user,
+                "tmdb_concurrency": args.tmdb_concurrency,
+            },
+            "runs": [],
+        }
+        for latency_ms in latencies:
+            fake.latency = latency_ms / 1000
+            results["runs"].append(run_latency(base_url, latency_ms, args))
+        results["meta"]["tmdb_requests"] = fake.stats["requests"]
+    finally:
+        server.should_exit = True
+        fake.shutdown()
+        os.chdir(cwd)
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{args.concurrency} usuarios simultáneos, {args.per_user} búsquedas cada uno")
+    print(f"  {'tmdb ms':>8} {'n':>6} {'err':>5} {'p50':>9} {'p95':>9} {'req/s':>9} "
+          f"{'async máx':>10} {'sync máx':>9}")
+    for r in results["runs"]:
+        print(f"  {r['latency_ms']:>8g} {r['count']:>6} {r['errors']:>5} {r['p50_ms']:>9.2f} "
+              f"{r['p95_ms']:>9.2f} {r['rps']:>9.1f} {r['async_bound_rps']:>10.1f} {r['sync_bound_rps']:>9.1f}")
+    print(f"\nResultados en {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
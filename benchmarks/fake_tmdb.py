@@ -0,0 +1,150 @@
+import argparse
+import json
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# ---------------------------
+# CONFIG
+# ---------------------------
+DEFAULT_LATENCY = 0.05      # segundos por respuesta (simula la red hasta TMDB)
+PAGE_SIZE = 20
+TOTAL_PAGES = 500
+
+_MOVIE_RE = re.compile(r"^/3/movie/(\d+)(/videos)?$")
+
+
+# ================================
+# RESPUESTAS ENLATADAS
+# ================================
+def _movie_summary(movie_id):
+    return {
+        "id": movie_id,
+        "title": f"Película {movie_id}",
+        "original_title": f"Movie {movie_id}",
+        "poster_path": f"/poster{movie_id}.jpg",
+        "vote_average": round((movie_id % 90) / 10 + 1, 1),
+        "popularity": float(movie_id % 1000),
+        "release_date": "2020-01-01",
+    }
+
+
+def _page(ids, page):
+    return {
+        "page": page,
+        "results": [_movie_summary(i) for i in ids],
+        "total_pages": TOTAL_PAGES,
+        "total_results": TOTAL_PAGES * PAGE_SIZE,
+    }
+
+
+def discover(page):
+    start = 1000 + (page - 1) * PAGE_SIZE
+    return _page(range(start, start + PAGE_SIZE), page)
+
+
+def search(query, page):
+    # Resultados deterministas por consulta
+    seed = zlib.crc32(query.encode("utf-8")) % 100000
+    start = 200000 + seed + (page - 1) * PAGE_SIZE
+    return _page(range(start, start + PAGE_SIZE), page)
+
+
+def videos(movie_id):
+    return {
+        "id": movie_id,
+        "results": [
+            {"key": f"teaser{movie_id}", "site": "YouTube", "type": "Teaser"},
+            {"key": f"trailer{movie_id}", "site": "YouTube", "type": "Trailer"},
+        ],
+    }
+
+
+def movie(movie_id, append_to_response=""):
+    data = dict(_movie_summary(movie_id))
+    data.update({
+        "overview": f"Sinopsis de la película {movie_id}.",
+        "genres": [{"id": 18, "name": "Drama"}, {"id": 35, "name": "Comedia"}],
+        "runtime": 90 + movie_id % 60,
+    })
+
+    extras = set(filter(None, append_to_response.split(",")))
+    if "videos" in extras:
+        data["videos"] = videos(movie_id)
+    for related in ("similar", "recommendations"):
+        if related in extras:
+            data[related] = _page(range(movie_id + 1, movie_id + 1 + PAGE_SIZE), 1)
+    return data
+
+
+# ================================
+# SERVIDOR
+# ================================
+class FakeTMDBHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"     # keep-alive, como el TMDB real
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        page = int(params.get("page", 1))
+
+        with self.server.stats_lock:
+            self.server.stats["requests"] += 1
+        time.sleep(self.server.latency)
+
+        if url.path == "/3/discover/movie":
+            return self._send(200, discover(page))
+        if url.path == "/3/search/movie":
+            return self._send(200, search(params.get("query", ""), page))
+
+        match = _MOVIE_RE.match(url.path)
+        if match:
+            movie_id = int(match.group(1))
+            if match.group(2):
+                return self._send(200, videos(movie_id))
+            return self._send(200, movie(movie_id, params.get("append_to_response", "")))
+
+        self._send(404, {"status_code": 34, "status_message": "The resource you requested could not be found."})
+
+
+class FakeTMDBServer(ThreadingHTTPServer):
+    request_queue_size = 256      # el cliente async abre decenas de conexiones a la vez
+
+
+def start_fake_tmdb(latency=DEFAULT_LATENCY, port=0):
+    """Arranca el servidor en un hilo. Devuelve (server, base_url)."""
+    server = FakeTMDBServer(("127.0.0.1", port), FakeTMDBHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.stats = {"requests": 0}
+    server.stats_lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/3"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TMDB falso para pruebas de carga")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=DEFAULT_LATENCY * 1000, help="milisegundos")
+    args = parser.parse_args()
+
+    server, base_url = start_fake_tmdb(args.latency / 1000, args.port)
+    print(f"TMDB falso en {base_url} (latencia {args.latency:.0f} ms)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,109 @@
+"""
+Coste del recomendador item-item con datos sintéticos.
+
+    python -m benchmarks.recommender --users 100000 --movies 5000 --likes 15
+
+Mide el tiempo de construcción completa, la memoria que ocupa (crecimiento del
+RSS máximo del proceso), la latencia de las actualizaciones incrementales y de
+las consultas.
+"""
+import argparse
+import json
+import platform
+import random
+import resource
+import sys
+import time
+
+from benchmarks.run import REPO_ROOT, percentile
+
+DEFAULT_OUTPUT = "bench_recommender.json"
+
+
+def synthetic_likes(users, movies, likes, seed=42):
+    """Popularidad con cola larga (Zipf aproximado), como en un catálogo real."""
+    rnd = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(movies)]
+    data = {}
+    for u in range(users):
+        n = max(1, int(rnd.expovariate(1 / likes)))
+        data[f"user{u}"] = sorted(set(rnd.choices(range(1, movies + 1), weights=weights, k=n)))
+    return data
+
+
+def timed_ops(fn, args_list):
+    times = []
+    for args in args_list:
+        started = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - started)
+    times.sort()
+    return {
+        "count": len(times),
+        "p50_ms": round(percentile(times, 50) * 1000, 4),
+        "p99_ms": round(percentile(times, 99) * 1000, 4),
+        "max_ms": round(times[-1] * 1000, 4),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del recomendador item-item")
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--movies", type=int, default=5000)
+    parser.add_argument("--likes", type=int, default=15, help="likes medios por usuario")
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, REPO_ROOT)
+    from recommender import ItemRecommender, signals_from
+
+    likes = synthetic_likes(args.users, args.movies, args.likes)
+    total_likes = sum(len(ids) for ids in likes.values())
+
+    rec = ItemRecommender()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss     # KiB en Linux
+    started = time.perf_counter()
+    rec.build(signals_from(likes, {}))
+    build_s = time.perf_counter() - started
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    rnd = random.Random(1)
+    adds = [(f"user{rnd.randrange(args.users)}", rnd.randrange(1, args.movies + 1)) for _ in range(args.updates)]
+    queries = [(rnd.randrange(1, args.movies + 1),) for _ in range(args.updates * 10)]
+
+    results = {
+        "meta": {
+            "timestamp": int(time.time()),
+            "python": platform.python_version(),
+            "users": args.users,
+            "movies": args.movies,
+            "likes": total_likes,
+        },
+        "build": {
+            "seconds": round(build_s, 3),
+            "rss_growth_mb": round((rss_after - rss_before) / 1024, 1),
+            "rss_mb": round(rss_after / 1024, 1),
+            **rec.stats(),
+        },
+        "add": timed_ops(rec.add, adds),
+        "remove": timed_ops(rec.remove, adds),
+        "similar": timed_ops(rec.similar, queries),
+    }
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    b = results["build"]
+    print(f"{args.users} usuarios, {args.movies} películas, {total_likes} likes")
+    print(f"construcción: {b['seconds']} s, +{b['rss_growth_mb']} MB de RSS (total {b['rss_mb']} MB), "
+          f"{b['pairs']} pares")
+    for op in ("add", "remove", "similar"):
+        r = results[op]
+        print(f"{op:8} p50 {r['p50_ms']:.4f} ms  p99 {r['p99_ms']:.4f} ms  max {r['max_ms']:.4f} ms")
+    print(f"\nResultados en {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
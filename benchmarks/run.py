@@ -0,0 +1,303 @@
+"""
+Pruebas de carga de la app completa contra un TMDB falso.
+
+    python -m benchmarks.run --concurrency 16 --tmdb-latency 50
+    python -m benchmarks.run --scenarios login_storm,like_burst --compare base.json
+
+Se ejecuta en un directorio temporal (data/ nuevo, plantillas copiadas), así
+que no toca los datos del repositorio.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.fake_tmdb import start_fake_tmdb
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# ---------------------------
+# CONFIG
+# ---------------------------
+DEFAULT_OUTPUT = "bench_results.json"
+SCENARIOS = ["login_storm", "dashboard_paging", "like_burst", "admin_render", "custom_movie_crud"]
+
+
+# ================================
+# ENTORNO
+# ================================
+def prepare_workspace(users, admin_likes):
+    """Directorio de trabajo aislado con usuarios y likes sembrados."""
+    root = tempfile.mkdtemp(prefix="cine-bench-")
+    for name in ("templates", "static"):
+        shutil.copytree(os.path.join(REPO_ROOT, name), os.path.join(root, name))
+
+    data = os.path.join(root, "data")
+    os.makedirs(data)
+    with open(os.path.join(data, "users.csv"), "w", encoding="utf-8") as f:
+        f.write("username,email,password\n")
+        f.write("admin,admin@bench.local,admin\n")
+        for i in range(users):
+            f.write(f"user{i},user{i}@bench.local,pw{i}\n")
+
+    # admin_likes likes repartidos entre usuarios y ~200 películas distintas
+    rnd = random.Random(42)
+    likes = defaultdict(set)
+    for i in range(admin_likes):
+        likes[f"user{i % max(users, 1)}"].add(1000 + rnd.randrange(200))
+    with open(os.path.join(data, "likes.json"), "w", encoding="utf-8") as f:
+        json.dump({u: sorted(ids) for u, ids in likes.items()}, f)
+
+    with open(os.path.join(data, "custom_movies.json"), "w", encoding="utf-8") as f:
+        json.dump({"movies": []}, f)
+
+    return root
+
+
+def start_app(tmdb_url):
+    import uvicorn
+
+    sys.path.insert(0, REPO_ROOT)
+    from app import app
+    from resilience import TokenBucket
+    from tmdb_client import tmdb
+
+    tmdb.base_url = tmdb_url
+    tmdb.limiter = TokenBucket(1e9, 1e9)     # el TMDB falso no tiene cuota
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning", access_log=False))
+    threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True).start()
+
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+# ================================
+# MEDICIÓN
+# ================================
+class Recorder:
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def request(self, session, method, path, route, ok=(200, 302, 303, 304), **kwargs):
+        started = time.perf_counter()
+        try:
+            r = session.request(method, self.base_url + path, allow_redirects=False, **kwargs)
+            failed = r.status_code not in ok
+        except requests.RequestException:
+            r, failed = None, True
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self.latencies[route].append(elapsed)
+            if failed:
+                self.errors[route] += 1
+        return r
+
+    def login(self, session, username, password):
+        return self.request(session, "POST", "/login", "POST /login",
+                            data={"identifier": username, "password": password})
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def summarize(recorder, wall):
+    routes = {}
+    for route, values in sorted(recorder.latencies.items()):
+        values = sorted(values)
+        routes[route] = {
+            "count": len(values),
+            "errors": recorder.errors.get(route, 0),
+            "mean_ms": round(sum(values) / len(values) * 1000, 3),
+            "p50_ms": round(percentile(values, 50) * 1000, 3),
+            "p95_ms": round(percentile(values, 95) * 1000, 3),
+            "p99_ms": round(percentile(values, 99) * 1000, 3),
+            "rps": round(len(values) / wall, 2) if wall else 0.0,
+        }
+    return {"wall_s": round(wall, 3), "routes": routes}
+
+
+# ================================
+# ESCENARIOS
+# ================================
+# Cada escenario devuelve una lista de trabajos; cada trabajo es un usuario
+# virtual con su propia sesión HTTP.
+
+def login_storm(rec, args):
+    def job(i):
+        n = i % args.users
+        with requests.Session() as s:
+            rec.login(s, f"user{n}", f"pw{n}")
+    return [lambda i=i: job(i) for i in range(args.requests)]
+
+
+def dashboard_paging(rec, args):
+    def job(i):
+        with requests.Session() as s:
+            rec.login(s, f"user{i % args.users}", f"pw{i % args.users}")
+            for page in range(1, args.pages + 1):
+                rec.request(s, "GET", f"/dashboard?page={page}", "GET /dashboard")
+    return [lambda i=i: job(i) for i in range(max(1, args.requests // args.pages))]
+
+
+def like_burst(rec, args):
+    def job(i):
+        rnd = random.Random(i)
+        with requests.Session() as s:
+            rec.login(s, f"user{i % args.users}", f"pw{i % args.users}")
+            for _ in range(10):
+                rec.request(s, "POST", f"/api/like/{1000 + rnd.randrange(500)}", "POST /api/like/{id}")
+    return [lambda i=i: job(i) for i in range(max(1, args.requests // 10))]
+
+
+def admin_render(rec, args):
+    def job(i):
+        with requests.Session() as s:
+            rec.login(s, "admin", "admin")
+            for page in range(1, 4):
+                rec.request(s, "GET", f"/admin?page={page}", "GET /admin")
+    return [lambda i=i: job(i) for i in range(max(1, args.requests // 30))]
+
+
+def custom_movie_crud(rec, args):
+    def job(i):
+        with requests.Session() as s:
+            r = rec.request(s, "POST", "/api/movie/add", "POST /api/movie/add",
+                            params={"title": f"Bench {i}", "description": "bench"})
+            rec.request(s, "GET", "/api/movies", "GET /api/movies")
+            if r is not None and r.ok:
+                movie_id = r.json()["id"]
+                rec.request(s, "GET", f"/api/movie/{movie_id}", "GET /api/movie/{id}")
+                rec.request(s, "DELETE", f"/api/movie/{movie_id}", "DELETE /api/movie/{id}")
+    return [lambda i=i: job(i) for i in range(max(1, args.requests // 4))]
+
+
+def run_scenario(name, base_url, args):
+    rec = Recorder(base_url)
+    jobs = globals()[name](rec, args)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for future in [pool.submit(job) for job in jobs]:
+            future.result()
+    return summarize(rec, time.perf_counter() - started)
+
+
+# ================================
+# INFORME
+# ================================
+def print_report(results):
+    for name, scenario in results["scenarios"].items():
+        print(f"\n{name}  ({scenario['wall_s']} s)")
+        print(f"  {'ruta':28} {'n':>6} {'err':>5} {'p50':>9} {'p95':>9} {'p99':>9} {'req/s':>9}")
+        for route, r in scenario["routes"].items():
+            print(f"  {route:28} {r['count']:>6} {r['errors']:>5} {r['p50_ms']:>9.2f} "
+                  f"{r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['rps']:>9.1f}")
+
+
+def compare(results, baseline, tolerance):
+    """Rutas cuyo p95 empeora más de `tolerance` respecto a la referencia."""
+    regressions = []
+    for name, scenario in results["scenarios"].items():
+        base_routes = baseline.get("scenarios", {}).get(name, {}).get("routes", {})
+        for route, r in scenario["routes"].items():
+            base = base_routes.get(route)
+            if base and base["p95_ms"] and r["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{name} {route}: p95 {base['p95_ms']} -> {r['p95_ms']} ms")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de CineApp con un TMDB falso")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=400, help="peticiones aproximadas por escenario")
+    parser.add_argument("--users", type=int, default=1000, help="usuarios sembrados en users.csv")
+    parser.add_argument("--admin-likes", type=int, default=2000, help="likes sembrados para /admin")
+    parser.add_argument("--pages", type=int, default=5, help="páginas por usuario en dashboard_paging")
+    parser.add_argument("--tmdb-latency", type=float, default=50, help="latencia del TMDB falso (ms)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--compare", help="resultados anteriores (JSON) para detectar regresiones")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    names = [n for n in args.scenarios.split(",") if n]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"escenarios desconocidos: {', '.join(sorted(unknown))}")
+
+    output = os.path.abspath(args.output)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    workspace = prepare_workspace(args.users, args.admin_likes)
+    cwd = os.getcwd()
+    os.chdir(workspace)
+    fake, tmdb_url = start_fake_tmdb(args.tmdb_latency / 1000)
+    server, base_url = start_app(tmdb_url)
+
+    try:
+        results = {
+            "meta": {
+                "timestamp": int(time.time()),
+                "python": platform.python_version(),
+                "concurrency": args.concurrency,
+                "requests": args.requests,
+                "users": args.users,
+                "admin_likes": args.admin_likes,
+                "tmdb_latency_ms": args.tmdb_latency,
+            },
+            "scenarios": {},
+        }
+        for name in names:
+            results["scenarios"][name] = run_scenario(name, base_url, args)
+        results["meta"]["tmdb_requests"] = fake.stats["requests"]
+    finally:
+        server.should_exit = True
+        fake.shutdown()
+        os.chdir(cwd)
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print_report(results)
+    print(f"\nResultados en {output}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESIÓN {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
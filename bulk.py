@@ -0,0 +1,338 @@
+"""
+Importación y exportación masiva de usuarios, likes y valoraciones.
+
+    python bulk.py import likes likes.jsonl
+    python bulk.py import users usuarios.csv --batch 10000
+    python bulk.py export ratings -o ratings.csv
+    cat likes.jsonl | python bulk.py import likes -
+
+Entrada en CSV (con cabecera) o JSON Lines, según la extensión o --format:
+
+    users    username, email, password
+    likes    user, movie_id
+    ratings  user, movie_id, rating (1 o -1)
+
+Todo va en streaming (leer -> validar -> quitar duplicados -> lotes) y cada
+lote se escribe de una vez: una transacción en SQLite, un append en el CSV
+o en el log de eventos. La exportación recorre el almacenamiento sin
+cargarlo entero.
+
+Los logs de eventos admiten un solo proceso escritor, así que hay que
+ejecutarlo con la app parada: al importar likes con cualquier backend (van
+siempre a su log, también con STORAGE_BACKEND=sqlite) y siempre con el
+backend de ficheros (las valoraciones también van a un log).
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from itertools import islice
+
+from data_base import DATA_DIR
+from likes_index import LikesIndex
+from storage import RatingRepository, UserRepository
+
+# ---------------------------
+# CONFIG
+# ---------------------------
+LIKES_FILE = os.path.join(DATA_DIR, "likes.json")     # el mismo que usa app.py
+BATCH_SIZE = 5000
+PROGRESS_EVERY = 1.0        # segundos entre líneas de progreso
+MAX_FIELD = 254             # longitud máxima de username / email / password
+
+FIELDS = {
+    "users": ("username", "email", "password"),
+    "likes": ("user", "movie_id"),
+    "ratings": ("user", "movie_id", "rating"),
+}
+
+
+class RowError(ValueError):
+    pass
+
+
+# ================================
+# LECTURA
+# ================================
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def read_rows(f, fmt):
+    """(número de línea, dict) por cada fila; las líneas JSON rotas salen como RowError."""
+    if fmt == "csv":
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for n, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield n, RowError("JSON inválido")
+            continue
+        yield n, row if isinstance(row, dict) else RowError("se esperaba un objeto")
+
+
+# ================================
+# VALIDACIÓN
+# ================================
+def _text(row, field):
+    value = str(row.get(field) or "").strip()
+    if not value:
+        raise RowError(f"falta {field}")
+    if len(value) > MAX_FIELD:
+        raise RowError(f"{field} demasiado largo")
+    return value
+
+
+def _movie_id(row):
+    try:
+        movie_id = int(row.get("movie_id"))
+    except (TypeError, ValueError):
+        raise RowError("movie_id no es un entero")
+    if movie_id <= 0:
+        raise RowError("movie_id no es positivo")
+    return movie_id
+
+
+def clean_user(row):
+    email = _text(row, "email")
+    if "@" not in email:
+        raise RowError("email inválido")
+    return {"username": _text(row, "username"), "email": email, "password": _text(row, "password")}
+
+
+def clean_like(row):
+    return _text(row, "user"), _movie_id(row)
+
+
+def clean_rating(row):
+    try:
+        rating = int(row.get("rating"))
+    except (TypeError, ValueError):
+        rating = None
+    if rating not in (1, -1):
+        raise RowError("rating debe ser 1 o -1")
+    return _text(row, "user"), _movie_id(row), rating
+
+
+# ================================
+# PIPELINE
+# ================================
+class Stats:
+
+    def __init__(self, out=sys.stderr):
+        self.out = out
+        self.read = self.written = self.invalid = self.duplicates = 0
+        self.errors = []            # primeros errores, para el informe
+        self.started = time.perf_counter()
+        self._last = self.started
+
+    def error(self, line, message):
+        self.invalid += 1
+        if len(self.errors) < 10:
+            self.errors.append(f"línea {line}: {message}")
+
+    def rate(self):
+        elapsed = time.perf_counter() - self.started
+        return self.read / elapsed if elapsed else 0.0
+
+    def progress(self, force=False):
+        now = time.perf_counter()
+        if force or now - self._last >= PROGRESS_EVERY:
+            self._last = now
+            print(f"  {self.read} filas leídas, {self.written} escritas ({self.rate():.0f} filas/s)",
+                  file=self.out)
+
+    def summary(self):
+        return {
+            "read": self.read, "written": self.written, "invalid": self.invalid,
+            "duplicates": self.duplicates, "seconds": round(time.perf_counter() - self.started, 3),
+            "rows_per_s": round(self.rate(), 1),
+        }
+
+
+def validated(rows, clean, stats):
+    for line, row in rows:
+        stats.read += 1
+        try:
+            if isinstance(row, RowError):
+                raise row
+            yield clean(row)
+        except RowError as e:
+            stats.error(line, e)
+        stats.progress()
+
+
+def unique(items, key, stats, seen=None):
+    """Quita duplicados dentro de la entrada (o ya presentes en `seen`)."""
+    seen = set() if seen is None else seen
+    for item in items:
+        keys = key(item)
+        if any(k in seen for k in keys):
+            stats.duplicates += 1
+            continue
+        seen.update(keys)
+        yield item
+
+
+def last_wins(items, key, stats):
+    """
+    Valoraciones: son asignaciones, así que ante filas repetidas vale la
+    última. Se descartan solo las que no cambian el valor ya enviado.
+    """
+    sent = {}
+    for item in items:
+        k = key(item)
+        if sent.get(k) == item:
+            stats.duplicates += 1
+            continue
+        sent[k] = item
+        yield item
+
+
+def batches(items, size):
+    it = iter(items)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+# ================================
+# IMPORT
+# ================================
+def _existing_user_keys():
+    keys = set()
+    for u in UserRepository.iter_users():
+        keys.add(("u", u["username"]))
+        keys.add(("e", (u["email"] or "").lower()))
+    return keys
+
+
+def import_rows(kind, rows, batch_size=BATCH_SIZE, stats=None, likes=None):
+    """Importa filas (línea, dict) de `kind`; devuelve el resumen."""
+    stats = stats or Stats()
+
+    if kind == "users":
+        items = unique(validated(rows, clean_user, stats),
+                       lambda u: (("u", u["username"]), ("e", u["email"].lower())),
+                       stats, seen=_existing_user_keys())
+        for batch in batches(items, batch_size):
+            stats.written += UserRepository.save_users(batch)
+            stats.progress()
+
+    elif kind == "likes":
+        likes = likes or LikesIndex(LIKES_FILE)
+        for batch in batches(validated(rows, clean_like, stats), batch_size):
+            added = len(likes.like_many(batch))
+            stats.written += added
+            stats.duplicates += len(batch) - added
+            stats.progress()
+
+    elif kind == "ratings":
+        items = last_wins(validated(rows, clean_rating, stats), lambda r: (r[0], r[1]), stats)
+        for batch in batches(items, batch_size):
+            RatingRepository.rate_movies(batch)
+            stats.written += len(batch)
+            stats.progress()
+
+    else:
+        raise ValueError(f"tipo desconocido: {kind}")
+
+    stats.progress(force=True)
+    return stats.summary()
+
+
+# ================================
+# EXPORT
+# ================================
+def iter_export(kind, likes=None):
+    """Filas (dict) del almacenamiento, una a una."""
+    if kind == "users":
+        for u in UserRepository.iter_users():
+            yield {f: u[f] for f in FIELDS["users"]}
+    elif kind == "likes":
+        for user, movie_id in (likes or LikesIndex(LIKES_FILE)).iter_likes():
+            yield {"user": user, "movie_id": movie_id}
+    elif kind == "ratings":
+        for user, movie_id, rating in RatingRepository.iter_ratings():
+            yield {"user": user, "movie_id": movie_id, "rating": rating}
+    else:
+        raise ValueError(f"tipo desconocido: {kind}")
+
+
+def write_rows(rows, f, fmt, fields):
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    else:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+# ================================
+# CLI
+# ================================
+def _open(path, mode):
+    if path == "-":
+        return sys.stdin if "r" in mode else sys.stdout
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importación / exportación masiva (CSV o JSON Lines)")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("kind", choices=sorted(FIELDS))
+    parser.add_argument("path", nargs="?", default="-", help="fichero de entrada ('-' = stdin)")
+    parser.add_argument("-o", "--output", default="-", help="fichero de salida de export ('-' = stdout)")
+    parser.add_argument("--format", choices=["csv", "jsonl"])
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE, help="filas por escritura")
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        f = _open(args.path, "r")
+        try:
+            stats = Stats()
+            summary = import_rows(args.kind, read_rows(f, detect_format(args.path, args.format)),
+                                  args.batch, stats)
+        finally:
+            if f is not sys.stdin:
+                f.close()
+        for error in stats.errors:
+            print(f"  {error}", file=sys.stderr)
+        print(f"{summary['written']} {args.kind} importados de {summary['read']} filas "
+              f"({summary['invalid']} inválidas, {summary['duplicates']} duplicadas) "
+              f"en {summary['seconds']} s, {summary['rows_per_s']} filas/s", file=sys.stderr)
+        return 1 if summary["invalid"] and not summary["written"] else 0
+
+    f = _open(args.output, "w")
+    try:
+        started = time.perf_counter()
+        count = write_rows(iter_export(args.kind), f, detect_format(args.output, args.format),
+                           FIELDS[args.kind])
+    finally:
+        if f is not sys.stdout:
+            f.close()
+    print(f"{count} {args.kind} exportados en {time.perf_counter() - started:.2f} s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,313 @@
+import argparse
+import bisect
+import csv
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+import unicodedata
+from array import array
+from collections import defaultdict
+
+from data_base import DATA_DIR
+
+# ---------------------------
+# CONFIG
+# ---------------------------
+CATALOG_FILE = os.path.join(DATA_DIR, "catalog.bin")
+MOVIES_CSV = os.path.join(DATA_DIR, "tmdb_5000_movies.csv")
+CREDITS_CSV = os.path.join(DATA_DIR, "tmdb_5000_credits.csv")
+
+MAGIC = b"CINECAT1"
+PAGE_SIZE = 20          # igual que TMDB
+CAST_PER_MOVIE = 5      # actores indexados por película
+TITLE_WEIGHT = 3
+CAST_WEIGHT = 1
+MAX_PREFIX_EXPANSION = 50
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def fold(text):
+    """Minúsculas y sin acentos: 'Película Ñandú' -> 'pelicula nandu'."""
+    text = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(fold(text))
+
+
+# ================================
+# INGEST
+# ================================
+def _read_cast(credits_path):
+    if not credits_path or not os.path.exists(credits_path):
+        return {}
+
+    cast = {}
+    with open(credits_path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            try:
+                people = sorted(json.loads(row["cast"] or "[]"), key=lambda p: p.get("order", 0))
+            except ValueError:
+                continue
+            cast[int(row["movie_id"])] = [p["name"] for p in people[:CAST_PER_MOVIE]]
+    return cast
+
+
+def _read_movies(movies_path, cast):
+    if not movies_path or not os.path.exists(movies_path):
+        return
+
+    with open(movies_path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            movie_id = int(row["id"])
+            yield {
+                "id": movie_id,
+                "title": row["title"],
+                "original_title": row.get("original_title") or row["title"],
+                "release_date": row.get("release_date") or "",
+                "vote_average": float(row.get("vote_average") or 0),
+                "popularity": float(row.get("popularity") or 0),
+                "poster": "",
+                "poster_path": row.get("poster_path") or "",     # el dump de Kaggle no la trae
+                "cast": cast.get(movie_id, []),
+                "custom": False,
+            }
+
+
+def _custom_movies(custom_movies):
+    for m in custom_movies:
+        yield {
+            "id": m["id"],
+            "title": m.get("title") or "",
+            "original_title": m.get("title") or "",
+            "release_date": "",
+            "vote_average": 0.0,
+            "popularity": 0.0,
+            "poster": m.get("poster") or "",
+            "poster_path": "",
+            "cast": [],
+            "custom": True,
+        }
+
+
+def _pad(buf):
+    buf.extend(b"\0" * (-len(buf) % 8))
+
+
+def build_catalog(movies, out_path=CATALOG_FILE):
+    """
+    Escribe el catálogo en columnas (arrays) + índice invertido:
+      MAGIC | len(cabecera) | cabecera JSON | secciones binarias alineadas a 8 bytes
+    """
+    ids, votes, popularity, custom = array("q"), array("d"), array("d"), array("B")
+    strings = {name: (bytearray(), array("Q", [0])) for name in ("title", "release_date", "poster", "poster_path")}
+    postings = {"title": defaultdict(list), "cast": defaultdict(list)}
+
+    for row, m in enumerate(movies):
+        ids.append(m["id"])
+        votes.append(m["vote_average"])
+        popularity.append(m["popularity"])
+        custom.append(1 if m["custom"] else 0)
+        for name, (blob, offsets) in strings.items():
+            blob.extend((m.get(name) or "").encode("utf-8"))
+            offsets.append(len(blob))
+
+        for token in set(tokenize(m["title"]) + tokenize(m["original_title"])):
+            postings["title"][token].append(row)
+        for token in set(t for name in m["cast"] for t in tokenize(name)):
+            postings["cast"][token].append(row)
+
+    body = bytearray()
+    sections = {}
+
+    def add_section(name, data, typecode=None):
+        sections[name] = [len(body), len(data), typecode]
+        body.extend(data)
+        _pad(body)
+
+    add_section("id", ids.tobytes(), "q")
+    add_section("vote_average", votes.tobytes(), "d")
+    add_section("popularity", popularity.tobytes(), "d")
+    add_section("custom", custom.tobytes(), "B")
+    for name, (blob, offsets) in strings.items():
+        add_section(f"{name}_offsets", offsets.tobytes(), "Q")
+        add_section(f"{name}_blob", bytes(blob))
+
+    # token -> [offset, count] de cada lista de filas (uint32) dentro de la sección
+    tokens = {}
+    for field, index in postings.items():
+        data = array("I")
+        for token in sorted(index):
+            tokens.setdefault(token, {})[field] = [len(data), len(index[token])]
+            data.extend(index[token])
+        add_section(f"{field}_postings", data.tobytes(), "I")
+
+    header = json.dumps({
+        "count": len(ids),
+        "built_at": int(time.time()),
+        "sections": sections,
+        "tokens": tokens,
+    }, separators=(",", ":")).encode("utf-8")
+
+    prefix = bytearray(MAGIC + struct.pack("<Q", len(header)) + header)
+    _pad(prefix)
+
+    tmp = out_path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(prefix)
+        f.write(body)
+    os.replace(tmp, out_path)
+    return len(ids)
+
+
+# ================================
+# CATALOG (LECTURA)
+# ================================
+class Catalog:
+    """Catálogo local en solo lectura, mapeado en memoria."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} no es un catálogo válido")
+        (header_len,) = struct.unpack_from("<Q", self._mm, len(MAGIC))
+        start = len(MAGIC) + 8
+        header = json.loads(self._mm[start:start + header_len])
+        base = start + header_len + (-(start + header_len) % 8)
+
+        view = memoryview(self._mm)
+        self._cols = {}
+        for name, (offset, length, typecode) in header["sections"].items():
+            section = view[base + offset:base + offset + length]
+            self._cols[name] = section.cast(typecode) if typecode else section
+
+        self.count = header["count"]
+        self._tokens = header["tokens"]
+        self._sorted_tokens = sorted(self._tokens)
+
+    @staticmethod
+    def open(path=CATALOG_FILE):
+        """Devuelve el catálogo o None si todavía no se ha generado."""
+        if not os.path.exists(path):
+            return None
+        return Catalog(path)
+
+    def _string(self, name, row):
+        offsets = self._cols[f"{name}_offsets"]
+        return bytes(self._cols[f"{name}_blob"][offsets[row]:offsets[row + 1]]).decode("utf-8")
+
+    def movie(self, row):
+        movie = {
+            "id": self._cols["id"][row],
+            "title": self._string("title", row),
+            "release_date": self._string("release_date", row),
+            "vote_average": self._cols["vote_average"][row],
+            "popularity": self._cols["popularity"][row],
+            # Catálogos generados antes de guardar poster_path no tienen la columna
+            "poster_path": self._string("poster_path", row) or None if "poster_path_blob" in self._cols else None,
+        }
+        if self._cols["custom"][row]:
+            # Películas propias (CustomMovieRepository): sin poster_path de TMDB
+            movie["custom"] = True
+            movie["poster"] = self._string("poster", row)
+        return movie
+
+    def _postings(self, token, field):
+        entry = self._tokens.get(token, {}).get(field)
+        if entry is None:
+            return ()
+        offset, count = entry
+        return self._cols[f"{field}_postings"][offset:offset + count]
+
+    def _expand(self, token, prefix):
+        if not prefix:
+            return [token] if token in self._tokens else []
+        # La última palabra de la consulta también vale como prefijo ("matr" -> "matrix")
+        i = bisect.bisect_left(self._sorted_tokens, token)
+        found = []
+        while i < len(self._sorted_tokens) and len(found) < MAX_PREFIX_EXPANSION:
+            candidate = self._sorted_tokens[i]
+            if not candidate.startswith(token):
+                break
+            found.append(candidate)
+            i += 1
+        return found
+
+    def search(self, query, page=1, page_size=PAGE_SIZE):
+        """
+        Todas las palabras deben aparecer (en título o reparto). Orden:
+        puntuación (título pesa más que reparto) y después popularidad.
+        Devuelve el mismo formato que /search/movie de TMDB.
+        """
+        words = tokenize(query)
+        scores = None
+
+        for i, word in enumerate(words):
+            word_scores = {}
+            for token in self._expand(word, prefix=(i == len(words) - 1)):
+                for row in self._postings(token, "title"):
+                    word_scores[row] = max(word_scores.get(row, 0), TITLE_WEIGHT)
+                for row in self._postings(token, "cast"):
+                    word_scores.setdefault(row, CAST_WEIGHT)
+
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = {row: s + word_scores[row] for row, s in scores.items() if row in word_scores}
+            if not scores:
+                break
+
+        scores = scores or {}
+        popularity = self._cols["popularity"]
+        ranked = sorted(scores, key=lambda row: (-scores[row], -popularity[row]))
+
+        start = (max(page, 1) - 1) * page_size
+        return {
+            "page": page,
+            "results": [self.movie(row) for row in ranked[start:start + page_size]],
+            "total_results": len(ranked),
+            "total_pages": math.ceil(len(ranked) / page_size),
+        }
+
+    def close(self):
+        for col in self._cols.values():
+            col.release()
+        self._cols = {}
+        self._mm.close()
+        self._file.close()
+
+
+# ================================
+# CLI
+# ================================
+def ingest(movies_path=MOVIES_CSV, credits_path=CREDITS_CSV, out_path=CATALOG_FILE):
+    from storage import CustomMovieRepository
+
+    csv.field_size_limit(sys.maxsize)   # las columnas JSON del dump son largas
+    cast = _read_cast(credits_path)
+    rows = list(_read_movies(movies_path, cast))
+    rows.extend(_custom_movies(CustomMovieRepository.load_movies()))
+    return build_catalog(rows, out_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Catálogo local de películas")
+    parser.add_argument("command", choices=["ingest"])
+    parser.add_argument("--movies", default=MOVIES_CSV)
+    parser.add_argument("--credits", default=CREDITS_CSV)
+    parser.add_argument("--out", default=CATALOG_FILE)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    count = ingest(args.movies, args.credits, args.out)
+    print(f"{count} películas en {args.out} ({time.perf_counter() - started:.2f}s)")
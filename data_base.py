@@ -1,6 +1,12 @@
+import bisect
 import csv
 import json
 import os
+import threading
+
+import metrics
+from event_log import EventLog
+from rating_stats import RatingAggregates
 
 # ---------------------------
 # CONFIG
@@ -9,109 +15,359 @@ DATA_DIR = "data"
 USERS_FILE = os.path.join(DATA_DIR, "users.csv")
 MOVIES_FILE = os.path.join(DATA_DIR, "custom_movies.json")
 RATINGS_FILE = os.path.join(DATA_DIR, "ratings.json")
+TITLES_FILE = os.path.join(DATA_DIR, "titles.json")
+
+# Primer id de las películas propias. No es un rango aparte: TMDB tiene ids
+# mucho mayores, así que el id no dice si una película es propia o de TMDB
+FIRST_CUSTOM_MOVIE_ID = 100001
 
 os.makedirs(DATA_DIR, exist_ok=True)
 
 
+def file_stamp(path):
+    """(mtime_ns, tamaño) del fichero, o None si no existe."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+# ================================
+# USER INDEX
+# ================================
+class UserIndex:
+    """
+    Usuarios de un CSV indexados por username y por email en minúsculas.
+    El fichero se vuelve a leer solo si cambia su mtime o su tamaño.
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._stamp = None
+        self._loaded = False
+        self.users = []
+        self.by_username = {}
+        self.by_email = {}
+
+    @staticmethod
+    def for_path(path):
+        with UserIndex._instances_lock:
+            index = UserIndex._instances.get(path)
+            if index is None:
+                index = UserIndex._instances[path] = UserIndex(path)
+            return index
+
+    def _add(self, user):
+        self.users.append(user)
+        # Si hay duplicados en el CSV, gana el primero (como el recorrido lineal)
+        self.by_username.setdefault(user["username"], user)
+        self.by_email.setdefault((user["email"] or "").lower(), user)
+
+    def refresh(self):
+        with self._lock:
+            stamp = file_stamp(self.path)
+            if self._loaded and stamp == self._stamp:
+                return
+
+            self.users, self.by_username, self.by_email = [], {}, {}
+            if stamp is not None:
+                with metrics.timed("file_io"), open(self.path, "r", encoding="utf-8") as f:
+                    for user in csv.DictReader(f):
+                        self._add(user)
+            self._stamp = stamp
+            self._loaded = True
+
+    def find(self, identifier):
+        """Candidatos para un login: por username y por email."""
+        self.refresh()
+        found = [self.by_username.get(identifier), self.by_email.get(identifier.lower())]
+        return [u for u in found if u is not None]
+
+    def exists(self, username, email):
+        self.refresh()
+        return username in self.by_username or email.lower() in self.by_email
+
+    def append(self, username, email, password):
+        self.append_many([{"username": username, "email": email, "password": password}])
+
+    def append_many(self, users):
+        """Añade varios usuarios con una sola apertura y escritura del CSV."""
+        users = [{"username": u["username"], "email": u["email"], "password": u["password"]} for u in users]
+        if not users:
+            return
+        with self._lock:
+            self.refresh()
+            known_size = self._stamp[1] if self._stamp else 0
+
+            with metrics.timed("file_io"), open(self.path, "a", newline="", encoding="utf-8") as f:
+                start = f.tell()
+                writer = csv.DictWriter(f, fieldnames=["username", "email", "password"])
+                if self._stamp is None:
+                    writer.writeheader()
+                writer.writerows(users)
+                end = f.tell()
+
+            for user in users:
+                self._add(user)
+
+            # Si nadie más escribió entre medias, el índice sigue al día sin releer
+            stamp = file_stamp(self.path)
+            if start == known_size and stamp is not None and stamp[1] == end:
+                self._stamp = stamp
+            else:
+                self._loaded = False
+
+
 # ================================
 # USER REPOSITORY
 # ================================
 class UserRepository:
 
     @staticmethod
-    def load_users():
-        if not os.path.exists(USERS_FILE):
-            return []
+    def _index():
+        return UserIndex.for_path(USERS_FILE)
 
-        with open(USERS_FILE, "r", encoding="utf-8") as f:
-            return list(csv.DictReader(f))
+    @staticmethod
+    def load_users():
+        index = UserRepository._index()
+        index.refresh()
+        return list(index.users)
 
     @staticmethod
     def user_exists(username, email):
-        users = UserRepository.load_users()
-        return any(u["username"] == username or u["email"] == email for u in users)
+        return UserRepository._index().exists(username, email)
+
+    @staticmethod
+    def authenticate(identifier, password):
+        """Devuelve el username si las credenciales son válidas, si no None."""
+        for u in UserRepository._index().find(identifier):
+            if u["password"] == password:
+                return u["username"]
+        return None
 
     @staticmethod
     def validate_login(identifier, password):
-        users = UserRepository.load_users()
-        for u in users:
-            if (u["username"] == identifier or u["email"] == identifier) and u["password"] == password:
-                return True
-        return False
+        return UserRepository.authenticate(identifier, password) is not None
 
     @staticmethod
     def save_user(username, email, password):
-        file_exists = os.path.exists(USERS_FILE)
-        with open(USERS_FILE, "a", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=["username", "email", "password"])
-            if not file_exists:
-                writer.writeheader()
-            writer.writerow({"username": username, "email": email, "password": password})
+        UserRepository._index().append(username, email, password)
+
+    @staticmethod
+    def save_users(users):
+        """Alta masiva (dicts username/email/password ya validados y sin duplicados)."""
+        users = list(users)
+        UserRepository._index().append_many(users)
+        return len(users)
+
+    @staticmethod
+    def iter_users():
+        """Recorre el CSV fila a fila, sin cargarlo entero."""
+        if not os.path.exists(USERS_FILE):
+            return
+        with open(USERS_FILE, "r", encoding="utf-8", newline="") as f:
+            yield from csv.DictReader(f)
 
 
 # ================================
 # CUSTOM MOVIES REPOSITORY
 # ================================
 class CustomMovieRepository:
+    """
+    El fichero guarda {"version": n, "next_id": m, "movies": [...]}. La versión
+    sube en cada escritura y, junto con el mtime, identifica el contenido (ETag
+    de la API). next_id solo crece: un id borrado no se vuelve a asignar.
+    En memoria se mantiene un índice id -> película (ordenado por id) y solo
+    se relee si el fichero cambia. Cada escritura publica un índice nuevo, así
+    que un recorrido en curso nunca ve cambios a medias.
+    """
+
+    _cache = None
+    _lock = threading.RLock()
+
+    @staticmethod
+    def _state():
+        with CustomMovieRepository._lock:
+            stamp = file_stamp(MOVIES_FILE)
+            cache = CustomMovieRepository._cache
+            if cache is None or cache["stamp"] != stamp or cache["path"] != MOVIES_FILE:
+                data = {}
+                if stamp is not None:
+                    with metrics.timed("file_io"), open(MOVIES_FILE, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                movies = {m["id"]: m for m in sorted(data.get("movies", []), key=lambda m: m["id"])}
+                cache = CustomMovieRepository._cache = {
+                    "path": MOVIES_FILE,
+                    "stamp": stamp,
+                    "version": data.get("version", 0),
+                    # Ficheros antiguos sin next_id: se calcula una vez al cargarlos
+                    "next_id": data.get("next_id") or max(movies, default=FIRST_CUSTOM_MOVIE_ID - 1) + 1,
+                    "movies": movies,
+                    "ids": list(movies),
+                }
+            return cache
+
+    @staticmethod
+    def _write(movies, next_id):
+        """Escribe el fichero completo (temp + rename) y actualiza la cache."""
+        state = CustomMovieRepository._state()
+        version = state["version"] + 1
+
+        tmp = MOVIES_FILE + ".tmp"
+        with metrics.timed("file_io"):
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": version, "next_id": next_id, "movies": list(movies.values())},
+                          f, indent=4, ensure_ascii=False)
+            os.replace(tmp, MOVIES_FILE)
+
+        CustomMovieRepository._cache = {
+            "path": MOVIES_FILE,
+            "stamp": file_stamp(MOVIES_FILE),
+            "version": version,
+            "next_id": next_id,
+            "movies": movies,
+            "ids": list(movies),
+        }
+
+    @staticmethod
+    def version():
+        """Versión del catálogo sin leer el fichero (solo stat)."""
+        state = CustomMovieRepository._state()
+        mtime_ns, size = state["stamp"] or (0, 0)
+        return {
+            "version": state["version"],
+            "etag": f'"movies-{state["version"]}-{mtime_ns:x}-{size:x}"',
+            "last_modified": mtime_ns // 1_000_000_000,
+        }
 
     @staticmethod
     def load_movies():
-        if not os.path.exists(MOVIES_FILE):
-            return []
+        return list(CustomMovieRepository._state()["movies"].values())
 
-        with open(MOVIES_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return data.get("movies", [])
+    @staticmethod
+    def get_movie(movie_id):
+        return CustomMovieRepository._state()["movies"].get(movie_id)
+
+    @staticmethod
+    def page_movies(after=0, limit=100):
+        """Hasta `limit` películas con id > after, en orden de id."""
+        state = CustomMovieRepository._state()
+        ids = state["ids"]
+        start = bisect.bisect_right(ids, after)
+        return [state["movies"][mid] for mid in ids[start:start + limit]]
 
     @staticmethod
     def save_movies(movies):
-        with open(MOVIES_FILE, "w", encoding="utf-8") as f:
-            json.dump({"movies": movies}, f, indent=4, ensure_ascii=False)
+        with CustomMovieRepository._lock:
+            by_id = {m["id"]: m for m in sorted(movies, key=lambda m: m["id"])}
+            next_id = max(CustomMovieRepository._state()["next_id"], max(by_id, default=0) + 1)
+            CustomMovieRepository._write(by_id, next_id)
 
     @staticmethod
-    def add_movie(title, description, poster):
-        movies = CustomMovieRepository.load_movies()
-        new_id = max([m["id"] for m in movies], default=100000) + 1
+    def add_movies(movies):
+        """Añade varias películas con una sola escritura. Devuelve sus ids."""
+        with CustomMovieRepository._lock:
+            state = CustomMovieRepository._state()
+            by_id = dict(state["movies"])
+            next_id = state["next_id"]
 
-        movies.append({
-            "id": new_id,
-            "title": title,
-            "description": description,
-            "poster": poster
-        })
+            ids = []
+            for m in movies:
+                by_id[next_id] = {
+                    "id": next_id,
+                    "title": m["title"],
+                    "description": m["description"],
+                    "poster": m["poster"]
+                }
+                ids.append(next_id)
+                next_id += 1
 
-        CustomMovieRepository.save_movies(movies)
-        return new_id
+            if ids:
+                CustomMovieRepository._write(by_id, next_id)
+            return ids
 
     @staticmethod
-    def delete_movie(movie_id):
-        movies = CustomMovieRepository.load_movies()
-        new_list = [m for m in movies if m["id"] != movie_id]
+    def add_movie(title, description, poster):
+        return CustomMovieRepository.add_movies(
+            [{"title": title, "description": description, "poster": poster}]
+        )[0]
 
-        if len(new_list) == len(movies):
-            return False  # No existía
+    @staticmethod
+    def delete_movies(movie_ids):
+        """Borra varias películas con una sola escritura. Devuelve los ids borrados."""
+        with CustomMovieRepository._lock:
+            state = CustomMovieRepository._state()
+            deleted = [mid for mid in dict.fromkeys(movie_ids) if mid in state["movies"]]
+            if not deleted:
+                return []
 
-        CustomMovieRepository.save_movies(new_list)
-        return True
+            by_id = dict(state["movies"])
+            for mid in deleted:
+                del by_id[mid]
+            CustomMovieRepository._write(by_id, state["next_id"])
+            return deleted
+
+    @staticmethod
+    def delete_movie(movie_id):
+        return bool(CustomMovieRepository.delete_movies([movie_id]))
 
 
 # ================================
 # MOVIE RATINGS (LIKE / DISLIKE)
 # ================================
+class RatingsState:
+    """
+    Estado en memoria de las valoraciones: user -> {movie_id: rating}, más
+    los agregados por película que se actualizan con cada evento.
+    """
+
+    def __init__(self):
+        self.ratings = {}
+        self.aggregates = RatingAggregates()
+
+    def reset(self, ratings):
+        self.ratings = {user: dict(r) for user, r in ratings.items()}
+        self.aggregates.reset(self.ratings)
+
+    def apply(self, event):
+        user, movie_id, rating = event
+        user_ratings = self.ratings.setdefault(user, {})
+        old = user_ratings.get(str(movie_id), 0)
+        user_ratings[str(movie_id)] = rating
+        self.aggregates.update(movie_id, old, rating)
+
+    def snapshot(self):
+        return {user: dict(r) for user, r in self.ratings.items()}
+
+
 class RatingRepository:
 
+    _log = None
+    _lock = threading.Lock()
+
     @staticmethod
-    def load_ratings():
-        if not os.path.exists(RATINGS_FILE):
-            return {}
+    def _store():
+        # ratings.json (snapshot) + ratings.log (un evento por valoración)
+        with RatingRepository._lock:
+            if RatingRepository._log is None:
+                RatingRepository._log = EventLog(RATINGS_FILE, RatingsState())
+        RatingRepository._log.refresh()
+        return RatingRepository._log
 
-        with open(RATINGS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
+    @staticmethod
+    def load_ratings():
+        store = RatingRepository._store()
+        with store.lock:
+            return store.state.snapshot()
 
     @staticmethod
     def save_ratings(ratings):
-        with open(RATINGS_FILE, "w", encoding="utf-8") as f:
-            json.dump(ratings, f, indent=4, ensure_ascii=False)
+        RatingRepository._store().replace(ratings)
 
     @staticmethod
     def rate_movie(user, movie_id, rating):
@@ -119,18 +375,79 @@ class RatingRepository:
         rating = 1 (like)
         rating = -1 (dislike)
         """
-        ratings = RatingRepository.load_ratings()
-
-        if user not in ratings:
-            ratings[user] = {}
+        RatingRepository._store().append([user, movie_id, rating])
+        return True
 
-        ratings[user][str(movie_id)] = rating
+    @staticmethod
+    def rate_movies(rows):
+        """Varias valoraciones (user, movie_id, rating) con una sola escritura al log."""
+        events = [[user, movie_id, rating] for user, movie_id, rating in rows]
+        RatingRepository._store().append_many(events)
+        return len(events)
 
-        RatingRepository.save_ratings(ratings)
-        return True
+    @staticmethod
+    def iter_ratings():
+        """(user, movie_id, rating) de todas las valoraciones."""
+        store = RatingRepository._store()
+        for user, user_ratings in list(store.state.ratings.items()):
+            for movie_id, rating in list(user_ratings.items()):
+                yield user, int(movie_id), rating
 
     @staticmethod
     def get_user_rating(user, movie_id):
-        ratings = RatingRepository.load_ratings()
-        user_ratings = ratings.get(user, {})
-        return user_ratings.get(str(movie_id), 0)
+        ratings = RatingRepository._store().state.ratings
+        return ratings.get(user, {}).get(str(movie_id), 0)
+
+    @staticmethod
+    def movie_stats(movie_id):
+        """{"movie_id", "likes", "dislikes", "score"} (score = cota inferior de Wilson)."""
+        return RatingRepository._store().state.aggregates.get(movie_id)
+
+    @staticmethod
+    def top_movies(limit=10):
+        """Las `limit` películas con mejor score, ya ordenadas."""
+        return RatingRepository._store().state.aggregates.top(limit)
+
+
+# ================================
+# TMDB TITLE CACHE
+# ================================
+class TitleRepository:
+    """
+    Cache persistente movie_id -> título para no volver a pedirlos a TMDB.
+    Se carga una vez y se mantiene en memoria.
+    """
+
+    _titles = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _load():
+        if TitleRepository._titles is None:
+            if os.path.exists(TITLES_FILE):
+                with metrics.timed("file_io"), open(TITLES_FILE, "r", encoding="utf-8") as f:
+                    TitleRepository._titles = json.load(f)
+            else:
+                TitleRepository._titles = {}
+        return TitleRepository._titles
+
+    @staticmethod
+    def get_titles(movie_ids):
+        with TitleRepository._lock:
+            titles = TitleRepository._load()
+            return {mid: titles[str(mid)] for mid in movie_ids if str(mid) in titles}
+
+    @staticmethod
+    def save_titles(new_titles):
+        if not new_titles:
+            return
+
+        with TitleRepository._lock:
+            titles = TitleRepository._load()
+            titles.update({str(mid): title for mid, title in new_titles.items()})
+
+            tmp = TITLES_FILE + ".tmp"
+            with metrics.timed("file_io"):
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(titles, f, ensure_ascii=False)
+                os.replace(tmp, TITLES_FILE)
@@ -0,0 +1,251 @@
+import atexit
+import json
+import os
+import shutil
+import threading
+import time
+
+import metrics
+
+# ---------------------------
+# CONFIG
+# ---------------------------
+FSYNC_BATCH = 64                # eventos por fsync como máximo
+FSYNC_INTERVAL = 0.05           # segundos que un evento puede esperar su fsync
+COMPACT_BYTES = 1024 * 1024     # tamaño del log que dispara la compactación
+
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _encode(event):
+    return (json.dumps(event, separators=(",", ":"), ensure_ascii=False) + "\n").encode("utf-8")
+
+
+# ================================
+# EVENT LOG
+# ================================
+class EventLog:
+    """
+    Estado persistido como snapshot JSON + log append-only (JSON Lines).
+
+    `state` es el objeto en memoria que se reconstruye con:
+      - state.reset(snapshot)   carga el snapshot
+      - state.apply(event)      aplica un evento
+      - state.snapshot()        copia serializable del estado actual
+
+    Los eventos deben ser asignaciones (idempotentes al re-aplicarse en orden),
+    lo que permite releer el log desde cualquier punto sin corromper el estado.
+    Se asume un único proceso escritor por log; otros procesos solo lo siguen
+    (refresh() aplica lo que se haya añadido al final).
+    """
+
+    def __init__(self, snapshot_path, state, log_path=None, fsync_batch=FSYNC_BATCH,
+                 fsync_interval=FSYNC_INTERVAL, compact_bytes=COMPACT_BYTES):
+        self.snapshot_path = snapshot_path
+        self.log_path = log_path or os.path.splitext(snapshot_path)[0] + ".log"
+        self.old_log_path = self.log_path + ".1"
+        self.state = state
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self.compact_bytes = compact_bytes
+
+        self.lock = threading.RLock()
+        self._file = None
+        self._loaded = False
+        self._offset = 0            # bytes del log ya aplicados al estado
+        self._log_id = None
+        self._snap_stamp = None
+        self._pending = 0           # eventos escritos pendientes de fsync
+        self._compacting = False
+        self._compactor = None
+        self._flusher = None
+
+        atexit.register(self.close)
+
+    # ---------------------------
+    # LECTURA
+    # ---------------------------
+    def _log_identity(self):
+        try:
+            st = os.stat(self.log_path)
+        except FileNotFoundError:
+            return None, 0
+        return (st.st_dev, st.st_ino), st.st_size
+
+    def _replay(self, path, offset):
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return offset
+
+        with metrics.timed("file_io"), f:
+            f.seek(offset)
+            data = f.read()
+
+        # Una última línea sin '\n' es una escritura a medias: se ignora
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            if not line:
+                continue
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            self.state.apply(event)
+        return offset + end
+
+    def load(self):
+        """Reconstruye el estado completo: snapshot + log rotado + log actual."""
+        with self.lock:
+            snapshot = {}
+            if os.path.exists(self.snapshot_path):
+                with metrics.timed("file_io"), open(self.snapshot_path, "r", encoding="utf-8") as f:
+                    snapshot = json.load(f)
+
+            self._snap_stamp = _stamp(self.snapshot_path)
+            self._log_id, _ = self._log_identity()
+            self.state.reset(snapshot)
+            self._replay(self.old_log_path, 0)
+            self._offset = self._replay(self.log_path, 0)
+            self._loaded = True
+
+    def refresh(self):
+        """
+        Sincroniza con el disco: recarga todo si cambió el snapshot o el log fue
+        rotado/truncado, o aplica solo la cola nueva del log si creció.
+        """
+        with self.lock:
+            log_id, log_size = self._log_identity()
+            if (not self._loaded
+                    or _stamp(self.snapshot_path) != self._snap_stamp
+                    or log_id != self._log_id
+                    or log_size < self._offset):
+                self.load()
+            elif log_size > self._offset:
+                self._offset = self._replay(self.log_path, self._offset)
+
+    # ---------------------------
+    # ESCRITURA
+    # ---------------------------
+    def _open(self):
+        self._file = open(self.log_path, "ab")
+        self._log_id, _ = self._log_identity()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.fsync_interval)
+            with self.lock:
+                if self._pending and self._file is not None:
+                    self._sync()
+
+    def append(self, event):
+        self.append_many([event])
+
+    def append_many(self, events):
+        """Escribe los eventos con una sola escritura y los aplica al estado."""
+        data = b"".join(_encode(e) for e in events)
+        if not data:
+            return
+
+        with self.lock:
+            with metrics.timed("file_io"):
+                if self._file is None:
+                    self._open()
+                self._file.write(data)
+                self._file.flush()
+
+            for event in events:
+                self.state.apply(event)
+
+            # fsync agrupado: inmediato al llenar el lote, si no lo hace el hilo de fondo
+            self._pending += len(events)
+            if self._pending >= self.fsync_batch:
+                with metrics.timed("file_io"):
+                    self._sync()
+            elif self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+                self._flusher.start()
+
+            if self._file.tell() >= self.compact_bytes and not self._compacting:
+                self._compacting = True
+                self._compactor = threading.Thread(target=self.compact, daemon=True)
+                self._compactor.start()
+
+    # ---------------------------
+    # SNAPSHOTS
+    # ---------------------------
+    def _write_snapshot(self, snapshot):
+        tmp = self.snapshot_path + ".tmp"
+        with metrics.timed("file_io"):
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, indent=4, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.snapshot_path)
+
+    def _rotate(self):
+        if self._file is not None:
+            self._sync()
+            self._file.close()
+            self._file = None
+
+        if os.path.exists(self.log_path):
+            if os.path.exists(self.old_log_path):
+                # Quedó un log rotado de una compactación interrumpida: se conservan ambos
+                with open(self.old_log_path, "ab") as dst, open(self.log_path, "rb") as src:
+                    shutil.copyfileobj(src, dst)
+                os.remove(self.log_path)
+            else:
+                os.replace(self.log_path, self.old_log_path)
+
+        self._log_id = None
+        self._offset = 0
+
+    def compact(self):
+        """
+        Vuelca el estado a un snapshot nuevo (temp + rename) y descarta el log.
+        Los escritores solo esperan mientras se copia el estado y se rota el log.
+        """
+        try:
+            with self.lock:
+                self.refresh()
+                snapshot = self.state.snapshot()
+                self._rotate()
+
+            self._write_snapshot(snapshot)
+
+            with self.lock:
+                self._snap_stamp = _stamp(self.snapshot_path)
+                if os.path.exists(self.old_log_path):
+                    os.remove(self.old_log_path)
+        finally:
+            self._compacting = False
+
+    def replace(self, snapshot):
+        """Sustituye todo el estado (equivale a reescribir el fichero)."""
+        with self.lock:
+            self._rotate()
+            self._write_snapshot(snapshot)
+            if os.path.exists(self.old_log_path):
+                os.remove(self.old_log_path)
+            self.state.reset(snapshot)
+            self._snap_stamp = _stamp(self.snapshot_path)
+            self._loaded = True
+
+    def close(self):
+        with self.lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+
+import metrics
+
+# ---------------------------
+# CONFIG
+# ---------------------------
+FRAGMENT_MAXSIZE = 512          # fragmentos renderizados en memoria
+BYTECODE_DIR = os.path.join("data", "jinja_cache")
+
+# Hueco que deja likes() en el HTML cacheado; el autoescape impide que
+# aparezca a partir de datos de TMDB
+_HOLE_RE = re.compile(r"<!--likes:(\d+)-->")
+
+
+def data_version(data):
+    """Versión de los datos de origen: hash de su JSON (cambia si cambia cualquier campo)."""
+    raw = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def bytecode_cache(directory=BYTECODE_DIR):
+    """Plantillas compiladas en disco: un worker nuevo no vuelve a compilarlas."""
+    os.makedirs(directory, exist_ok=True)
+    return FileSystemBytecodeCache(directory)
+
+
+# ================================
+# FRAGMENT
+# ================================
+class Fragment:
+    """HTML renderizado partido por los huecos de likes: [texto, id, texto, id, ..., texto]."""
+
+    __slots__ = ("parts",)
+
+    def __init__(self, html):
+        parts = _HOLE_RE.split(html)
+        for i in range(1, len(parts), 2):
+            parts[i] = int(parts[i])
+        self.parts = parts
+
+    @property
+    def movie_ids(self):
+        return self.parts[1::2]
+
+    def fill(self, counts):
+        """Pega el contador de cada película (0 si no está en `counts`)."""
+        parts = self.parts
+        out = [parts[0]]
+        for i in range(1, len(parts), 2):
+            out.append(str(counts.get(parts[i], 0)))
+            out.append(parts[i + 1])
+        return Markup("".join(out))
+
+
+# ================================
+# FRAGMENT CACHE
+# ================================
+class FragmentCache:
+    """
+    Bloques de plantilla que son iguales para todos los usuarios (rejilla de
+    películas, ficha de una película). La clave la da quien llama: nombre de
+    la plantilla + idioma + versión de los datos. Lo que cambia por usuario o
+    por like se deja fuera o como hueco (likes()).
+    """
+
+    def __init__(self, templates, maxsize=FRAGMENT_MAXSIZE):
+        self.templates = templates
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, template_name, key, **context):
+        key = (template_name, key)
+        with self._lock:
+            fragment = self._data.get(key)
+            if fragment is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return fragment
+            self.misses += 1
+
+        with metrics.timed("template"):
+            html = self.templates.get_template(template_name).render(likes=_hole, **context)
+        fragment = Fragment(html)
+
+        with self._lock:
+            self._data[key] = fragment
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return fragment
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._data), "maxsize": self.maxsize,
+                    "hits": self.hits, "misses": self.misses}
+
+
+def _hole(movie_id):
+    return Markup(f"<!--likes:{int(movie_id)}-->")
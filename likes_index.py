@@ -0,0 +1,106 @@
+from collections import Counter
+
+from event_log import EventLog
+
+
+# ================================
+# LIKES INDEX
+# ================================
+class LikesIndex:
+    """
+    Índice en memoria de likes:
+      - movie_id -> número de likes
+      - usuario  -> ids que le gustan (dict usado como set ordenado)
+
+    Es el estado de un EventLog: se carga una vez (snapshot + log), cada
+    like/unlike se añade al log en O(1) y actualiza el índice, y si los
+    ficheros cambian en disco se reconstruye.
+    """
+
+    def __init__(self, path, log_path=None, **log_options):
+        self._counts = Counter()
+        self._by_user = {}
+        self.log = EventLog(path, self, log_path=log_path, **log_options)
+
+    def refresh(self):
+        self.log.refresh()
+
+    # ---------------------------
+    # ESTADO (interfaz de EventLog)
+    # ---------------------------
+    def reset(self, likes):
+        self._by_user = {user: dict.fromkeys(ids) for user, ids in likes.items()}
+        self._counts = Counter(mid for ids in self._by_user.values() for mid in ids)
+
+    def apply(self, event):
+        op, user, movie_id = event
+        ids = self._by_user.setdefault(user, {})
+
+        if op == "+" and movie_id not in ids:
+            ids[movie_id] = None
+            self._counts[movie_id] += 1
+        elif op == "-" and movie_id in ids:
+            del ids[movie_id]
+            self._counts[movie_id] -= 1
+            if not self._counts[movie_id]:
+                del self._counts[movie_id]
+
+    def snapshot(self):
+        return {user: list(ids) for user, ids in self._by_user.items()}
+
+    # ---------------------------
+    # LECTURAS
+    # ---------------------------
+    def count(self, movie_id):
+        self.refresh()
+        return self._counts.get(movie_id, 0)
+
+    def counts(self, movie_ids):
+        self.refresh()
+        counts = self._counts
+        return {mid: counts.get(mid, 0) for mid in movie_ids}
+
+    def has_liked(self, user, movie_id):
+        self.refresh()
+        return movie_id in self._by_user.get(user, ())
+
+    def as_dict(self):
+        with self.log.lock:
+            self.refresh()
+            return self.snapshot()
+
+    # ---------------------------
+    # ESCRITURAS
+    # ---------------------------
+    def like(self, user, movie_id):
+        with self.log.lock:
+            if self.has_liked(user, movie_id):
+                return False
+            self.log.append(["+", user, movie_id])
+            return True
+
+    def like_many(self, pairs):
+        """Likes (user, movie_id) en una sola escritura al log; devuelve los que eran nuevos."""
+        with self.log.lock:
+            self.refresh()
+            new, seen = [], set()
+            for user, movie_id in pairs:
+                if (user, movie_id) not in seen and movie_id not in self._by_user.get(user, ()):
+                    seen.add((user, movie_id))
+                    new.append(["+", user, movie_id])
+            self.log.append_many(new)
+            return [(user, movie_id) for _, user, movie_id in new]
+
+    def iter_likes(self):
+        """(user, movie_id) de todos los likes, sin copiar el índice."""
+        self.refresh()
+        for user, ids in list(self._by_user.items()):
+            for movie_id in list(ids):
+                yield user, movie_id
+
+    def unlike(self, user, movie_id):
+        with self.log.lock:
+            if not self.has_liked(user, movie_id):
+                return False
+            self.log.append(["-", user, movie_id])
+            return True
@@ -0,0 +1,342 @@
+import bisect
+import contextvars
+import heapq
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from fastapi.templating import Jinja2Templates
+
+# ---------------------------
+# CONFIG
+# ---------------------------
+# Límites superiores de los buckets (segundos), como los de Prometheus
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PARTS = ("wall", "upstream", "file_io", "template")
+
+# Perfilador por muestreo: desactivado salvo CINE_PROFILE=1
+PROFILE_ENABLED = os.environ.get("CINE_PROFILE") == "1"
+PROFILE_INTERVAL = 0.005        # segundos entre muestras
+PROFILE_SLOWEST = 10            # peticiones más lentas que se conservan
+PROFILE_MAX_SAMPLES = 20000     # muestras en el buffer circular
+PROFILE_MAX_DEPTH = 40
+
+_REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+# ================================
+# HISTOGRAM
+# ================================
+class Histogram:
+    """Histograma de buckets fijos: registrar es un bisect y dos sumas."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)     # el último es +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Estimación interpolando dentro del bucket (como histogram_quantile)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum * 1000, 3),
+            "mean_ms": round(self.sum / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.50) * 1000, 3),
+            "p95_ms": round(self.quantile(0.95) * 1000, 3),
+            "p99_ms": round(self.quantile(0.99) * 1000, 3),
+        }
+
+
+class RouteMetrics:
+
+    def __init__(self):
+        self.hist = {part: Histogram() for part in PARTS}
+        self.requests = 0
+        self.errors = 0
+        self.upstream_calls = 0
+
+
+# ================================
+# MEDICIÓN POR PETICIÓN
+# ================================
+class RequestTimings:
+    """Tiempos acumulados de una petición (los hooks suman aquí)."""
+
+    __slots__ = ("started", "upstream", "upstream_calls", "file_io", "template", "threads", "_lock")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.upstream = 0.0
+        self.upstream_calls = 0
+        self.file_io = 0.0
+        self.template = 0.0
+        self.threads = set()
+        self._lock = threading.Lock()
+
+    def add(self, kind, elapsed):
+        # admin resuelve títulos en varios hilos a la vez
+        with self._lock:
+            setattr(self, kind, getattr(self, kind) + elapsed)
+            if kind == "upstream":
+                self.upstream_calls += 1
+            self.threads.add(threading.get_ident())
+
+
+_current = contextvars.ContextVar("request_timings", default=None)
+
+
+def current():
+    return _current.get()
+
+
+def detached_context():
+    """Copia del contexto sin la petición en curso (para tareas de fondo: no cuentan en la ruta)."""
+    ctx = contextvars.copy_context()
+    ctx.run(_current.set, None)
+    return ctx
+
+
+@contextmanager
+def timed(kind):
+    """
+    Suma la duración del bloque a la petición en curso ("upstream", "file_io"
+    o "template"). Fuera de una petición (tareas de fondo, CLI) no hace nada.
+    """
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(kind, time.perf_counter() - started)
+
+
+class TimedTemplates(Jinja2Templates):
+    """Jinja2Templates que mide el render (TemplateResponse renderiza al crearse)."""
+
+    def TemplateResponse(self, *args, **kwargs):
+        with timed("template"):
+            return super().TemplateResponse(*args, **kwargs)
+
+
+# ================================
+# REGISTRY
+# ================================
+class MetricsRegistry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes = {}
+        self.started_at = time.time()
+
+    def record(self, route, timings, wall, status):
+        with self._lock:
+            m = self.routes.get(route)
+            if m is None:
+                m = self.routes[route] = RouteMetrics()
+            m.requests += 1
+            if status >= 500:
+                m.errors += 1
+            m.upstream_calls += timings.upstream_calls
+            m.hist["wall"].observe(wall)
+            m.hist["upstream"].observe(timings.upstream)
+            m.hist["file_io"].observe(timings.file_io)
+            m.hist["template"].observe(timings.template)
+
+    def reset(self):
+        with self._lock:
+            self.routes = {}
+            self.started_at = time.time()
+
+    def snapshot(self):
+        with self._lock:
+            routes = {}
+            for route, m in sorted(self.routes.items()):
+                routes[route] = {
+                    "requests": m.requests,
+                    "errors": m.errors,
+                    "upstream_calls": m.upstream_calls,
+                    **{part: h.summary() for part, h in m.hist.items()},
+                }
+        return {"uptime_s": round(time.time() - self.started_at, 1), "routes": routes}
+
+    def prometheus(self):
+        """Formato de texto de Prometheus (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            routes = sorted(self.routes.items())
+            for part in PARTS:
+                name = "cine_request_seconds" if part == "wall" else f"cine_request_{part}_seconds"
+                lines.append(f"# TYPE {name} histogram")
+                for route, m in routes:
+                    h = m.hist[part]
+                    labels = f'route="{_escape(route)}"'
+                    cumulative = 0
+                    for bound, n in zip(h.buckets, h.counts):
+                        cumulative += n
+                        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {h.count}')
+                    lines.append(f"{name}_sum{{{labels}}} {h.sum:.6f}")
+                    lines.append(f"{name}_count{{{labels}}} {h.count}")
+
+            for name, attr in (("cine_upstream_calls_total", "upstream_calls"),
+                               ("cine_request_errors_total", "errors")):
+                lines.append(f"# TYPE {name} counter")
+                for route, m in routes:
+                    lines.append(f'{name}{{route="{_escape(route)}"}} {getattr(m, attr)}')
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+registry = MetricsRegistry()
+
+
+# ================================
+# SAMPLING PROFILER (OPCIONAL)
+# ================================
+class SamplingProfiler:
+    """
+    Un hilo toma cada PROFILE_INTERVAL la pila de los hilos que están en código
+    de la app. Al acabar una petición lenta se guardan sus muestras (las de sus
+    hilos dentro de su intervalo) agrupadas en formato "collapsed" de flamegraph.
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL, keep=PROFILE_SLOWEST):
+        self.interval = interval
+        self.keep = keep
+        self._samples = deque(maxlen=PROFILE_MAX_SAMPLES)   # (t, thread_id, pila)
+        self._slowest = []                                  # heap (wall, n, informe)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="cine-profiler", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            now = time.perf_counter()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                stack = _app_stack(frame)
+                if stack:
+                    self._samples.append((now, thread_id, stack))
+
+    def finish(self, route, timings, wall):
+        with self._lock:
+            if len(self._slowest) >= self.keep and wall <= self._slowest[0][0]:
+                return
+
+        stacks = {}
+        for t, thread_id, stack in list(self._samples):
+            if t >= timings.started and thread_id in timings.threads:
+                stacks[stack] = stacks.get(stack, 0) + 1
+
+        report = {
+            "route": route,
+            "wall_ms": round(wall * 1000, 3),
+            "at": time.time(),
+            "samples": sum(stacks.values()),
+            "stacks": [f"{stack} {n}" for stack, n in sorted(stacks.items(), key=lambda s: -s[1])],
+        }
+        with self._lock:
+            entry = (wall, next(self._seq), report)
+            if len(self._slowest) < self.keep:
+                heapq.heappush(self._slowest, entry)
+            else:
+                heapq.heappushpop(self._slowest, entry)
+
+    def slowest(self):
+        with self._lock:
+            return [report for _, _, report in sorted(self._slowest, reverse=True)]
+
+
+def _app_stack(frame):
+    """'modulo:funcion;...' de raíz a hoja, o None si el hilo no pasa por la app."""
+    names = []
+    in_app = False
+    while frame is not None and len(names) < PROFILE_MAX_DEPTH:
+        code = frame.f_code
+        in_app = in_app or (code.co_filename.startswith(_REPO_ROOT) and code.co_filename != __file__)
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names)) if in_app else None
+
+
+profiler = SamplingProfiler() if PROFILE_ENABLED else None
+
+
+# ================================
+# MIDDLEWARE
+# ================================
+class MetricsMiddleware:
+    """
+    Middleware ASGI: mide cada petición HTTP y la agrega por plantilla de ruta
+    ("GET /movie/{movie_id}"), no por URL, para que el número de series sea fijo.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        if profiler is not None:
+            profiler.start()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        timings = RequestTimings()
+        timings.threads.add(threading.get_ident())     # handlers async: hilo del event loop
+        token = _current.set(timings)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            wall = time.perf_counter() - timings.started
+            route = getattr(scope.get("route"), "path", None) or "other"
+            route = f"{scope['method']} {route}"
+            registry.record(route, timings, wall, status)
+            if profiler is not None:
+                profiler.finish(route, timings, wall)
@@ -0,0 +1,208 @@
+import hashlib
+import os
+import re
+import threading
+from functools import lru_cache
+from html import escape
+
+import requests
+from fastapi import APIRouter, HTTPException, Request, Response
+from starlette.background import BackgroundTask
+
+import metrics
+from data_base import DATA_DIR
+from static_assets import SendfileResponse
+from storage import CustomMovieRepository, run_io
+from tmdb_client import atmdb
+
+router = APIRouter(prefix="/posters")
+
+# ---------------------------
+# CONFIG
+# ---------------------------
+POSTER_DIR = os.path.join(DATA_DIR, "posters")
+SIZES = {"w300": (300, 450), "w500": (500, 750)}    # las que usan las plantillas
+PLACEHOLDER_URL = "/posters/w300/none.svg"
+LEGACY_PLACEHOLDER = "https://via.placeholder.com/"
+IMMUTABLE = "public, max-age=31536000, immutable"   # los paths de TMDB no cambian de contenido
+PLACEHOLDER_CACHE = "public, max-age=86400"
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9_-]+\.(jpg|jpeg|png|webp)$")
+
+
+# ================================
+# CONTENT-ADDRESSED DISK CACHE
+# ================================
+class PosterCache:
+    """
+    Pósters descargados una sola vez:
+
+      objects/ab/abcd...jpg   contenido, nombrado por su sha256 (idénticos = un fichero)
+      refs/w300/xyz.jpg       el sha256 del póster "xyz.jpg" en tamaño w300
+
+    El sha256 es también el ETag. Las referencias ya leídas quedan en memoria.
+    """
+
+    def __init__(self, root=POSTER_DIR):
+        self.root = root
+        self._refs = {}         # (size, name) -> digest
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "fetched_bytes": 0, "errors": 0}
+
+    def _object_path(self, digest, name):
+        ext = os.path.splitext(name)[1]
+        return os.path.join(self.root, "objects", digest[:2], digest + ext)
+
+    def _ref_path(self, size, name):
+        return os.path.join(self.root, "refs", size, name)
+
+    def lookup(self, size, name):
+        """(ruta, digest) si está en disco, si no None."""
+        digest = self._refs.get((size, name))
+        if digest is None:
+            try:
+                with metrics.timed("file_io"), open(self._ref_path(size, name), encoding="ascii") as f:
+                    digest = f.read().strip()
+            except FileNotFoundError:
+                return None
+        path = self._object_path(digest, name)
+        if not os.path.exists(path):
+            return None
+        with self._lock:
+            self._refs[(size, name)] = digest
+        return path, digest
+
+    def store(self, size, name, data):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest, name)
+        with metrics.timed("file_io"):
+            if not os.path.exists(path):
+                _write_atomic(path, data)
+            _write_atomic(self._ref_path(size, name), digest.encode("ascii"))
+        with self._lock:
+            self._refs[(size, name)] = digest
+            self.stats["fetched_bytes"] += len(data)
+        return path, digest
+
+    async def fetch(self, size, name):
+        data = await atmdb.image(size, name)
+        return await run_io(self.store, size, name, data)
+
+    async def warm(self, name, sizes=SIZES):
+        """Descarga en segundo plano los demás tamaños de un póster recién pedido."""
+        for size in sizes:
+            if await run_io(self.lookup, size, name) is None:
+                try:
+                    await self.fetch(size, name)
+                except requests.RequestException:
+                    pass
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+# Instancia que usa el router
+poster_cache = PosterCache()
+
+
+# ================================
+# RESPUESTAS
+# ================================
+def etag_matches(request, etag):
+    return etag in (t.strip() for t in request.headers.get("if-none-match", "").split(","))
+
+
+def placeholder_svg(size, title=""):
+    width, height = SIZES[size]
+    label = escape(title[:28] + ("…" if len(title) > 28 else "")) if title else "Sin imagen"
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}">'
+        f'<rect width="100%" height="100%" fill="#2b2b3a"/>'
+        f'<text x="50%" y="50%" fill="#e0e0e0" font-family="sans-serif" font-size="{width // 14}" '
+        f'text-anchor="middle" dominant-baseline="middle">{label}</text></svg>'
+    ).encode("utf-8")
+
+
+@lru_cache(maxsize=1024)
+def _placeholder(size, title):
+    body = placeholder_svg(size, title)
+    return body, '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def svg_response(request, size, title="", cache_control=PLACEHOLDER_CACHE):
+    body, etag = _placeholder(size, title)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="image/svg+xml", headers=headers)
+
+
+def poster_url(movie, size="w300"):
+    """URL local del póster de una película (helper de las plantillas)."""
+    if movie.get("poster_path"):
+        return f"/posters/{size}{movie['poster_path']}"
+    poster = movie.get("poster")
+    if poster and not poster.startswith(LEGACY_PLACEHOLDER) and not poster.startswith("/posters/"):
+        return poster        # URL que puso el usuario al crear la película
+    # Propias y de TMDB comparten ids: solo la marca "custom" (la pone el
+    # catálogo) dice que es propia
+    if movie.get("custom"):
+        return f"/posters/{size}/custom/{movie['id']}.svg"
+    return f"/posters/{size}/none.svg"
+
+
+# ================================
+# RUTAS
+# ================================
+def _check_size(size):
+    if size not in SIZES:
+        raise HTTPException(status_code=404, detail="Unknown poster size")
+
+
+@router.get("/{size}/none.svg")
+async def no_poster(request: Request, size: str):
+    _check_size(size)
+    return svg_response(request, size)
+
+
+@router.get("/{size}/custom/{movie_id}.svg")
+async def custom_poster(request: Request, size: str, movie_id: int):
+    """Cartel generado con el título de una película propia."""
+    _check_size(size)
+    movie = await run_io(CustomMovieRepository.get_movie, movie_id)
+    if movie is None:
+        raise HTTPException(status_code=404, detail="Movie not found")
+    return svg_response(request, size, movie.get("title") or "")
+
+
+@router.get("/{size}/{name}")
+async def tmdb_poster(request: Request, size: str, name: str):
+    _check_size(size)
+    if not _NAME_RE.match(name):
+        raise HTTPException(status_code=404, detail="Invalid poster name")
+
+    found = await run_io(poster_cache.lookup, size, name)
+    background = None
+    if found is None:
+        poster_cache.stats["misses"] += 1
+        try:
+            found = await poster_cache.fetch(size, name)
+        except requests.RequestException:
+            # TMDB caído o póster inexistente: cartel genérico, sin cachear
+            poster_cache.stats["errors"] += 1
+            return svg_response(request, size, cache_control="no-store")
+        background = BackgroundTask(poster_cache.warm, name, [s for s in SIZES if s != size])
+    else:
+        poster_cache.stats["hits"] += 1
+
+    path, digest = found
+    headers = {"ETag": f'"{digest}"', "Cache-Control": IMMUTABLE}
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers, background=background)
+    return SendfileResponse(path, headers=headers, stat_result=os.stat(path), background=background)
@@ -0,0 +1,97 @@
+import bisect
+import math
+import threading
+
+# ---------------------------
+# CONFIG
+# ---------------------------
+WILSON_Z = 1.96             # confianza del 95 %
+
+
+def wilson_lower_bound(likes, dislikes, z=WILSON_Z):
+    """
+    Cota inferior del intervalo de Wilson para la proporción de likes: una
+    película con 9 de 10 queda por debajo de otra con 900 de 1000.
+    """
+    n = likes + dislikes
+    if n == 0:
+        return 0.0
+    p = likes / n
+    z2 = z * z
+    return (p + z2 / (2 * n) - z * math.sqrt((p * (1 - p) + z2 / (4 * n)) / n)) / (1 + z2 / n)
+
+
+def rank_key(movie_id, likes, score):
+    # Mejor puntuación primero; a igualdad, más likes y luego id menor
+    return (-score, -likes, movie_id)
+
+
+def as_stats(movie_id, likes, dislikes, score):
+    return {"movie_id": movie_id, "likes": likes, "dislikes": dislikes, "score": round(score, 6)}
+
+
+# ================================
+# AGGREGATES + RANKING
+# ================================
+class RatingAggregates:
+    """
+    likes / dislikes / Wilson por película, al día con cada valoración.
+
+    El ranking es una lista ordenada de rank_key: cada cambio saca la clave
+    vieja e inserta la nueva con bisect (O(log n) + un memmove), así que
+    top(k) es un slice y no depende del número de valoraciones.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}       # movie_id -> [likes, dislikes]
+        self._ranking = []      # rank_key ordenadas
+
+    def reset(self, ratings):
+        """Reconstruye a partir de user -> {movie_id: rating}."""
+        counts = {}
+        for user_ratings in ratings.values():
+            for movie_id, rating in user_ratings.items():
+                c = counts.setdefault(int(movie_id), [0, 0])
+                c[0 if rating > 0 else 1] += 1
+        with self._lock:
+            self._counts = counts
+            self._ranking = sorted(rank_key(mid, l, wilson_lower_bound(l, d)) for mid, (l, d) in counts.items())
+
+    def update(self, movie_id, old, new):
+        """Aplica el paso de una valoración de `old` a `new` (0 = sin valorar)."""
+        if old == new:
+            return
+        movie_id = int(movie_id)
+        with self._lock:
+            c = self._counts.get(movie_id)
+            if c is None:
+                c = self._counts[movie_id] = [0, 0]
+            else:
+                self._remove(rank_key(movie_id, c[0], wilson_lower_bound(*c)))
+            if old:
+                c[0 if old > 0 else 1] -= 1
+            if new:
+                c[0 if new > 0 else 1] += 1
+            if c[0] or c[1]:
+                bisect.insort(self._ranking, rank_key(movie_id, c[0], wilson_lower_bound(*c)))
+            else:
+                del self._counts[movie_id]
+
+    def _remove(self, key):
+        i = bisect.bisect_left(self._ranking, key)
+        if i < len(self._ranking) and self._ranking[i] == key:
+            del self._ranking[i]
+
+    def get(self, movie_id):
+        with self._lock:
+            likes, dislikes = self._counts.get(int(movie_id), (0, 0))
+        return as_stats(int(movie_id), likes, dislikes, wilson_lower_bound(likes, dislikes))
+
+    def top(self, limit=10):
+        with self._lock:
+            return [as_stats(movie_id, -neg_likes, self._counts[movie_id][1], -neg_score)
+                    for neg_score, neg_likes, movie_id in self._ranking[:limit]]
+
+    def __len__(self):
+        return len(self._counts)
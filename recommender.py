@@ -0,0 +1,250 @@
+import heapq
+import math
+import threading
+from collections import Counter
+
+# ---------------------------
+# CONFIG
+# ---------------------------
+TOP_K = 20                  # vecinos precalculados por película
+MAX_USER_ITEMS = 200        # películas por usuario que cuentan en la co-ocurrencia
+STALE_BATCH = 4             # listas incompletas que se recalculan tras cada evento
+
+
+# ================================
+# ITEM-ITEM RECOMMENDER
+# ================================
+class ItemRecommender:
+    """
+    Recomendador item-item por similitud coseno sobre la matriz usuario x película
+    (binaria: like o valoración positiva).
+
+      co[i][j] = usuarios que tienen i y j   (co[i][i] = usuarios que tienen i)
+      sim(i,j) = co[i][j] / sqrt(co[i][i] * co[j][j])
+
+    La matriz se guarda dispersa (un Counter por película) y para cada película
+    se precalcula un prefijo exacto de su ranking de vecinos (hasta 2*K, se
+    sirven K). Cada señal nueva solo toca las filas de las películas de ese
+    usuario; una lista se recalcula entera solo si se queda con menos de K
+    vecinos seguros (STALE_BATCH por evento).
+    """
+
+    def __init__(self, top_k=TOP_K):
+        self.top_k = top_k
+        self.depth = 2 * top_k
+        self._lock = threading.RLock()
+        self._users = {}        # usuario -> {movie_id: {fuentes}}
+        self._co = {}           # movie_id -> Counter(movie_id -> usuarios en común)
+        self._top = {}          # movie_id -> [(movie_id, score)] ordenada
+        self._listed_in = {}    # movie_id -> {películas en cuya lista aparece}
+        self._stale = {}        # movie_ids pendientes de recalcular (dict = set ordenado)
+
+    # ---------------------------
+    # CONSTRUCCIÓN
+    # ---------------------------
+    def build(self, signals):
+        """
+        Reconstruye todo a partir de (usuario, movie_id, fuente).
+        Las co-ocurrencias se cuentan con Counter.update, que itera en C.
+        """
+        users = {}
+        for user, movie_id, source in signals:
+            users.setdefault(user, {}).setdefault(movie_id, set()).add(source)
+
+        co = {}
+        for items in users.values():
+            ids = list(items)[:MAX_USER_ITEMS]
+            for i in ids:
+                row = co.get(i)
+                if row is None:
+                    row = co[i] = Counter()
+                row.update(ids)
+
+        with self._lock:
+            self._users = users
+            self._co = co
+            self._top = {}
+            self._listed_in = {}
+            self._stale = {}
+            for movie_id in co:
+                self._set_top(movie_id, self._compute(movie_id))
+
+    def _score(self, i, j):
+        together = self._co[i].get(j, 0)
+        return together / math.sqrt(self._co[i][i] * self._co[j][j]) if together else 0.0
+
+    def _compute(self, movie_id):
+        row = self._co.get(movie_id)
+        if not row:
+            return []
+        own = row[movie_id]
+        # Orden: puntuación descendente y, a igualdad, id ascendente
+        best = heapq.nsmallest(self.depth, (
+            (-c / math.sqrt(own * self._co[j][j]), j) for j, c in row.items() if j != movie_id
+        ))
+        return [(j, -neg) for neg, j in best]
+
+    def _set_top(self, movie_id, top):
+        for j, _ in self._top.get(movie_id, ()):
+            self._listed_in[j].discard(movie_id)
+        for j, _ in top:
+            self._listed_in.setdefault(j, set()).add(movie_id)
+        if top:
+            self._top[movie_id] = top
+        else:
+            self._top.pop(movie_id, None)
+
+    def _recompute(self, movie_id):
+        self._set_top(movie_id, self._compute(movie_id))
+        self._stale.pop(movie_id, None)
+
+    def _upsert(self, movie_id, neighbour):
+        """
+        Recoloca `neighbour` en la lista de movie_id tras cambiar su puntuación
+        (O(K)). La lista sigue siendo un prefijo exacto del ranking: si el vecino
+        queda por debajo del último y hay vecinos fuera de la lista, se quita.
+        """
+        row = self._co.get(movie_id)
+        top = self._top.get(movie_id, [])
+        others = len(row) - 1 - (neighbour in row) if row else 0     # vecinos distintos de neighbour
+        score = self._score(movie_id, neighbour) if row else 0.0
+        listed = movie_id in self._listed_in.get(neighbour, ())
+
+        rest = [e for e in top if e[0] != neighbour] if listed else top
+        complete = len(rest) == others
+        if score and (complete or (-score, neighbour) < (-rest[-1][1], rest[-1][0])):
+            rest = sorted(rest + [(neighbour, score)], key=lambda e: (-e[1], e[0]))
+            self._listed_in.setdefault(neighbour, set()).add(movie_id)
+            if len(rest) > self.depth:
+                self._listed_in[rest.pop()[0]].discard(movie_id)
+        elif listed:
+            self._listed_in[neighbour].discard(movie_id)
+        else:
+            return      # no entra: el caso más habitual, sin tocar nada
+
+        if rest:
+            self._top[movie_id] = rest
+        else:
+            self._top.pop(movie_id, None)
+        if len(rest) < self.top_k and len(rest) < len(row or ()) - 1:
+            self._stale[movie_id] = None
+
+    # ---------------------------
+    # ACTUALIZACIÓN INCREMENTAL
+    # ---------------------------
+    # Cuando un usuario con películas `ids` gana o pierde movie_id solo cambian
+    # co[movie_id][j] (j en ids) y co[movie_id][movie_id]:
+    #   - lista de movie_id: se recalcula entera.
+    #   - lista de j en ids: cambia solo la puntuación de movie_id.
+    #   - lista del resto de vecinos: la puntuación de movie_id baja un poco
+    #     (alta; solo importa donde ya aparece) o sube (baja).
+    def _user_ids(self, user):
+        return list(self._users.get(user, {}))[:MAX_USER_ITEMS]
+
+    def add(self, user, movie_id, source="like"):
+        with self._lock:
+            items = self._users.setdefault(user, {})
+            sources = items.get(movie_id)
+            if sources:
+                sources.add(source)
+                return
+            items[movie_id] = {source}
+
+            ids = self._user_ids(user)
+            if movie_id not in ids:
+                return
+            self._admit(movie_id, ids)
+            self._refresh_stale()
+
+    def remove(self, user, movie_id, source="like"):
+        with self._lock:
+            items = self._users.get(user, {})
+            sources = items.get(movie_id)
+            if not sources or source not in sources:
+                return
+            sources.discard(source)
+            if sources:
+                return
+
+            ids = self._user_ids(user)
+            del items[movie_id]
+            if not items:
+                del self._users[user]
+            if movie_id not in ids:
+                return
+
+            row = self._co[movie_id]
+            for j in ids:
+                self._decrement(row, j)
+                if j != movie_id:
+                    self._decrement(self._co[j], movie_id)
+            if not row:
+                del self._co[movie_id]
+
+            affected = set(ids) | set(row)
+            affected.discard(movie_id)
+            for j in affected:
+                self._upsert(j, movie_id)
+            self._recompute(movie_id)
+
+            # Si el usuario tenía más de MAX_USER_ITEMS, la siguiente entra en la
+            # ventana: se suman sus pares como en add()
+            window = self._user_ids(user)
+            if len(window) == MAX_USER_ITEMS:
+                self._admit(window[-1], window)
+            self._refresh_stale()
+
+    def _admit(self, movie_id, ids):
+        row = self._co.setdefault(movie_id, Counter())
+        for j in ids:
+            row[j] += 1
+            if j != movie_id:
+                self._co.setdefault(j, Counter())[movie_id] += 1
+
+        self._recompute(movie_id)
+        affected = set(ids) | self._listed_in.get(movie_id, set())
+        affected.discard(movie_id)
+        for j in affected:
+            self._upsert(j, movie_id)
+
+    @staticmethod
+    def _decrement(row, key):
+        row[key] -= 1
+        if row[key] <= 0:
+            del row[key]
+
+    def _refresh_stale(self, limit=STALE_BATCH):
+        for _ in range(min(limit, len(self._stale))):
+            self._recompute(next(iter(self._stale)))
+
+    # ---------------------------
+    # CONSULTAS
+    # ---------------------------
+    def similar(self, movie_id, k=None):
+        """Vecinos precalculados: [(movie_id, score)]. O(k), sin tocar la matriz."""
+        k = min(k or self.top_k, self.top_k)
+        return [(j, round(score, 6)) for j, score in self._top.get(movie_id, [])[:k]]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "users": len(self._users),
+                "movies": len(self._co),
+                "pairs": sum(len(row) - 1 for row in self._co.values()),
+                "stale": len(self._stale),
+            }
+
+
+def signals_from(likes, ratings):
+    """(usuario, movie_id, fuente) desde likes.json y las valoraciones positivas."""
+    for user, ids in likes.items():
+        for movie_id in ids:
+            yield user, int(movie_id), "like"
+    for user, user_ratings in ratings.items():
+        for movie_id, rating in user_ratings.items():
+            if rating > 0:
+                yield user, int(movie_id), "rating"
+
+
+# Instancia compartida por app.py y api.py
+recommender = ItemRecommender()
@@ -0,0 +1,153 @@
+import asyncio
+import random
+import threading
+import time
+
+import requests
+
+# ---------------------------
+# CONFIG
+# ---------------------------
+BACKOFF_BASE = 0.2          # segundos; el techo se dobla en cada reintento
+BACKOFF_MAX = 2.0
+RETRY_AFTER_MAX = 5.0       # Retry-After más largo que esto: no se reintenta
+
+
+class UpstreamUnavailable(requests.ConnectionError):
+    """No se llega a llamar: circuito abierto o cola del limitador demasiado larga."""
+
+
+# ================================
+# TOKEN BUCKET
+# ================================
+class TokenBucket:
+    """
+    Limitador de `rate` peticiones/s con ráfagas de hasta `burst`. Cada
+    llamada reserva un token (el saldo puede quedar negativo: es la cola) y
+    espera lo que le toca; si la espera pasa de `max_wait` devuelve el token
+    y lanza UpstreamUnavailable en vez de encolarse.
+    """
+
+    def __init__(self, rate, burst, max_wait=1.0):
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.stats = {"acquired": 0, "waited": 0, "rejected": 0}
+
+    def _reserve(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if wait > self.max_wait:
+                self.stats["rejected"] += 1
+                raise UpstreamUnavailable(f"límite de {self.rate} peticiones/s: cola de {wait:.1f} s")
+            self._tokens -= 1
+            self.stats["acquired"] += 1
+            if wait:
+                self.stats["waited"] += 1
+            return wait
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        wait = self._reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+
+# ================================
+# CIRCUIT BREAKER
+# ================================
+class CircuitBreaker:
+    """
+    closed -> open tras `threshold` fallos seguidos; open rechaza todo durante
+    `reset_timeout` s; luego half_open deja pasar una sola petición de prueba,
+    que lo cierra si va bien o lo vuelve a abrir si falla. Si la prueba no
+    termina (cancelada, o record(None)) o tarda más de `trial_timeout` s, se
+    permite otra.
+    """
+
+    def __init__(self, threshold=5, reset_timeout=30.0, trial_timeout=10.0):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.trial_timeout = trial_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_at = None       # cuándo salió la prueba en curso (half_open)
+        self._lock = threading.Lock()
+        self.stats = {"opened": 0, "rejected": 0}
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            if self.state == "open" and now - self._opened_at >= self.reset_timeout:
+                self.state, self._trial_at = "half_open", None
+            if self.state == "half_open" and (self._trial_at is None or now - self._trial_at >= self.trial_timeout):
+                self._trial_at = now
+                return True
+            self.stats["rejected"] += 1
+            return False
+
+    def record(self, ok):
+        """Resultado de una llamada permitida: True, False o None (no llegó a saberse)."""
+        if ok:
+            self.success()
+        elif ok is None:
+            with self._lock:
+                self._trial_at = None
+        else:
+            self.failure()
+
+    def success(self):
+        with self._lock:
+            self.state, self._failures, self._trial_at = "closed", 0, None
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.threshold:
+                if self.state != "open":
+                    self.stats["opened"] += 1
+                self.state, self._opened_at, self._trial_at = "open", time.monotonic(), None
+
+    @property
+    def healthy(self):
+        return self.state == "closed"
+
+    def snapshot(self):
+        with self._lock:
+            return {"state": self.state, "failures": self._failures, **self.stats}
+
+
+# ================================
+# RETRIES
+# ================================
+def retry_after_seconds(value):
+    """Retry-After en segundos (solo la forma numérica; la de fecha se ignora)."""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_delay(attempt, retry_after=None):
+    """
+    Espera antes del reintento `attempt` (0, 1, ...): "full jitter", un valor
+    al azar entre 0 y BACKOFF_BASE * 2**attempt (máx. BACKOFF_MAX), para que
+    los clientes no reintenten todos a la vez. Si el servidor pide esperar
+    (Retry-After) se respeta; None si pide más de RETRY_AFTER_MAX.
+    """
+    if retry_after is not None:
+        return retry_after if retry_after <= RETRY_AFTER_MAX else None
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
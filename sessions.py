@@ -0,0 +1,151 @@
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+
+from storage import STORAGE_BACKEND, run_io
+
+# ---------------------------
+# CONFIG
+# ---------------------------
+# "memory" (un solo proceso) o "sqlite" (tabla sessions de data/cine.db, para varios workers)
+SESSION_BACKEND = os.environ.get("CINE_SESSION_BACKEND", "sqlite" if STORAGE_BACKEND == "sqlite" else "memory")
+SESSION_COOKIE = "session"
+SESSION_MAX_AGE = 14 * 24 * 60 * 60     # segundos, como el SessionMiddleware de Starlette
+SESSION_MAXSIZE = 100000                # sesiones en memoria antes de expulsar la menos usada
+
+
+# ================================
+# MEMORY STORE (LRU + TTL)
+# ================================
+class MemorySessionStore:
+    """
+    Sesiones en memoria del proceso: expulsa la menos usada al llenarse y
+    descarta las que llevan max_age sin escribirse. Guarda el JSON tal cual,
+    así cada petición trabaja sobre su propia copia.
+    """
+
+    blocking = False
+
+    def __init__(self, maxsize=SESSION_MAXSIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()      # id -> (caduca, json)
+        self._lock = threading.Lock()
+
+    def load_entry(self, session_id):
+        """(json, segundos que le quedan) o None."""
+        with self._lock:
+            entry = self._data.get(session_id)
+            if entry is None:
+                return None
+            left = entry[0] - time.monotonic()
+            if left <= 0:
+                del self._data[session_id]
+                return None
+            self._data.move_to_end(session_id)
+            return entry[1], left
+
+    def load(self, session_id):
+        entry = self.load_entry(session_id)
+        return entry[0] if entry else None
+
+    def save(self, session_id, data, max_age):
+        with self._lock:
+            self._data[session_id] = (time.monotonic() + max_age, data)
+            self._data.move_to_end(session_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._data.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+# ================================
+# MIDDLEWARE
+# ================================
+class ServerSessionMiddleware:
+    """
+    Sustituye a SessionMiddleware: la cookie solo lleva un id aleatorio
+    (256 bits, no hace falta firmarlo) y request.session vive en `store`.
+
+    La sesión se vuelve a guardar solo si cambió (se compara el JSON) y la
+    cookie solo se envía al crear la sesión, al cambiar de usuario (id nuevo,
+    contra la fijación de sesión) o al borrarla. Además, cuando le queda
+    menos de la mitad de max_age se renueva (store y cookie) aunque no haya
+    cambiado: un usuario activo no caduca, como con SessionMiddleware.
+    """
+
+    def __init__(self, app, store, cookie=SESSION_COOKIE, max_age=SESSION_MAX_AGE,
+                 path="/", same_site="lax", https_only=False):
+        self.app = app
+        self.store = store
+        self.cookie = cookie
+        self.max_age = max_age
+        self.path = path
+        self.flags = f"httponly; samesite={same_site}" + ("; secure" if https_only else "")
+
+    async def _call(self, fn, *args):
+        if self.store.blocking:
+            return await run_io(fn, *args)
+        return fn(*args)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+
+        session_id = HTTPConnection(scope).cookies.get(self.cookie)
+        entry = await self._call(self.store.load_entry, session_id) if session_id else None
+        stored, left = entry or (None, 0)
+        scope["session"] = json.loads(stored) if stored else {}
+        user = scope["session"].get("user")
+        renew = stored is not None and left < self.max_age / 2
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                await self._persist(message, session_id, stored, user, scope["session"], renew)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _persist(self, message, session_id, stored, user, session, renew):
+        data = json.dumps(session, sort_keys=True, separators=(",", ":")) if session else None
+        if data == stored and not renew:
+            return      # sin cambios: ni escritura ni Set-Cookie
+
+        if data is None:
+            await self._call(self.store.delete, session_id)
+            cookie = f"{self.cookie}=null; path={self.path}; expires=Thu, 01 Jan 1970 00:00:00 GMT; {self.flags}"
+        elif stored is None or session.get("user") != user:
+            # Sesión nueva, caducada o de otro usuario: id nuevo
+            if stored is not None:
+                await self._call(self.store.delete, session_id)
+            session_id = secrets.token_urlsafe(32)
+            await self._call(self.store.save, session_id, data, self.max_age)
+            cookie = f"{self.cookie}={session_id}; path={self.path}; Max-Age={self.max_age}; {self.flags}"
+        else:
+            # Cambió, o hay que renovarla: mismo id, max_age desde ahora
+            await self._call(self.store.save, session_id, data, self.max_age)
+            if not renew:
+                return
+            cookie = f"{self.cookie}={session_id}; path={self.path}; Max-Age={self.max_age}; {self.flags}"
+        MutableHeaders(scope=message).append("Set-Cookie", cookie)
+
+
+def create_store(backend=SESSION_BACKEND):
+    if backend == "sqlite":
+        from sqlite_store import SQLiteSessionStore
+        return SQLiteSessionStore()
+    return MemorySessionStore()
+
+
+# Instancia que usa app.py
+session_store = create_store()
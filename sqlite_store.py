@@ -0,0 +1,518 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+
+import data_base
+from rating_stats import as_stats, wilson_lower_bound
+
+# ---------------------------
+# CONFIG
+# ---------------------------
+DB_FILE = os.path.join(data_base.DATA_DIR, "cine.db")
+FIRST_CUSTOM_MOVIE_ID = data_base.FIRST_CUSTOM_MOVIE_ID     # mismo primer id que el repositorio en JSON
+BATCH_SIZE = 500                    # ids por sentencia en operaciones masivas
+SESSION_PURGE_EVERY = 500           # escrituras de sesión entre limpiezas de caducadas
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT UNIQUE,
+    email TEXT UNIQUE,
+    password TEXT
+);
+
+CREATE TABLE IF NOT EXISTS custom_movies (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT,
+    description TEXT,
+    poster TEXT,
+    owner TEXT
+);
+
+CREATE TABLE IF NOT EXISTS ratings (
+    username TEXT NOT NULL,
+    movie_id INTEGER NOT NULL,
+    rating INTEGER NOT NULL,
+    PRIMARY KEY (username, movie_id)
+) WITHOUT ROWID;
+
+-- Agregados por película, al día en la misma transacción que ratings
+CREATE TABLE IF NOT EXISTS movie_stats (
+    movie_id INTEGER PRIMARY KEY,
+    likes INTEGER NOT NULL,
+    dislikes INTEGER NOT NULL,
+    score REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    expires REAL NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+-- username ya tiene índice por su UNIQUE; (username, movie_id) es la PK
+CREATE INDEX IF NOT EXISTS idx_users_email_lower ON users(lower(email));
+CREATE INDEX IF NOT EXISTS idx_ratings_movie ON ratings(movie_id);
+CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires);
+CREATE INDEX IF NOT EXISTS idx_movie_stats_rank ON movie_stats(score DESC, likes DESC, movie_id);
+"""
+
+
+# ================================
+# CONNECTIONS
+# ================================
+_local = threading.local()
+_schema_ready = set()
+_schema_lock = threading.Lock()
+
+
+def _init_schema(conn, path):
+    with _schema_lock:
+        if path in _schema_ready:
+            return
+        conn.executescript(SCHEMA)
+        # Los ids de películas propias empiezan en FIRST_CUSTOM_MOVIE_ID
+        conn.execute(
+            "INSERT INTO sqlite_sequence (name, seq) SELECT 'custom_movies', ? "
+            "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'custom_movies')",
+            (FIRST_CUSTOM_MOVIE_ID - 1,)
+        )
+        # Bases anteriores a movie_stats: se calcula una vez desde ratings
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'movie_stats'").fetchone() is None:
+            _rebuild_movie_stats(conn)
+            conn.execute("INSERT INTO meta (key, value) VALUES ('movie_stats', datetime('now'))")
+        conn.commit()
+        _schema_ready.add(path)
+
+
+def get_connection():
+    """
+    Una conexión por hilo y fichero. sqlite3 guarda las sentencias preparadas
+    en cada conexión, así que las consultas fijas no se vuelven a compilar.
+    """
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+
+    conn = conns.get(DB_FILE)
+    if conn is None:
+        conn = sqlite3.connect(DB_FILE, timeout=10, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _init_schema(conn, DB_FILE)
+        conns[DB_FILE] = conn
+    return conn
+
+
+# ================================
+# USER REPOSITORY
+# ================================
+class SQLiteUserRepository:
+
+    @staticmethod
+    def load_users():
+        rows = get_connection().execute("SELECT username, email, password FROM users ORDER BY id")
+        return [dict(r) for r in rows]
+
+    @staticmethod
+    def user_exists(username, email):
+        row = get_connection().execute(
+            "SELECT 1 FROM users WHERE username = ? UNION ALL "
+            "SELECT 1 FROM users WHERE lower(email) = lower(?) LIMIT 1",
+            (username, email)
+        ).fetchone()
+        return row is not None
+
+    @staticmethod
+    def authenticate(identifier, password):
+        """Devuelve el username si las credenciales son válidas, si no None."""
+        rows = get_connection().execute(
+            "SELECT username, password FROM users WHERE username = ? UNION ALL "
+            "SELECT username, password FROM users WHERE lower(email) = lower(?)",
+            (identifier, identifier)
+        ).fetchall()
+        for r in rows:
+            if r["password"] == password:
+                return r["username"]
+        return None
+
+    @staticmethod
+    def validate_login(identifier, password):
+        return SQLiteUserRepository.authenticate(identifier, password) is not None
+
+    @staticmethod
+    def save_user(username, email, password):
+        conn = get_connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO users (username, email, password) VALUES (?, ?, ?)",
+                (username, email, password)
+            )
+
+    @staticmethod
+    def save_users(users):
+        """Alta masiva en una transacción; los que chocan con un username/email existente se ignoran."""
+        conn = get_connection()
+        with conn:
+            cur = conn.executemany(
+                "INSERT OR IGNORE INTO users (username, email, password) VALUES (?, ?, ?)",
+                ((u["username"], u["email"], u["password"]) for u in users)
+            )
+        return cur.rowcount
+
+    @staticmethod
+    def iter_users():
+        yield from (dict(r) for r in get_connection().execute(
+            "SELECT username, email, password FROM users ORDER BY id"
+        ))
+
+
+# ================================
+# CUSTOM MOVIES REPOSITORY
+# ================================
+def _bump_movies_version(conn):
+    conn.execute(
+        "INSERT INTO meta (key, value) VALUES ('movies_version', '1') "
+        "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+    )
+    conn.execute(
+        "INSERT OR REPLACE INTO meta (key, value) VALUES ('movies_modified', strftime('%s', 'now'))"
+    )
+
+
+class SQLiteCustomMovieRepository:
+
+    @staticmethod
+    def version():
+        rows = dict(get_connection().execute(
+            "SELECT key, value FROM meta WHERE key IN ('movies_version', 'movies_modified')"
+        ).fetchall())
+        version = int(rows.get("movies_version", 0))
+        return {
+            "version": version,
+            "etag": f'"movies-{version}"',
+            "last_modified": int(rows.get("movies_modified", 0)),
+        }
+
+    @staticmethod
+    def load_movies():
+        rows = get_connection().execute(
+            "SELECT id, title, description, poster FROM custom_movies ORDER BY id"
+        )
+        return [dict(r) for r in rows]
+
+    @staticmethod
+    def get_movie(movie_id):
+        row = get_connection().execute(
+            "SELECT id, title, description, poster FROM custom_movies WHERE id = ?", (movie_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    @staticmethod
+    def page_movies(after=0, limit=100):
+        """Hasta `limit` películas con id > after, en orden de id (usa la PK)."""
+        rows = get_connection().execute(
+            "SELECT id, title, description, poster FROM custom_movies WHERE id > ? ORDER BY id LIMIT ?",
+            (after, limit)
+        )
+        return [dict(r) for r in rows]
+
+    @staticmethod
+    def save_movies(movies):
+        conn = get_connection()
+        with conn:
+            conn.execute("DELETE FROM custom_movies")
+            conn.executemany(
+                "INSERT INTO custom_movies (id, title, description, poster) VALUES (?, ?, ?, ?)",
+                [(m["id"], m["title"], m["description"], m["poster"]) for m in movies]
+            )
+            _bump_movies_version(conn)
+
+    @staticmethod
+    def add_movies(movies):
+        """Añade varias películas en una sola transacción. Devuelve sus ids."""
+        conn = get_connection()
+        ids = []
+        with conn:
+            # AUTOINCREMENT no reutiliza ids borrados (sqlite_sequence)
+            for m in movies:
+                cur = conn.execute(
+                    "INSERT INTO custom_movies (title, description, poster) VALUES (?, ?, ?)",
+                    (m["title"], m["description"], m["poster"])
+                )
+                ids.append(cur.lastrowid)
+            if ids:
+                _bump_movies_version(conn)
+        return ids
+
+    @staticmethod
+    def add_movie(title, description, poster):
+        return SQLiteCustomMovieRepository.add_movies(
+            [{"title": title, "description": description, "poster": poster}]
+        )[0]
+
+    @staticmethod
+    def delete_movies(movie_ids):
+        """Borra varias películas en una sola transacción. Devuelve los ids borrados."""
+        ids = list(dict.fromkeys(movie_ids))
+        conn = get_connection()
+        deleted = set()
+        with conn:
+            for i in range(0, len(ids), BATCH_SIZE):
+                batch = ids[i:i + BATCH_SIZE]
+                marks = ",".join("?" * len(batch))
+                deleted.update(r["id"] for r in conn.execute(
+                    f"SELECT id FROM custom_movies WHERE id IN ({marks})", batch
+                ))
+                conn.execute(f"DELETE FROM custom_movies WHERE id IN ({marks})", batch)
+            if deleted:
+                _bump_movies_version(conn)
+        return [mid for mid in ids if mid in deleted]
+
+    @staticmethod
+    def delete_movie(movie_id):
+        return bool(SQLiteCustomMovieRepository.delete_movies([movie_id]))
+
+
+# ================================
+# MOVIE RATINGS (LIKE / DISLIKE)
+# ================================
+def _rebuild_movie_stats(conn, movie_ids=None):
+    """Recalcula movie_stats desde ratings: todas las películas o solo `movie_ids`."""
+    if movie_ids is None:
+        conn.execute("DELETE FROM movie_stats")
+        rows = conn.execute(
+            "SELECT movie_id, SUM(rating > 0) AS likes, SUM(rating < 0) AS dislikes "
+            "FROM ratings GROUP BY movie_id"
+        ).fetchall()
+    else:
+        rows = []
+        for movie_id in movie_ids:
+            conn.execute("DELETE FROM movie_stats WHERE movie_id = ?", (movie_id,))
+            rows += conn.execute(
+                "SELECT movie_id, SUM(rating > 0) AS likes, SUM(rating < 0) AS dislikes "
+                "FROM ratings WHERE movie_id = ? GROUP BY movie_id", (movie_id,)
+            ).fetchall()
+    conn.executemany(
+        "INSERT INTO movie_stats (movie_id, likes, dislikes, score) VALUES (?, ?, ?, ?)",
+        [(r["movie_id"], r["likes"], r["dislikes"], wilson_lower_bound(r["likes"], r["dislikes"])) for r in rows]
+    )
+
+
+class SQLiteRatingRepository:
+
+    @staticmethod
+    def load_ratings():
+        ratings = {}
+        for r in get_connection().execute("SELECT username, movie_id, rating FROM ratings"):
+            ratings.setdefault(r["username"], {})[str(r["movie_id"])] = r["rating"]
+        return ratings
+
+    @staticmethod
+    def save_ratings(ratings):
+        conn = get_connection()
+        with conn:
+            conn.execute("DELETE FROM ratings")
+            conn.executemany(
+                "INSERT INTO ratings (username, movie_id, rating) VALUES (?, ?, ?)",
+                [(user, int(mid), rating)
+                 for user, user_ratings in ratings.items()
+                 for mid, rating in user_ratings.items()]
+            )
+            _rebuild_movie_stats(conn)
+
+    @staticmethod
+    def rate_movie(user, movie_id, rating):
+        """
+        rating = 1 (like)
+        rating = -1 (dislike)
+
+        movie_stats se ajusta con la diferencia respecto al voto anterior
+        (BEGIN IMMEDIATE: nadie puede cambiarlo entre la lectura y la escritura).
+        """
+        conn = get_connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT rating FROM ratings WHERE username = ? AND movie_id = ?", (user, movie_id)
+            ).fetchone()
+            old = row["rating"] if row else 0
+            if old == rating:
+                return True
+            conn.execute(
+                "INSERT INTO ratings (username, movie_id, rating) VALUES (?, ?, ?) "
+                "ON CONFLICT (username, movie_id) DO UPDATE SET rating = excluded.rating",
+                (user, movie_id, rating)
+            )
+            stats = conn.execute(
+                "SELECT likes, dislikes FROM movie_stats WHERE movie_id = ?", (movie_id,)
+            ).fetchone()
+            likes, dislikes = (stats["likes"], stats["dislikes"]) if stats else (0, 0)
+            likes += (rating > 0) - (old > 0)
+            dislikes += (rating < 0) - (old < 0)
+            conn.execute(
+                "INSERT OR REPLACE INTO movie_stats (movie_id, likes, dislikes, score) VALUES (?, ?, ?, ?)",
+                (movie_id, likes, dislikes, wilson_lower_bound(likes, dislikes))
+            )
+        return True
+
+    @staticmethod
+    def rate_movies(rows):
+        rows = list(rows)
+        conn = get_connection()
+        with conn:
+            cur = conn.executemany(
+                "INSERT INTO ratings (username, movie_id, rating) VALUES (?, ?, ?) "
+                "ON CONFLICT (username, movie_id) DO UPDATE SET rating = excluded.rating",
+                rows
+            )
+            _rebuild_movie_stats(conn, {movie_id for _, movie_id, _ in rows})
+        return cur.rowcount
+
+    @staticmethod
+    def iter_ratings():
+        for r in get_connection().execute(
+            "SELECT username, movie_id, rating FROM ratings ORDER BY username, movie_id"
+        ):
+            yield r["username"], r["movie_id"], r["rating"]
+
+    @staticmethod
+    def get_user_rating(user, movie_id):
+        row = get_connection().execute(
+            "SELECT rating FROM ratings WHERE username = ? AND movie_id = ?",
+            (user, movie_id)
+        ).fetchone()
+        return row["rating"] if row else 0
+
+    @staticmethod
+    def movie_stats(movie_id):
+        row = get_connection().execute(
+            "SELECT likes, dislikes, score FROM movie_stats WHERE movie_id = ?", (movie_id,)
+        ).fetchone()
+        if row is None:
+            return as_stats(movie_id, 0, 0, 0.0)
+        return as_stats(movie_id, row["likes"], row["dislikes"], row["score"])
+
+    @staticmethod
+    def top_movies(limit=10):
+        # Recorre idx_movie_stats_rank: lee `limit` filas, sin ordenar
+        return [as_stats(r["movie_id"], r["likes"], r["dislikes"], r["score"]) for r in get_connection().execute(
+            "SELECT movie_id, likes, dislikes, score FROM movie_stats "
+            "ORDER BY score DESC, likes DESC, movie_id LIMIT ?", (limit,)
+        )]
+
+
+# ================================
+# SESSION STORE
+# ================================
+class SQLiteSessionStore:
+    """
+    Sesiones del servidor compartidas entre workers (misma interfaz que
+    sessions.MemorySessionStore). Las caducadas se borran cada
+    SESSION_PURGE_EVERY escrituras.
+    """
+
+    blocking = True         # el middleware la llama desde el pool de storage.run_io
+
+    def __init__(self):
+        self._writes = 0
+
+    def load_entry(self, session_id):
+        now = time.time()
+        row = get_connection().execute(
+            "SELECT data, expires FROM sessions WHERE id = ? AND expires > ?",
+            (session_id, now)
+        ).fetchone()
+        return (row["data"], row["expires"] - now) if row else None
+
+    def load(self, session_id):
+        entry = self.load_entry(session_id)
+        return entry[0] if entry else None
+
+    def save(self, session_id, data, max_age):
+        conn = get_connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO sessions (id, data, expires) VALUES (?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET data = excluded.data, expires = excluded.expires",
+                (session_id, data, time.time() + max_age)
+            )
+            self._writes += 1
+            if self._writes % SESSION_PURGE_EVERY == 0:
+                conn.execute("DELETE FROM sessions WHERE expires <= ?", (time.time(),))
+
+    def delete(self, session_id):
+        conn = get_connection()
+        with conn:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def __len__(self):
+        return get_connection().execute(
+            "SELECT COUNT(*) FROM sessions WHERE expires > ?", (time.time(),)
+        ).fetchone()[0]
+
+
+# ================================
+# MIGRATION (CSV / JSON -> SQLITE)
+# ================================
+def migrate_from_files(force=False):
+    """
+    Copia users.csv, custom_movies.json y ratings.json a la base SQLite.
+    Solo se ejecuta una vez (queda marcado en la tabla meta) salvo con force.
+    """
+    conn = get_connection()
+    done = conn.execute("SELECT value FROM meta WHERE key = 'migrated_from_files'").fetchone()
+    if done and not force:
+        return None
+
+    users = data_base.UserRepository.load_users()
+    movies = data_base.CustomMovieRepository.load_movies()
+    ratings = data_base.RatingRepository.load_ratings()
+
+    with conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO users (username, email, password) VALUES (?, ?, ?)",
+            [(u["username"], u["email"], u["password"]) for u in users]
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO custom_movies (id, title, description, poster) VALUES (?, ?, ?, ?)",
+            [(m["id"], m.get("title"), m.get("description"), m.get("poster")) for m in movies]
+        )
+        _bump_movies_version(conn)
+        conn.executemany(
+            "INSERT OR REPLACE INTO ratings (username, movie_id, rating) VALUES (?, ?, ?)",
+            [(user, int(mid), rating)
+             for user, user_ratings in ratings.items()
+             for mid, rating in user_ratings.items()]
+        )
+        _rebuild_movie_stats(conn)
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from_files', datetime('now'))"
+        )
+
+    return {
+        "users": len(users),
+        "movies": len(movies),
+        "ratings": sum(len(r) for r in ratings.values()),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Utilidades de la base SQLite")
+    parser.add_argument("command", choices=["migrate"])
+    parser.add_argument("--force", action="store_true", help="repetir la migración aunque ya se hiciera")
+    args = parser.parse_args()
+
+    result = migrate_from_files(force=args.force)
+    if result is None:
+        print("La migración ya se había ejecutado (usa --force para repetirla)")
+    else:
+        print(f"Migrados {result['users']} usuarios, {result['movies']} películas y {result['ratings']} valoraciones")
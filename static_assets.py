@@ -0,0 +1,198 @@
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import warnings
+
+from fastapi.responses import FileResponse
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+
+try:
+    import brotli           # en requirements.txt
+except ImportError:         # instalación sin él: solo se generan los .gz (build() lo avisa)
+    brotli = None
+
+# ---------------------------
+# CONFIG
+# ---------------------------
+STATIC_DIR = "static"
+BUILD_DIR = os.path.join("build", "static")
+MANIFEST = "manifest.json"
+HASH_LENGTH = 10
+COMPRESSIBLE = {".css", ".js", ".svg", ".html", ".json", ".txt", ".map"}
+MIN_COMPRESS_SIZE = 256     # bytes; por debajo no compensa
+IMMUTABLE = "public, max-age=31536000, immutable"
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))        # por orden de preferencia
+
+
+# ================================
+# BUILD
+# ================================
+def fingerprint(name, data):
+    """'css/style.css' -> 'css/style.3f2a9c1b7d.css' (hash del contenido)."""
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}"
+
+
+def _source_files(src):
+    for root, _, files in os.walk(src):
+        for f in sorted(files):
+            path = os.path.join(root, f)
+            yield os.path.relpath(path, src).replace(os.sep, "/"), path
+
+
+def build(src=STATIC_DIR, out=BUILD_DIR):
+    """
+    Copia cada fichero de `src` a `out` con el hash en el nombre y, si es de
+    texto, sus variantes .gz y .br (solo si quedan más pequeñas; .br necesita
+    el paquete brotli de requirements.txt, sin él se lanza un aviso). Devuelve el
+    manifiesto {nombre original: nombre con hash}, que se guarda en out/manifest.json.
+    Los ficheros de builds anteriores se conservan: las páginas ya servidas los siguen pidiendo.
+    """
+    if brotli is None:
+        warnings.warn("brotli no está instalado (ver requirements.txt): solo se generan variantes .gz")
+    manifest = {}
+    for name, path in _source_files(src):
+        with open(path, "rb") as f:
+            data = f.read()
+        hashed = fingerprint(name, data)
+        manifest[name] = hashed
+
+        target = os.path.join(out, hashed)
+        if os.path.exists(target):
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(path, target)
+
+        if os.path.splitext(name)[1] in COMPRESSIBLE and len(data) >= MIN_COMPRESS_SIZE:
+            variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                variants[".br"] = brotli.compress(data, quality=11)
+            for suffix, packed in variants.items():
+                if len(packed) < len(data):
+                    with open(target + suffix, "wb") as f:
+                        f.write(packed)
+
+    tmp = os.path.join(out, MANIFEST + ".tmp")
+    os.makedirs(out, exist_ok=True)
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, os.path.join(out, MANIFEST))
+    return manifest
+
+
+def load_manifest(src=STATIC_DIR, out=BUILD_DIR):
+    """Manifiesto del último build; se rehace si falta o si algún fichero de `src` es más nuevo."""
+    path = os.path.join(out, MANIFEST)
+    try:
+        built_at = os.stat(path).st_mtime
+        if all(os.stat(p).st_mtime <= built_at for _, p in _source_files(src)):
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+    except (OSError, ValueError):
+        pass
+    return build(src, out)
+
+
+# ================================
+# RESPUESTAS
+# ================================
+class SendfileResponse(FileResponse):
+    """
+    FileResponse que entrega el fichero con la extensión ASGI zerocopysend
+    (sendfile) si el servidor la ofrece; si no, en trozos como siempre.
+    Hay que pasarle stat_result (Content-Length se fija al crearla).
+    """
+
+    async def __call__(self, scope, receive, send):
+        if "http.response.zerocopysend" not in scope.get("extensions", {}) or scope["method"] == "HEAD":
+            return await super().__call__(scope, receive, send)
+
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        with open(self.path, "rb") as f:
+            await send({"type": "http.response.zerocopysend", "file": f})
+        if self.background is not None:
+            await self.background()
+
+
+def accepted_encodings(header):
+    """Codificaciones de Accept-Encoding con q > 0 ('gzip;q=0' las excluye)."""
+    accepted = set()
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q=") and q[2:].strip() in ("0", "0.0", "0.00", "0.000"):
+            continue
+        accepted.add(token.strip().lower())
+    return accepted
+
+
+# ================================
+# STATIC HANDLER
+# ================================
+class StaticAssets:
+    """
+    App ASGI para /static:
+      - nombres con hash (los del manifiesto): variante .br / .gz según
+        Accept-Encoding, Cache-Control immutable de un año.
+      - cualquier otro nombre: StaticFiles normal sobre el directorio original
+        (ETag / Last-Modified, se revalida).
+    """
+
+    def __init__(self, src=STATIC_DIR, out=BUILD_DIR, prefix="/static"):
+        self.out = out
+        self.prefix = prefix
+        self.manifest = load_manifest(src, out)
+        self._hashed = {hashed: name for name, hashed in self.manifest.items()}
+        self._files = StaticFiles(directory=src)
+
+    def url(self, name):
+        """Helper de plantillas: static_url('style.css') -> '/static/style.<hash>.css'."""
+        return f"{self.prefix}/{self.manifest.get(name, name)}"
+
+    async def __call__(self, scope, receive, send):
+        hashed = scope["path"].lstrip("/")
+        if scope["type"] != "http" or hashed not in self._hashed:
+            return await self._files(scope, receive, send)
+
+        response = self._response(Request(scope), hashed)
+        await response(scope, receive, send)
+
+    def _response(self, request, hashed):
+        if request.method not in ("GET", "HEAD"):
+            return Response(status_code=405, headers={"Allow": "GET, HEAD"})
+
+        path = os.path.join(self.out, hashed)
+        media_type = mimetypes.guess_type(hashed)[0] or "application/octet-stream"
+        headers = {"Cache-Control": IMMUTABLE, "Vary": "Accept-Encoding"}
+
+        accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+        encoding = None
+        for name, suffix in ENCODINGS:
+            if name in accepted and os.path.exists(path + suffix):
+                path += suffix
+                encoding = headers["Content-Encoding"] = name
+                break
+
+        # El nombre ya lleva el hash del contenido; la codificación distingue las variantes
+        etag = headers["ETag"] = f'"{hashed}-{encoding}"' if encoding else f'"{hashed}"'
+        if etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+        return SendfileResponse(path, headers=headers, media_type=media_type, stat_result=os.stat(path))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build de ficheros estáticos (hash + gzip/brotli)")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--src", default=STATIC_DIR)
+    parser.add_argument("--out", default=BUILD_DIR)
+    args = parser.parse_args()
+
+    manifest = build(args.src, args.out)
+    for name, hashed in sorted(manifest.items()):
+        print(f"{name} -> {hashed}")
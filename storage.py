@@ -0,0 +1,36 @@
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# ---------------------------
+# CONFIG
+# ---------------------------
+# "files" -> CSV / JSON (data_base.py), "sqlite" -> data/cine.db (sqlite_store.py)
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "files")
+IO_WORKERS = int(os.environ.get("CINE_IO_WORKERS", "8"))    # hilos para ficheros / SQLite desde handlers async
+
+if STORAGE_BACKEND == "sqlite":
+    from sqlite_store import (
+        SQLiteUserRepository as UserRepository,
+        SQLiteCustomMovieRepository as CustomMovieRepository,
+        SQLiteRatingRepository as RatingRepository,
+    )
+else:
+    from data_base import UserRepository, CustomMovieRepository, RatingRepository
+
+
+# ================================
+# I/O DESDE CÓDIGO ASYNC
+# ================================
+_io_pool = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="cine-io")
+
+
+async def run_io(fn, *args):
+    """
+    Ejecuta una función bloqueante (ficheros, SQLite) en un pool propio y
+    acotado, sin ocupar el threadpool de Starlette ni bloquear el event loop.
+    Conserva el contexto (métricas de la petición).
+    """
+    ctx = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(_io_pool, ctx.run, fn, *args)
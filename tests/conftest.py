@@ -0,0 +1,14 @@
+from psoftware.app import tmdb
+from psoftware.tmdb_client import CircuitBreaker
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def fresh_tmdb_breaker(monkeypatch):
+    """
+    Circuito de TMDB nuevo en cada test: el cliente compartido de la app es
+    global y los tests que llegan a la red real pueden dejarlo abierto.
+    """
+    breaker = tmdb.breaker
+    monkeypatch.setattr(tmdb, "breaker",
+                        CircuitBreaker(breaker.threshold, breaker.reset_timeout, breaker.trial_timeout))
@@ -0,0 +1,51 @@
+from fastapi.testclient import TestClient
+from psoftware.app import app
+import json
+import os
+from unittest.mock import patch
+
+client = TestClient(app)
+
+
+def setup_module(module):
+    """Usuario admin y algunos likes repetidos entre usuarios."""
+    os.makedirs("data", exist_ok=True)
+    with open("data/users.csv", "w", encoding="utf-8") as f:
+        f.write("username,email,password\n")
+        f.write("admin,admin@example.com,admin123\n")
+
+    with open("data/likes.json", "w", encoding="utf-8") as f:
+        json.dump({"nico": [550, 603], "ana": [550], "admin": [603]}, f)
+
+
+def login_admin():
+    client.post("/login", data={"identifier": "admin", "password": "admin123"},
+                follow_redirects=False)
+
+
+def test_admin_titles_deduplicated_and_cached(tmp_path):
+    login_admin()
+    titles = {550: "El club de la lucha", 603: "Matrix"}
+
+    with patch("data_base.TITLES_FILE", str(tmp_path / "titles.json")), \
+         patch("data_base.TitleRepository._titles", None), \
+         patch("psoftware.app.tmdb.titles", side_effect=lambda ids: {i: titles[i] for i in ids}) as fetch:
+        response = client.get("/admin")
+        assert response.status_code == 200
+        assert "Matrix" in response.text
+        assert fetch.call_count == 1
+        assert sorted(fetch.call_args[0][0]) == [550, 603]
+
+        # Segundo render: todo sale de la cache local
+        response = client.get("/admin")
+        assert "El club de la lucha" in response.text
+        assert fetch.call_count == 1
+
+
+def test_admin_pagination():
+    login_admin()
+    with patch("psoftware.app.ADMIN_PAGE_SIZE", 2), \
+         patch("psoftware.app.tmdb.titles", return_value={}):
+        response = client.get("/admin?page=2")
+        assert response.status_code == 200
+        assert "Página 2 de 2" in response.text
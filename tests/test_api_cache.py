@@ -0,0 +1,54 @@
+from fastapi.testclient import TestClient
+from psoftware.app import app
+import json
+import os
+
+client = TestClient(app)
+
+
+def setup_module(module):
+    os.makedirs("data", exist_ok=True)
+    with open("data/custom_movies.json", "w", encoding="utf-8") as f:
+        json.dump({"movies": [
+            {"id": 100001, "title": "Uno", "description": "d", "poster": "p"}
+        ]}, f)
+
+
+def test_movies_etag_and_304():
+    first = client.get("/api/movies")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["last-modified"]
+
+    again = client.get("/api/movies", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+
+    since = client.get("/api/movies", headers={"If-Modified-Since": first.headers["last-modified"]})
+    assert since.status_code == 304
+
+
+def test_write_changes_etag():
+    etag = client.get("/api/movies").headers["etag"]
+    client.post("/api/movie/add", params={"title": "Dos", "description": "d"})
+
+    response = client.get("/api/movies", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert [m["title"] for m in response.json()["movies"]] == ["Uno", "Dos"]
+
+
+def test_single_movie_revalidation():
+    response = client.get("/api/movie/100001")
+    assert response.json()["title"] == "Uno"
+
+    cached = client.get("/api/movie/100001", headers={"If-None-Match": response.headers["etag"]})
+    assert cached.status_code == 304
+    assert client.get("/api/movie/99999999").status_code == 404
+
+
+def test_conditional_request_for_missing_movie_is_404():
+    etag = client.get("/api/movie/100001").headers["etag"]
+    for tag in (etag, "*"):
+        assert client.get("/api/movie/99999999", headers={"If-None-Match": tag}).status_code == 404
+    assert client.get("/api/movie/100001", headers={"If-None-Match": "*"}).status_code == 304
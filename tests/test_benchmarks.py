@@ -0,0 +1,49 @@
+from psoftware.benchmarks.fake_tmdb import movie, start_fake_tmdb
+from psoftware.benchmarks import async_dashboard, recommender as recommender_bench
+from psoftware.benchmarks.run import compare, percentile
+import json
+import requests
+
+
+def test_percentile_nearest_rank():
+    values = sorted(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 95) == 0.0
+
+
+def test_compare_flags_p95_regressions():
+    base = {"scenarios": {"s": {"routes": {"GET /a": {"p95_ms": 10.0}, "GET /b": {"p95_ms": 10.0}}}}}
+    new = {"scenarios": {"s": {"routes": {"GET /a": {"p95_ms": 11.0}, "GET /b": {"p95_ms": 20.0}}}}}
+    assert compare(new, base, tolerance=0.2) == ["s GET /b: p95 10.0 -> 20.0 ms"]
+
+
+def test_fake_tmdb_serves_canned_responses():
+    server, base_url = start_fake_tmdb(latency=0)
+    try:
+        page = requests.get(f"{base_url}/discover/movie", params={"page": 2}).json()
+        assert len(page["results"]) == 20
+        detail = requests.get(f"{base_url}/movie/550", params={"append_to_response": "videos"}).json()
+        assert detail["videos"]["results"]
+        assert requests.get(f"{base_url}/tv/1").status_code == 404
+    finally:
+        server.shutdown()
+
+    assert movie(7)["title"] == "Película 7"
+
+
+def test_recommender_benchmark_small(tmp_path):
+    out = tmp_path / "rec.json"
+    assert recommender_bench.main(["--users", "300", "--movies", "40", "--updates", "20",
+                                   "--output", str(out)]) == 0
+    results = json.loads(out.read_text())
+    assert results["build"]["users"] == 300
+    assert results["similar"]["count"] == 200
+
+
+def test_async_dashboard_benchmark_small(tmp_path):
+    out = tmp_path / "async.json"
+    assert async_dashboard.main(["--latencies", "20", "--concurrency", "4", "--per-user", "2",
+                                 "--users", "4", "--output", str(out)]) == 0
+    run = json.loads(out.read_text())["runs"][0]
+    assert run["count"] == 8 and run["errors"] == 0
@@ -0,0 +1,69 @@
+from psoftware.bulk import import_rows, iter_export, read_rows, write_rows, Stats
+from psoftware.likes_index import LikesIndex
+from psoftware.storage import RatingRepository
+import io
+import json
+from unittest.mock import patch
+
+
+def rows(text, fmt="jsonl"):
+    return read_rows(io.StringIO(text), fmt)
+
+
+def quiet():
+    return Stats(out=io.StringIO())
+
+
+def test_import_users_validates_and_skips_duplicates(tmp_path):
+    users_file = tmp_path / "users.csv"
+    users_file.write_text("username,email,password\nnico,nico@mail.com,1234\n", encoding="utf-8")
+    data = (
+        "username,email,password\n"
+        "ana,ana@mail.com,abcd\n"
+        "ana,otro@mail.com,abcd\n"      # username repetido en la entrada
+        "luis,NICO@mail.com,pw\n"       # email que ya existe
+        "sin_email,,pw\n"               # inválida
+        "eva,eva@mail.com,pw\n"
+    )
+    with patch("data_base.USERS_FILE", str(users_file)):
+        summary = import_rows("users", rows(data, "csv"), batch_size=2, stats=quiet())
+        exported = [u["username"] for u in iter_export("users")]
+
+    assert summary["read"] == 5
+    assert summary["written"] == 2
+    assert summary["invalid"] == 1
+    assert summary["duplicates"] == 2
+    assert exported == ["nico", "ana", "eva"]
+
+
+def test_import_likes_in_batches_and_export_roundtrip(tmp_path):
+    likes = LikesIndex(str(tmp_path / "likes.json"))
+    likes.like("nico", 1)
+    data = "\n".join(json.dumps(r) for r in [
+        {"user": "nico", "movie_id": 1},        # ya existía
+        {"user": "ana", "movie_id": "2"},
+        {"user": "ana", "movie_id": 2},         # repetido
+        {"user": "ana", "movie_id": "x"},       # inválido
+    ]) + "\n{roto\n"
+
+    with patch.object(likes.log, "append_many", wraps=likes.log.append_many) as append_many:
+        summary = import_rows("likes", rows(data), batch_size=10, stats=quiet(), likes=likes)
+    assert append_many.call_count == 1        # un solo lote, una sola escritura
+    assert summary == {**summary, "read": 5, "written": 1, "invalid": 2, "duplicates": 2}
+    assert likes.count(2) == 1
+
+    out = io.StringIO()
+    assert write_rows(iter_export("likes", likes=likes), out, "csv", ("user", "movie_id")) == 2
+    assert out.getvalue().splitlines()[0] == "user,movie_id"
+
+
+def test_import_ratings_last_value_wins(tmp_path):
+    with patch("data_base.RATINGS_FILE", str(tmp_path / "ratings.json")), \
+            patch.object(RatingRepository, "_log", None):
+        data = "user,movie_id,rating\nnico,1,1\nnico,1,1\nnico,1,-1\nana,2,5\n"
+        summary = import_rows("ratings", rows(data, "csv"), stats=quiet())
+
+        assert summary["invalid"] == 1
+        assert summary["duplicates"] == 1
+        assert RatingRepository.get_user_rating("nico", 1) == -1
+        assert list(iter_export("ratings")) == [{"user": "nico", "movie_id": 1, "rating": -1}]
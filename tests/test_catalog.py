@@ -0,0 +1,104 @@
+from fastapi.testclient import TestClient
+from psoftware.app import app, fill_posters, tmdb
+from psoftware.catalog import Catalog, build_catalog, fold
+from psoftware.tmdb_client import DEFAULT_LANGUAGE, cache_key
+import os
+import requests
+from unittest.mock import patch
+
+client = TestClient(app)
+
+
+def movie(movie_id, title, popularity=1.0, cast=(), custom=False):
+    return {
+        "id": movie_id, "title": title, "original_title": title, "release_date": "2000-01-01",
+        "vote_average": 7.0, "popularity": popularity, "poster": "p.jpg" if custom else "",
+        "cast": list(cast), "custom": custom,
+    }
+
+
+def make_catalog(tmp_path):
+    path = str(tmp_path / "catalog.bin")
+    build_catalog([
+        movie(1, "La película de Ñandú", popularity=5),
+        movie(2, "Matrix", popularity=50, cast=["Keanu Reeves"]),
+        movie(3, "Matrix Reloaded", popularity=20),
+        movie(4, "John Wick", popularity=30, cast=["Keanu Reeves"]),
+        movie(100001, "Mi película", custom=True),
+    ], path)
+    return Catalog(path)
+
+
+def test_accent_folding():
+    assert fold("Película Ñandú") == "pelicula nandu"
+
+
+def test_search_folds_accents_and_ranks(tmp_path):
+    catalog = make_catalog(tmp_path)
+
+    assert [m["id"] for m in catalog.search("pelicula nandu")["results"]] == [1]
+    assert [m["id"] for m in catalog.search("PELÍCULA")["results"]] == [1, 100001]
+
+    # Título pesa más que reparto; a igualdad, más popular primero
+    assert [m["id"] for m in catalog.search("matrix")["results"]] == [2, 3]
+    assert [m["id"] for m in catalog.search("keanu")["results"]] == [2, 4]
+
+    # La última palabra vale como prefijo
+    assert [m["id"] for m in catalog.search("matrix relo")["results"]] == [3]
+    assert catalog.search("inexistente")["total_results"] == 0
+    catalog.close()
+
+
+def test_pagination(tmp_path):
+    catalog = make_catalog(tmp_path)
+    page = catalog.search("keanu", page=2, page_size=1)
+    assert page["total_pages"] == 2
+    assert [m["id"] for m in page["results"]] == [4]
+    assert catalog.search("mi pelicula")["results"][0]["custom"]
+    catalog.close()
+
+
+def test_poster_path_from_dump_or_tmdb_cache(tmp_path):
+    path = str(tmp_path / "catalog.bin")
+    build_catalog([dict(movie(990002, "Matrix"), poster_path="/matrix.jpg"), movie(990003, "Matrix Reloaded")], path)
+    catalog = Catalog(path)
+    results = catalog.search("matrix")["results"]
+    assert [m["poster_path"] for m in results] == ["/matrix.jpg", None]
+
+    assert fill_posters(results) == [990003]
+    tmdb.cache.set(cache_key("/movie/990003", {"language": DEFAULT_LANGUAGE}), {"poster_path": "/reloaded.jpg"})
+    assert fill_posters(results) == []
+    assert results[1]["poster_path"] == "/reloaded.jpg"
+    catalog.close()
+
+
+def test_dashboard_uses_local_catalog_and_falls_back(tmp_path):
+    os.makedirs("data", exist_ok=True)
+    with open("data/users.csv", "w", encoding="utf-8") as f:
+        f.write("username,email,password\ntestuser,test@example.com,1234\n")
+    client.post("/login", data={"identifier": "testuser", "password": "1234"},
+                follow_redirects=False)
+
+    catalog = make_catalog(tmp_path)
+    with patch("psoftware.app.local_catalog", catalog), \
+         patch("psoftware.app.atmdb.search", return_value={"results": []}) as search:
+        response = client.get("/dashboard?query=matrix")
+        assert "Matrix Reloaded" in response.text
+        assert search.call_count == 0
+
+        client.get("/dashboard?query=zzzz")
+        assert search.call_count == 1
+    catalog.close()
+
+
+def test_dashboard_survives_upstream_outage():
+    os.makedirs("data", exist_ok=True)
+    with open("data/users.csv", "w", encoding="utf-8") as f:
+        f.write("username,email,password\ntestuser,test@example.com,1234\n")
+    client.post("/login", data={"identifier": "testuser", "password": "1234"},
+                follow_redirects=False)
+    with patch("psoftware.app.local_catalog", None), \
+         patch("psoftware.app.atmdb.discover", side_effect=requests.ConnectionError("caído")):
+        response = client.get("/dashboard")
+    assert response.status_code == 200
+    assert "TMDB no responde" in response.text
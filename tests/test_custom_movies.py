@@ -0,0 +1,141 @@
+from fastapi.testclient import TestClient
+from psoftware.app import app
+from psoftware.storage import CustomMovieRepository
+import json
+import pytest
+from unittest.mock import patch
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def movies_file(tmp_path):
+    path = tmp_path / "custom_movies.json"
+    with patch("data_base.MOVIES_FILE", str(path)), \
+         patch.object(CustomMovieRepository, "_cache", None):
+        yield path
+
+
+def test_ids_are_monotonic_and_persisted(movies_file):
+    first = CustomMovieRepository.add_movie("Uno", "d", "p")
+    second = CustomMovieRepository.add_movie("Dos", "d", "p")
+    assert (first, second) == (100001, 100002)
+
+    assert CustomMovieRepository.delete_movie(second)
+    assert not CustomMovieRepository.delete_movie(second)
+    assert json.loads(movies_file.read_text())["next_id"] == 100003
+
+    # Aunque se relea el fichero, el id borrado no vuelve a asignarse
+    with patch.object(CustomMovieRepository, "_cache", None):
+        assert CustomMovieRepository.add_movie("Tres", "d", "p") == 100003
+    assert CustomMovieRepository.get_movie(first)["title"] == "Uno"
+    assert CustomMovieRepository.get_movie(second) is None
+
+
+def test_old_file_without_next_id(movies_file):
+    movies_file.write_text(json.dumps({"movies": [
+        {"id": 100007, "title": "Vieja", "description": "d", "poster": "p"}
+    ]}))
+    assert CustomMovieRepository.add_movie("Nueva", "d", "p") == 100008
+
+
+def test_bulk_is_a_single_write(movies_file):
+    with patch.object(CustomMovieRepository, "_write", wraps=CustomMovieRepository._write) as write:
+        ids = CustomMovieRepository.add_movies(
+            [{"title": f"P{i}", "description": "d", "poster": "p"} for i in range(1000)]
+        )
+        assert CustomMovieRepository.delete_movies(ids[:500] + [1]) == ids[:500]
+        assert write.call_count == 2
+
+    assert len(CustomMovieRepository.load_movies()) == 500
+    assert CustomMovieRepository.version()["version"] == 2
+
+
+def test_bulk_endpoints(movies_file):
+    response = client.post("/api/movies/bulk", json={"movies": [
+        {"title": "A", "description": "d"},
+        {"title": "B", "description": "d", "poster": "b.jpg"},
+    ]})
+    assert response.status_code == 200
+    ids = response.json()["ids"]
+    assert client.get(f"/api/movie/{ids[1]}").json()["poster"] == "b.jpg"
+
+    response = client.request("DELETE", "/api/movies/bulk", json={"ids": [ids[0], 42]})
+    assert response.json() == {"message": "deleted", "ids": [ids[0]], "missing": [42]}
+    assert [m["title"] for m in client.get("/api/movies").json()["movies"]] == ["B"]
+
+
+def test_bulk_limit(movies_file):
+    with patch("api.MAX_BULK", 1):
+        response = client.request("DELETE", "/api/movies/bulk", json={"ids": [1, 2]})
+        assert response.status_code == 413
+
+
+def add_many(n):
+    return CustomMovieRepository.add_movies(
+        [{"title": f"P{i}", "description": "d", "poster": "p"} for i in range(n)]
+    )
+
+
+def test_cursor_pagination(movies_file):
+    ids = add_many(7)
+    CustomMovieRepository.delete_movies([ids[3]])
+
+    seen, after = [], 0
+    while after is not None:
+        page = client.get(f"/api/movies?after={after}&limit=3").json()
+        seen += [m["id"] for m in page["movies"]]
+        after = page["next_after"]
+
+    assert seen == ids[:3] + ids[4:]
+    assert client.get("/api/movies?limit=0").status_code == 422
+
+
+def test_ndjson_stream(movies_file):
+    ids = add_many(12)
+    with patch("api.STREAM_BATCH", 5), \
+         patch.object(CustomMovieRepository, "page_movies", wraps=CustomMovieRepository.page_movies) as page:
+        response = client.get(f"/api/movies?format=ndjson&after={ids[0]}")
+        lines = response.text.splitlines()
+        assert page.call_count == 3
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line)["id"] for line in lines] == ids[1:]
+
+    limited = client.get("/api/movies?format=ndjson&limit=2").text.splitlines()
+    assert len(limited) == 2
+
+    # Se lee por lotes mientras se envía: sin validadores, nunca 304
+    assert "etag" not in response.headers and "last-modified" not in response.headers
+    etag = client.get("/api/movies").headers["etag"]
+    assert client.get("/api/movies?format=ndjson", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_batch_mixes_custom_and_tmdb(movies_file):
+    own = CustomMovieRepository.add_movie("Propia", "d", "p")
+
+    def fake_movies(ids):
+        return {mid: ({"id": mid, "title": f"TMDB {mid}"} if mid != 404 else None) for mid in ids}
+
+    with patch("api.atmdb.movies", side_effect=fake_movies) as fetch:
+        response = client.get(f"/api/movies/batch?ids=550,custom:{own},550,404,custom:1")
+        assert fetch.call_args[0][0] == [550, 404]
+
+    data = response.json()
+    assert [m["title"] for m in data["movies"]] == ["TMDB 550", "Propia"]
+    assert data["movies"][1]["custom"]
+    assert data["missing"] == [404, "custom:1"]
+    assert client.get("/api/movies/batch?ids=1,x").status_code == 400
+
+
+def test_batch_keeps_custom_and_tmdb_ids_apart(movies_file):
+    own = CustomMovieRepository.add_movie("Propia", "d", "p")
+
+    def fake_movies(ids):
+        return {mid: {"id": mid, "title": f"TMDB {mid}"} for mid in ids}
+
+    # Mismo id en los dos orígenes: sin prefijo es la de TMDB, con prefijo la propia
+    with patch("api.atmdb.movies", side_effect=fake_movies):
+        data = client.get(f"/api/movies/batch?ids={own},custom:{own}").json()
+    assert [m["title"] for m in data["movies"]] == [f"TMDB {own}", "Propia"]
+    assert data["missing"] == []
@@ -0,0 +1,67 @@
+from psoftware.event_log import EventLog
+from psoftware.likes_index import LikesIndex
+import json
+import os
+import threading
+
+
+def test_concurrent_writers_lose_no_updates(tmp_path):
+    index = LikesIndex(str(tmp_path / "likes.json"))
+
+    def worker(n):
+        for mid in range(50):
+            index.like(f"user{n}", mid)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert index.counts(range(50)) == {mid: 8 for mid in range(50)}
+
+    index.log.close()
+    reloaded = LikesIndex(str(tmp_path / "likes.json"))
+    assert reloaded.counts(range(50)) == {mid: 8 for mid in range(50)}
+
+
+def test_compaction_folds_log_into_snapshot(tmp_path):
+    path = tmp_path / "likes.json"
+    index = LikesIndex(str(path))
+    index.like("nico", 1)
+    index.like("nico", 2)
+    index.unlike("nico", 1)
+
+    index.log.compact()
+
+    assert not os.path.exists(index.log.log_path)
+    assert not os.path.exists(index.log.old_log_path)
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == {"nico": [2]}
+
+    # Después de compactar se sigue escribiendo en un log nuevo
+    index.like("ana", 2)
+    assert index.count(2) == 2
+
+
+def test_torn_trailing_line_is_ignored(tmp_path):
+    path = tmp_path / "likes.json"
+    with open(tmp_path / "likes.log", "wb") as f:
+        f.write(b'["+","nico",1]\n["+","nico",')
+
+    index = LikesIndex(str(path))
+    assert index.as_dict() == {"nico": [1]}
+
+
+def test_size_threshold_triggers_background_compaction(tmp_path):
+    index = LikesIndex(str(tmp_path / "likes.json"), compact_bytes=64)
+    for mid in range(20):
+        index.like("nico", mid)
+
+    # Esperar a que termine la compactación de fondo
+    assert index.log._compactor is not None
+    index.log._compactor.join()
+
+    index.log.close()
+    assert LikesIndex(str(tmp_path / "likes.json")).count(19) == 1
+    assert os.path.getsize(tmp_path / "likes.json") > 0
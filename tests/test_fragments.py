@@ -0,0 +1,69 @@
+from fastapi.testclient import TestClient
+from psoftware.app import app, fragments, likes_index
+from psoftware.fragments import Fragment, FragmentCache, bytecode_cache
+from fastapi.templating import Jinja2Templates
+import os
+from unittest.mock import patch
+
+client = TestClient(app)
+
+PAGE = {"results": [
+    {"id": 7001, "title": "Uno <b>", "poster_path": None, "vote_average": 7.5},
+    {"id": 7002, "title": "Dos", "poster_path": None, "vote_average": 6.0},
+], "total_pages": 1}
+
+
+def setup_module(module):
+    os.makedirs("data", exist_ok=True)
+    with open("data/users.csv", "w", encoding="utf-8") as f:
+        f.write("username,email,password\nana,ana@example.com,pw\nluis,luis@example.com,pw\n")
+
+
+def login(username):
+    client.post("/login", data={"identifier": username, "password": "pw"}, follow_redirects=False)
+
+
+def test_fragment_fill():
+    fragment = Fragment("<a><!--likes:1--></a><b><!--likes:22--></b>")
+    assert fragment.movie_ids == [1, 22]
+    assert fragment.fill({22: 5}) == "<a>0</a><b>5</b>"
+
+
+def test_cache_renders_once_per_key(tmp_path):
+    (tmp_path / "grid.html").write_text("{% for m in movies %}{{ m }}={{ likes(m) }};{% endfor %}")
+    cache = FragmentCache(Jinja2Templates(directory=str(tmp_path)), maxsize=1)
+
+    first = cache.get("grid.html", ("es-ES", "v1"), movies=[1, 2])
+    assert cache.get("grid.html", ("es-ES", "v1"), movies=[9]) is first
+    assert first.fill({1: 3}) == "1=3;2=0;"
+    cache.get("grid.html", ("en-US", "v1"), movies=[1])
+    assert cache.stats() == {"size": 1, "maxsize": 1, "hits": 1, "misses": 2}
+
+
+def test_dashboard_grid_shared_between_users():
+    """Misma página para dos usuarios: un solo render de la rejilla y likes actuales."""
+    fragments.clear()
+    before = fragments.stats()
+
+    with patch("psoftware.app.atmdb.discover", return_value=PAGE), \
+         patch.object(likes_index, "counts", side_effect=[{}, {7001: 1}]):
+        login("ana")
+        first = client.get("/dashboard?page=77")
+        login("luis")
+        second = client.get("/dashboard?page=77")
+
+    stats = fragments.stats()
+    assert stats["misses"] - before["misses"] == 1
+    assert stats["hits"] - before["hits"] == 1
+    assert "Uno &lt;b&gt;" in second.text
+    assert "👤 luis" in second.text
+    assert '<span class="like-count">0</span>' in first.text
+    assert '<span class="like-count">1</span>' in second.text
+
+
+def test_bytecode_cache_persists(tmp_path):
+    (tmp_path / "t.html").write_text("{{ x }}")
+    cache_dir = str(tmp_path / "bc")
+    Jinja2Templates(directory=str(tmp_path), bytecode_cache=bytecode_cache(cache_dir)) \
+        .get_template("t.html").render(x=1)
+    assert os.listdir(cache_dir)
@@ -0,0 +1,46 @@
+from psoftware.likes_index import LikesIndex
+import json
+import os
+
+
+def make_index(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    return LikesIndex(str(path))
+
+
+def test_counts_and_membership(tmp_path):
+    index = make_index(tmp_path / "likes.json", {"nico": [1, 2], "ana": [2]})
+    assert index.counts([1, 2, 3]) == {1: 1, 2: 2, 3: 0}
+    assert index.has_liked("nico", 1)
+    assert not index.has_liked("ana", 1)
+
+
+def test_like_and_unlike_are_incremental_and_persisted(tmp_path):
+    path = tmp_path / "likes.json"
+    index = make_index(path, {"nico": [1]})
+
+    assert index.like("ana", 1)
+    assert not index.like("ana", 1)      # like repetido no cuenta
+    assert index.count(1) == 2
+
+    assert index.unlike("nico", 1)
+    assert not index.unlike("nico", 1)
+    assert index.count(1) == 1
+
+    # Otro proceso que arranca ve el mismo estado (snapshot + log)
+    index.log.close()
+    assert LikesIndex(str(path)).as_dict() == {"nico": [], "ana": [1]}
+
+
+def test_external_file_change_invalidates_index(tmp_path):
+    path = tmp_path / "likes.json"
+    index = make_index(path, {"nico": [1]})
+    assert index.count(1) == 1
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"nico": [1], "ana": [1], "luis": [1, 5]}, f)
+    os.utime(path, ns=(0, 1))   # mtime distinto aunque el reloj no avance
+
+    assert index.count(1) == 3
+    assert index.count(5) == 1
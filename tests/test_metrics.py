@@ -0,0 +1,107 @@
+from fastapi.testclient import TestClient
+from psoftware.app import app, atmdb, metrics
+import httpx
+import os
+from unittest.mock import patch
+
+client = TestClient(app)
+
+
+def setup_module(module):
+    os.makedirs("data", exist_ok=True)
+    with open("data/users.csv", "w", encoding="utf-8") as f:
+        f.write("username,email,password\n")
+        f.write("admin,admin@example.com,admin123\n")
+        f.write("nico,nico@example.com,pw\n")
+
+
+def login(username, password):
+    client.post("/login", data={"identifier": username, "password": password},
+                follow_redirects=False)
+
+
+def test_histogram_quantiles():
+    h = metrics.Histogram(buckets=(0.01, 0.1, 1.0))
+    for _ in range(90):
+        h.observe(0.005)
+    for _ in range(10):
+        h.observe(0.5)
+
+    assert h.count == 100
+    assert h.quantile(0.5) <= 0.01
+    assert 0.1 < h.quantile(0.95) <= 1.0
+    assert h.summary()["count"] == 100
+
+
+def test_timed_outside_request_is_noop():
+    with metrics.timed("upstream"):
+        pass
+    assert metrics.current() is None
+
+
+def test_route_split_upstream_and_template():
+    """El detalle de película separa tiempo de TMDB y de plantilla, por plantilla de ruta."""
+    metrics.registry.reset()
+    login("nico", "pw")
+
+    async def slow_fetch(endpoint, params):
+        with metrics.timed("upstream"):
+            return {"id": 550, "title": "Fight Club", "overview": "", "poster_path": None}
+
+    with patch.object(atmdb.cache, "get", return_value=None), \
+         patch.object(atmdb, "_fetch", side_effect=slow_fetch):
+        assert client.get("/movie/550").status_code == 200
+        assert client.get("/movie/603").status_code == 200
+
+    route = metrics.registry.snapshot()["routes"]["GET /movie/{movie_id}"]
+    assert route["requests"] == 2
+    assert route["upstream_calls"] == 2
+    assert route["template"]["count"] == 2
+    assert route["template"]["sum_ms"] > 0
+
+
+def test_admin_metrics_json_and_prometheus():
+    login("nico", "pw")
+    assert client.get("/admin/metrics").status_code == 403
+
+    login("admin", "admin123")
+    data = client.get("/admin/metrics").json()
+    assert "POST /login" in data["routes"]
+
+    text = client.get("/admin/metrics?format=prometheus")
+    assert text.headers["content-type"].startswith("text/plain")
+    assert 'cine_request_seconds_count{route="POST /login"}' in text.text
+    assert 'le="+Inf"' in text.text
+
+
+def test_profiler_keeps_slowest():
+    profiler = metrics.SamplingProfiler(keep=2)
+    for wall in (0.1, 0.3, 0.2, 0.05):
+        profiler.finish("GET /x", metrics.RequestTimings(), wall)
+
+    assert [r["wall_ms"] for r in profiler.slowest()] == [300.0, 200.0]
+
+
+def test_movie_page_is_one_upstream_call():
+    """Detalle con tráiler y similares de TMDB: una llamada en frío, ninguna en caliente."""
+    login("nico", "pw")
+    calls = []
+
+    def handler(request):
+        calls.append(request.url)
+        return httpx.Response(200, json={
+            "id": 424242, "title": "Nueva",
+            "videos": {"results": [{"key": "yt42", "site": "YouTube", "type": "Trailer"}]},
+            "similar": {"results": [{"id": 7, "title": "Parecida", "poster_path": None}]},
+        })
+
+    metrics.registry.reset()
+    with patch.object(atmdb, "transport", httpx.MockTransport(handler)), \
+         patch.object(atmdb, "_loop", None):
+        first = client.get("/movie/424242")
+        second = client.get("/movie/424242")
+        assert len(calls) == 1
+
+    assert "yt42" in first.text and "Parecida" in first.text
+    assert second.status_code == 200
+    assert metrics.registry.snapshot()["routes"]["GET /movie/{movie_id}"]["upstream_calls"] == 1
@@ -0,0 +1,63 @@
+from fastapi.testclient import TestClient
+from psoftware.app import app, poster_cache, poster_url
+from psoftware.storage import CustomMovieRepository
+import os
+import pytest
+import requests
+from unittest.mock import patch
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    with patch.object(poster_cache, "root", str(tmp_path)), \
+         patch.object(poster_cache, "_refs", {}):
+        yield tmp_path
+
+
+def test_poster_url():
+    assert poster_url({"id": 1, "poster_path": "/a.jpg"}) == "/posters/w300/a.jpg"
+    assert poster_url({"id": 1, "poster_path": None}, "w500") == "/posters/w500/none.svg"
+    assert poster_url({"id": 100001, "poster": "https://x/p.jpg", "custom": True}) == "https://x/p.jpg"
+    assert poster_url({"id": 100001, "poster": "https://via.placeholder.com/300x450", "custom": True}) == \
+        "/posters/w300/custom/100001.svg"
+    # Id de TMDB por encima del primer id propio y sin cartel: genérico
+    assert poster_url({"id": 1228246, "poster_path": None}) == "/posters/w300/none.svg"
+
+
+def test_fetched_once_and_served_from_disk(cache_dir):
+    with patch("posters.atmdb.image", return_value=b"JPEG") as image:
+        first = client.get("/posters/w300/abc.jpg")
+        assert image.call_count == 2             # w300 y, en segundo plano, w500
+        second = client.get("/posters/w300/abc.jpg")
+        cached = client.get("/posters/w500/abc.jpg", headers={"If-None-Match": first.headers["etag"]})
+        assert image.call_count == 2
+
+    assert first.content == second.content == b"JPEG"
+    assert "immutable" in first.headers["cache-control"]
+    assert cached.status_code == 304
+    # Mismo contenido en los dos tamaños: un solo objeto en disco
+    objects = [f for _, _, files in os.walk(cache_dir / "objects") for f in files]
+    assert len(objects) == 1
+
+
+def test_upstream_failure_serves_placeholder(cache_dir):
+    with patch("posters.atmdb.image", side_effect=requests.ConnectionError("down")):
+        response = client.get("/posters/w300/zzz.jpg")
+    assert response.headers["content-type"] == "image/svg+xml"
+    assert response.headers["cache-control"] == "no-store"
+    assert client.get("/posters/w999/zzz.jpg").status_code == 404
+    assert client.get("/posters/w300/..%2Fetc.jpg").status_code == 404
+
+
+def test_custom_movie_placeholder(tmp_path):
+    with patch("data_base.MOVIES_FILE", str(tmp_path / "custom_movies.json")), \
+         patch.object(CustomMovieRepository, "_cache", None):
+        movie_id = CustomMovieRepository.add_movie("Mi <película>", "d", "")
+        response = client.get(f"/posters/w300/custom/{movie_id}.svg")
+        assert "Mi &lt;película&gt;" in response.text
+        again = client.get(f"/posters/w300/custom/{movie_id}.svg",
+                           headers={"If-None-Match": response.headers["etag"]})
+        assert again.status_code == 304
+        assert client.get("/posters/w300/custom/999999.svg").status_code == 404
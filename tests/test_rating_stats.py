@@ -0,0 +1,49 @@
+from fastapi.testclient import TestClient
+from psoftware.app import app
+from psoftware.rating_stats import RatingAggregates, wilson_lower_bound
+from psoftware.storage import RatingRepository
+import random
+from unittest.mock import patch
+
+client = TestClient(app)
+
+
+def test_wilson_prefers_more_evidence():
+    assert wilson_lower_bound(0, 0) == 0.0
+    assert wilson_lower_bound(900, 100) > wilson_lower_bound(9, 1)
+    assert wilson_lower_bound(10, 0) < 1.0
+
+
+def test_incremental_updates_match_rebuild():
+    rng = random.Random(7)
+    ratings = {}
+    aggregates = RatingAggregates()
+    for _ in range(2000):
+        user, movie_id = f"u{rng.randrange(50)}", rng.randrange(30)
+        new = rng.choice([1, -1])
+        old = ratings.setdefault(user, {}).get(str(movie_id), 0)
+        ratings[user][str(movie_id)] = new
+        aggregates.update(movie_id, old, new)
+
+    rebuilt = RatingAggregates()
+    rebuilt.reset(ratings)
+    assert aggregates.top(30) == rebuilt.top(30)
+    scores = [m["score"] for m in aggregates.top(30)]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_top_endpoint_and_vote_flip(tmp_path):
+    with patch("data_base.RATINGS_FILE", str(tmp_path / "ratings.json")), \
+            patch.object(RatingRepository, "_log", None), \
+            patch("api.recommender"):
+        for user in ("nico", "ana", "luis"):
+            assert client.post(f"/api/movie/7/rate?user={user}&rating=1").status_code == 200
+        client.post("/api/movie/8/rate?user=nico&rating=1")
+        client.post("/api/movie/7/rate?user=ana&rating=-1")     # cambia su voto
+
+        assert client.get("/api/movie/7/rating").json()["likes"] == 2
+        assert client.get("/api/movie/7/rating").json()["dislikes"] == 1
+
+        top = client.get("/api/movies/top?limit=1").json()["movies"]
+        assert [m["movie_id"] for m in top] == [7]
+        assert client.get("/api/movies/top?limit=0").status_code == 422
@@ -0,0 +1,72 @@
+from psoftware.recommender import MAX_USER_ITEMS, ItemRecommender, signals_from
+import random
+
+
+def test_cosine_neighbours():
+    rec = ItemRecommender(top_k=5)
+    rec.build(signals_from({
+        "ana": [1, 2, 3],
+        "luis": [1, 2],
+        "eva": [1, 4],
+    }, {}))
+
+    # sim(1,2) = 2 / sqrt(3*2), sim(1,3) = 1 / sqrt(3*1), sim(1,4) = 1 / sqrt(3*1)
+    assert [mid for mid, _ in rec.similar(1)] == [2, 3, 4]
+    assert rec.similar(2)[0] == (1, round(2 / 6 ** 0.5, 6))
+    assert rec.similar(99) == []
+
+
+def test_rating_and_like_are_one_signal():
+    rec = ItemRecommender()
+    rec.build(signals_from({"ana": [1, 2]}, {"ana": {"2": 1, "3": -1}}))
+    assert [mid for mid, _ in rec.similar(1)] == [2]
+
+    # Quitar el like no basta: sigue la valoración positiva
+    rec.remove("ana", 2, "like")
+    assert [mid for mid, _ in rec.similar(1)] == [2]
+    rec.remove("ana", 2, "rating")
+    assert rec.similar(1) == []
+
+
+def test_incremental_matches_full_rebuild():
+    """Tras una secuencia aleatoria de altas y bajas, igual que reconstruir."""
+    rnd = random.Random(7)
+    rec = ItemRecommender(top_k=5)
+    rec.build([])
+    held = set()
+
+    for _ in range(3000):
+        user, movie = f"u{rnd.randrange(40)}", rnd.randrange(30)
+        if (user, movie) in held and rnd.random() < 0.4:
+            rec.remove(user, movie)
+            held.discard((user, movie))
+        else:
+            rec.add(user, movie)
+            held.add((user, movie))
+    rec._refresh_stale(limit=10 ** 6)
+
+    fresh = ItemRecommender(top_k=5)
+    fresh.build((u, m, "like") for u, m in held)
+    for movie in range(30):
+        assert rec.similar(movie) == fresh.similar(movie)
+
+
+def test_removal_inside_window_admits_next_item():
+    """Con más de MAX_USER_ITEMS likes, la película que entra en la ventana suma sus pares."""
+    rec = ItemRecommender(top_k=5)
+    rec.build([])
+    for movie in range(MAX_USER_ITEMS + 1):
+        rec.add("ana", movie)
+    rec.add("luis", MAX_USER_ITEMS)
+    rec.add("luis", 1)
+
+    rec.remove("ana", 0)
+    rec.remove("ana", MAX_USER_ITEMS)       # antes: KeyError, sus pares nunca se contaron
+    rec.remove("ana", 1)
+
+    fresh = ItemRecommender(top_k=5)
+    fresh.build([("ana", m, "like") for m in range(2, MAX_USER_ITEMS)] +
+                [("luis", MAX_USER_ITEMS, "like"), ("luis", 1, "like")])
+    assert rec._co == fresh._co
+    rec._refresh_stale(limit=10 ** 6)
+    assert rec.similar(1) == fresh.similar(1)
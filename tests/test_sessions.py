@@ -0,0 +1,118 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from psoftware import sqlite_store
+from psoftware.app import app
+from psoftware.sessions import MemorySessionStore, ServerSessionMiddleware
+import os
+from unittest.mock import patch
+
+
+def make_client(store, **options):
+    demo = FastAPI()
+    demo.add_middleware(ServerSessionMiddleware, store=store, **options)
+
+    @demo.get("/set/{key}/{value}")
+    def set_value(request: Request, key: str, value: str):
+        request.session[key] = value
+        return {}
+
+    @demo.get("/get")
+    def get_values(request: Request):
+        return request.session
+
+    @demo.get("/clear")
+    def clear(request: Request):
+        request.session.clear()
+        return {}
+
+    return TestClient(demo)
+
+
+def test_cookie_is_opaque_and_only_sent_on_change():
+    store = MemorySessionStore()
+    client = make_client(store)
+
+    assert "set-cookie" not in client.get("/get").headers      # sin sesión no hay cookie
+    first = client.get("/set/flash/hola")
+    session_id = client.cookies["session"]
+    assert "hola" not in first.headers["set-cookie"]
+    assert store.load(session_id) == '{"flash":"hola"}'
+
+    with patch.object(store, "save", wraps=store.save) as save:
+        response = client.get("/get")
+        assert response.json() == {"flash": "hola"}
+        assert "set-cookie" not in response.headers
+        assert save.call_count == 0
+
+        client.get("/set/flash/adios")                          # cambia: se guarda, misma cookie
+        assert save.call_count == 1
+        assert client.cookies["session"] == session_id
+
+    client.get("/clear")
+    assert len(store) == 0
+    assert client.get("/get").json() == {}
+
+
+def test_new_id_when_user_changes():
+    store = MemorySessionStore()
+    client = make_client(store)
+    client.get("/set/flash/x")
+    anonymous = client.cookies["session"]
+
+    client.get("/set/user/nico")
+    assert client.cookies["session"] != anonymous
+    assert store.load(anonymous) is None
+    assert client.get("/get").json() == {"flash": "x", "user": "nico"}
+
+
+def test_active_session_is_renewed_past_half_its_age():
+    store = MemorySessionStore()
+    client = make_client(store, max_age=100)
+    client.get("/set/user/nico")
+    session_id = client.cookies["session"]
+    assert "set-cookie" not in client.get("/get").headers      # recién creada: nada que renovar
+
+    store.save(session_id, store.load(session_id), 40)           # han pasado 60 de 100 segundos
+    response = client.get("/get")
+    assert response.headers["set-cookie"].startswith(f"session={session_id}; path=/; Max-Age=100;")
+    assert store.load_entry(session_id)[1] > 50
+    assert "set-cookie" not in client.get("/get").headers
+
+
+def test_memory_store_lru_and_ttl():
+    store = MemorySessionStore(maxsize=2)
+    store.save("a", "{}", 60)
+    store.save("b", "{}", 60)
+    store.load("a")
+    store.save("c", "{}", 60)
+    assert store.load("b") is None
+    assert store.load("a") == "{}"
+
+    store.save("old", "{}", -1)
+    assert store.load("old") is None
+
+
+def test_sqlite_store(tmp_path):
+    with patch.object(sqlite_store, "DB_FILE", str(tmp_path / "cine.db")):
+        store = sqlite_store.SQLiteSessionStore()
+        client = make_client(store)
+        client.get("/set/user/nico")
+        assert client.get("/get").json() == {"user": "nico"}
+        assert len(store) == 1
+
+        store.save("old", "{}", -1)
+        assert store.load("old") is None
+        client.get("/clear")
+        assert len(store) == 0
+
+
+def test_app_login_sets_cookie_once():
+    os.makedirs("data", exist_ok=True)
+    with open("data/users.csv", "w", encoding="utf-8") as f:
+        f.write("username,email,password\nnico,nico@example.com,pw\n")
+
+    client = TestClient(app)
+    login = client.post("/login", data={"identifier": "nico", "password": "pw"}, follow_redirects=False)
+    assert len(client.cookies["session"]) == 43
+    assert "set-cookie" in login.headers
+    assert "set-cookie" not in client.get("/admin/metrics").headers
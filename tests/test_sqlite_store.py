@@ -0,0 +1,104 @@
+from psoftware import sqlite_store
+from psoftware.sqlite_store import (
+    SQLiteCustomMovieRepository, SQLiteRatingRepository, SQLiteUserRepository, migrate_from_files
+)
+import json
+import pytest
+from unittest.mock import patch
+
+
+@pytest.fixture
+def db(tmp_path):
+    with patch.object(sqlite_store, "DB_FILE", str(tmp_path / "cine.db")):
+        yield tmp_path
+
+
+def test_users(db):
+    SQLiteUserRepository.save_user("nico", "nico@mail.com", "1234")
+    assert SQLiteUserRepository.user_exists("nico", "otro@mail.com")
+    assert SQLiteUserRepository.user_exists("otro", "nico@mail.com")
+    assert not SQLiteUserRepository.user_exists("otro", "otro@mail.com")
+    assert SQLiteUserRepository.validate_login("nico@mail.com", "1234")
+    assert not SQLiteUserRepository.validate_login("nico", "0000")
+
+
+def test_custom_movies_keep_id_range(db):
+    first = SQLiteCustomMovieRepository.add_movie("Uno", "desc", "poster")
+    second = SQLiteCustomMovieRepository.add_movie("Dos", "desc", "poster")
+    assert (first, second) == (100001, 100002)
+
+    assert SQLiteCustomMovieRepository.version()["version"] == 2
+
+    assert SQLiteCustomMovieRepository.delete_movie(first)
+    assert not SQLiteCustomMovieRepository.delete_movie(first)
+    assert SQLiteCustomMovieRepository.version()["version"] == 3
+    assert [m["title"] for m in SQLiteCustomMovieRepository.load_movies()] == ["Dos"]
+
+
+def test_ratings_upsert(db):
+    SQLiteRatingRepository.rate_movie("nico", 550, 1)
+    SQLiteRatingRepository.rate_movie("nico", 550, -1)
+    assert SQLiteRatingRepository.get_user_rating("nico", 550) == -1
+    assert SQLiteRatingRepository.get_user_rating("nico", 1) == 0
+    assert SQLiteRatingRepository.load_ratings() == {"nico": {"550": -1}}
+
+
+def test_migration_runs_once(db):
+    users = db / "users.csv"
+    users.write_text("username,email,password\nnico,nico@mail.com,1234\n", encoding="utf-8")
+    movies = db / "custom_movies.json"
+    movies.write_text(json.dumps({"movies": [
+        {"id": 100007, "title": "Propia", "description": "d", "poster": "p"}
+    ]}), encoding="utf-8")
+    ratings = db / "ratings.json"
+    ratings.write_text(json.dumps({"nico": {"550": 1}}), encoding="utf-8")
+
+    with patch("data_base.USERS_FILE", str(users)), \
+         patch("data_base.MOVIES_FILE", str(movies)), \
+         patch("data_base.RATINGS_FILE", str(ratings)), \
+         patch("data_base.RatingRepository._log", None):
+        assert migrate_from_files() == {"users": 1, "movies": 1, "ratings": 1}
+        assert migrate_from_files() is None
+
+    assert SQLiteUserRepository.validate_login("nico", "1234")
+    assert SQLiteCustomMovieRepository.load_movies()[0]["id"] == 100007
+    assert SQLiteRatingRepository.get_user_rating("nico", 550) == 1
+    # El siguiente id continúa después de los migrados
+    assert SQLiteCustomMovieRepository.add_movie("Nueva", "d", "p") == 100008
+
+
+def test_custom_movies_bulk(db):
+    ids = SQLiteCustomMovieRepository.add_movies(
+        [{"title": f"P{i}", "description": "d", "poster": "p"} for i in range(3)]
+    )
+    assert ids == [100001, 100002, 100003]
+    assert SQLiteCustomMovieRepository.version()["version"] == 1
+    assert SQLiteCustomMovieRepository.get_movie(100002)["title"] == "P1"
+
+    assert SQLiteCustomMovieRepository.delete_movies([100003, 100001, 999]) == [100003, 100001]
+    assert SQLiteCustomMovieRepository.get_movie(100001) is None
+    # Los ids borrados no se reutilizan
+    assert SQLiteCustomMovieRepository.add_movie("Nueva", "d", "p") == 100004
+
+
+def test_custom_movies_page(db):
+    ids = SQLiteCustomMovieRepository.add_movies(
+        [{"title": f"P{i}", "description": "d", "poster": "p"} for i in range(5)]
+    )
+    assert [m["id"] for m in SQLiteCustomMovieRepository.page_movies(ids[1], 2)] == ids[2:4]
+    assert SQLiteCustomMovieRepository.page_movies(ids[-1], 10) == []
+
+
+def test_movie_stats_follow_vote_flips(db):
+    SQLiteRatingRepository.rate_movie("nico", 550, 1)
+    SQLiteRatingRepository.rate_movie("ana", 550, 1)
+    SQLiteRatingRepository.rate_movie("ana", 550, -1)       # cambia su voto
+    SQLiteRatingRepository.rate_movies([("luis", 13, 1), ("eva", 13, 1), ("nico", 13, 1)])
+
+    stats = SQLiteRatingRepository.movie_stats(550)
+    assert (stats["likes"], stats["dislikes"]) == (1, 1)
+    assert [m["movie_id"] for m in SQLiteRatingRepository.top_movies(5)] == [13, 550]
+
+    # Lo mantenido coincide con recalcularlo desde ratings
+    SQLiteRatingRepository.save_ratings(SQLiteRatingRepository.load_ratings())
+    assert SQLiteRatingRepository.movie_stats(550) == stats
@@ -0,0 +1,77 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from psoftware.app import app, static_assets
+from psoftware.static_assets import StaticAssets, accepted_encodings, build
+import json
+import os
+import pytest
+
+CSS = "body { color: #222; }\n" * 40
+
+
+@pytest.fixture
+def assets(tmp_path):
+    src = tmp_path / "static"
+    src.mkdir()
+    (src / "style.css").write_text(CSS)
+    (src / "tiny.css").write_text("a{}")
+    demo = FastAPI()
+    handler = StaticAssets(src=str(src), out=str(tmp_path / "build"))
+    demo.mount("/static", handler)
+    return handler, TestClient(demo), tmp_path
+
+
+def test_build_fingerprints_and_compresses(assets):
+    handler, _, tmp_path = assets
+    hashed = handler.manifest["style.css"]
+    assert hashed.startswith("style.") and hashed.endswith(".css") and hashed != "style.css"
+
+    out = tmp_path / "build"
+    assert (out / (hashed + ".gz")).exists() and (out / (hashed + ".br")).exists()
+    assert not (out / (handler.manifest["tiny.css"] + ".gz")).exists()     # demasiado pequeño
+    assert json.loads((out / "manifest.json").read_text()) == handler.manifest
+    assert build(str(tmp_path / "static"), str(out)) == handler.manifest
+
+
+def test_negotiates_precompressed_variant(assets):
+    handler, client, _ = assets
+    url = handler.url("style.css")
+
+    br = client.get(url, headers={"Accept-Encoding": "gzip, br"})
+    assert br.headers["content-encoding"] == "br"
+    assert br.text == CSS
+
+    gz = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert gz.headers["content-encoding"] == "gzip"
+    assert gz.headers["content-type"].startswith("text/css")
+    assert gz.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert gz.headers["vary"] == "Accept-Encoding"
+    assert gz.text == CSS
+
+    plain = client.get(url, headers={"Accept-Encoding": "gzip;q=0"})
+    assert "content-encoding" not in plain.headers
+    assert int(plain.headers["content-length"]) == len(CSS)
+    assert plain.headers["etag"] != gz.headers["etag"]
+
+    again = client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": gz.headers["etag"]})
+    assert again.status_code == 304
+
+
+def test_unhashed_names_fall_back_to_static_files(assets):
+    _, client, _ = assets
+    response = client.get("/static/style.css")
+    assert response.status_code == 200
+    assert "immutable" not in response.headers.get("cache-control", "")
+    assert client.get("/static/missing.css").status_code == 404
+
+
+def test_accepted_encodings():
+    assert accepted_encodings("gzip, deflate, br;q=0.5") == {"gzip", "deflate", "br"}
+    assert accepted_encodings("gzip;q=0, br") == {"br"}
+
+
+def test_base_template_uses_hashed_url():
+    os.makedirs("data", exist_ok=True)
+    page = TestClient(app).get("/login")
+    assert static_assets.url("style.css") in page.text
+    assert static_assets.url("style.css") != "/static/style.css"
@@ -0,0 +1,42 @@
+from fastapi.testclient import TestClient
+from psoftware.app import app
+from psoftware.storage import CustomMovieRepository
+from psoftware.tk_client import ResponseCache, Worker, cached_pages, fetch_pages
+import threading
+from unittest.mock import patch
+
+client = TestClient(app)
+
+
+def test_pages_are_cached_and_revalidated(tmp_path):
+    movies = [{"id": 100000 + i, "title": f"P{i}", "description": "d", "poster": "p"} for i in range(5)]
+    cache = ResponseCache(str(tmp_path))
+    with patch("data_base.MOVIES_FILE", str(tmp_path / "custom_movies.json")), \
+            patch("psoftware.tk_client.PAGE_SIZE", 2):
+        CustomMovieRepository.save_movies(movies)
+
+        first = list(fetch_pages(client, cache))
+        assert [(offset, changed) for offset, _, changed in first] == [(0, True), (2, True), (4, True)]
+        assert [m["id"] for page in cached_pages(cache) for m in page] == [m["id"] for m in movies]
+
+        # Sin cambios: todo 304, las películas salen del disco
+        again = list(fetch_pages(client, cache))
+        assert [changed for _, _, changed in again] == [False, False, False]
+        assert sum(len(page) for _, page, _ in again) == 5
+
+
+def test_worker_runs_jobs_off_the_calling_thread():
+    worker = Worker()
+    worker.start()
+    seen = []
+    done = threading.Event()
+
+    def job(emit):
+        emit(seen.append, threading.current_thread() is worker)
+        done.set()
+
+    worker.submit(job)
+    assert done.wait(5)
+    assert seen == []           # hasta que la ventana vacía la cola
+    worker.drain()
+    assert seen == [True]
@@ -0,0 +1,402 @@
+from psoftware.tmdb_client import (AsyncTMDBClient, CircuitBreaker, SingleFlight, TMDBClient, TokenBucket, TTLCache,
+                                   UpstreamUnavailable, metrics, pick_trailer, retry_delay)
+import asyncio
+import httpx
+import pytest
+import requests
+import threading
+from unittest.mock import MagicMock, patch
+
+
+def fake_response(payload, status=200):
+    r = MagicMock()
+    r.status_code = status
+    r.json.return_value = payload
+    return r
+
+
+def test_cache_hit_avoids_second_request():
+    client = TMDBClient(cache=TTLCache(maxsize=10, ttl=60))
+    with patch.object(client.session, "get", return_value=fake_response({"results": [1]})) as get:
+        assert client.discover(page=1) == {"results": [1]}
+        assert client.discover(page=1) == {"results": [1]}
+        assert get.call_count == 1
+
+    stats = client.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_cache_key_includes_params():
+    client = TMDBClient(cache=TTLCache(maxsize=10, ttl=60))
+    with patch.object(client.session, "get", return_value=fake_response({"results": []})) as get:
+        client.discover(page=1)
+        client.discover(page=2)
+        client.search("matrix", page=1)
+        client.movie(550, language="en-US")
+        client.movie(550)
+        assert get.call_count == 5
+
+
+def test_lru_eviction_and_ttl():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")          # "a" pasa a ser la más reciente
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+    expired = TTLCache(maxsize=2, ttl=-1)
+    expired.set("a", 1)
+    assert expired.get("a") is None
+
+
+def test_recheck_under_single_flight_does_not_count_lookups():
+    client = TMDBClient(cache=TTLCache(maxsize=10, ttl=60))
+    client.cache.set("k", {"results": [1]})     # otro hilo la llenó mientras tanto
+    with patch.object(client.session, "get") as get:
+        assert client._fetch_and_store("k", "/discover/movie", {}) == {"results": [1]}
+        assert get.call_count == 0
+    stats = client.cache.stats()
+    assert (stats["hits"], stats["misses"]) == (0, 0)
+
+
+def test_prefetch_fills_cache_and_counts_hits():
+    client = TMDBClient(cache=TTLCache(maxsize=10, ttl=60))
+    with patch.object(client.session, "get", return_value=fake_response({"results": [2]})) as get:
+        assert client.prefetch_page(2)
+        client._prefetch_pool.shutdown(wait=True)
+
+        assert client.discover(page=2) == {"results": [2]}
+        assert get.call_count == 1
+
+    # Ya está en cache: no se vuelve a programar
+    assert not client.prefetch_page(2)
+    stats = client.stats()["prefetch"]
+    assert stats["completed"] == 1
+    assert stats["hits"] == 1
+    assert stats["skipped_cached"] == 1
+
+
+def test_unread_prefetches_are_bounded_by_the_cache_size():
+    client = TMDBClient(cache=TTLCache(maxsize=2, ttl=60))
+    with patch.object(client.session, "get", return_value=fake_response({"results": []})):
+        for page in range(1, 6):
+            assert client.prefetch_page(page)
+        client._prefetch_pool.shutdown(wait=True)
+    assert len(client._prefetched) == 2
+    assert client.stats()["prefetch"]["completed"] == 5
+
+
+def test_prefetch_suppresses_duplicates_and_respects_cap():
+    client = TMDBClient(cache=TTLCache(maxsize=10, ttl=60))
+    release = threading.Event()
+
+    def slow_get(*args, **kwargs):
+        release.wait(5)
+        return fake_response({"results": []})
+
+    with patch.object(client.session, "get", side_effect=slow_get), \
+         patch("psoftware.tmdb_client.PREFETCH_MAX_INFLIGHT", 2):
+        assert client.prefetch_page(2)
+        assert not client.prefetch_page(2)          # duplicada
+        assert client.prefetch_page(3)
+        assert not client.prefetch_page(4)          # supera el máximo en curso
+        release.set()
+        client._prefetch_pool.shutdown(wait=True)
+
+    stats = client.stats()["prefetch"]
+    assert stats["scheduled"] == 2
+    assert stats["skipped_duplicate"] == 1
+    assert stats["dropped_cap"] == 1
+
+
+def test_async_prefetch_shares_the_request_with_the_dashboard():
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.params["page"])
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"results": [request.url.params["page"]]})
+
+    sync = TMDBClient(cache=TTLCache(maxsize=10, ttl=60))
+    client = AsyncTMDBClient(sync, transport=httpx.MockTransport(handler))
+
+    async def run():
+        assert client.prefetch_page(2)
+        assert await client.discover(page=2) == {"results": ["2"]}     # se une a la precarga
+        pending = asyncio.ensure_future(client.discover(page=3))
+        await asyncio.sleep(0)
+        assert not client.prefetch_page(3)                              # ya la pide el dashboard
+        await pending
+        await asyncio.gather(*client._background)
+
+    asyncio.run(run())
+    assert calls == ["2", "3"]
+    stats = sync.stats()["prefetch"]
+    assert stats["completed"] == 1
+    assert stats["skipped_duplicate"] == 1
+
+
+def test_pick_trailer():
+    videos = {"results": [
+        {"key": "t1", "site": "YouTube", "type": "Teaser"},
+        {"key": "v1", "site": "Vimeo", "type": "Trailer"},
+        {"key": "y1", "site": "YouTube", "type": "Trailer"},
+    ]}
+    assert pick_trailer(videos) == "y1"
+    assert pick_trailer({"results": []}) is None
+    assert pick_trailer(None) is None
+
+
+def test_movie_details_single_cached_request():
+    client = TMDBClient(cache=TTLCache(maxsize=10, ttl=60))
+    payload = {"id": 550, "videos": {"results": [{"key": "abc", "site": "YouTube", "type": "Trailer"}]}}
+    with patch.object(client.session, "get", return_value=fake_response(payload)) as get:
+        assert client.movie_details(550)["trailer_key"] == "abc"
+        assert client.movie_details(550)["trailer_key"] == "abc"
+        assert get.call_count == 1
+        assert get.call_args[1]["params"]["append_to_response"] == "videos,similar"
+
+
+def test_single_flight_coalesces_concurrent_misses():
+    client = TMDBClient(cache=TTLCache(maxsize=10, ttl=60))
+    release = threading.Event()
+    results = []
+
+    def slow_get(*args, **kwargs):
+        release.wait(5)
+        return fake_response({"results": ["x"]})
+
+    with patch.object(client.session, "get", side_effect=slow_get) as get:
+        threads = [threading.Thread(target=lambda: results.append(client.discover(page=1)))
+                   for _ in range(20)]
+        for t in threads:
+            t.start()
+        while client._flight.stats["leaders"] + client._flight.stats["shared"] < 20:
+            threading.Event().wait(0.01)
+        release.set()
+        for t in threads:
+            t.join()
+        assert get.call_count == 1
+
+    assert results == [{"results": ["x"]}] * 20
+    assert client.stats()["single_flight"] == {"leaders": 1, "shared": 19}
+
+
+def test_single_flight_shares_errors():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    errors = []
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise requests.HTTPError("404")
+
+    def call():
+        try:
+            flight.do("k", failing)
+        except requests.HTTPError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=call)
+    follower.start()
+    while flight.stats["shared"] < 1:
+        threading.Event().wait(0.01)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert len(errors) == 2 and errors[0] is errors[1]
+    assert not flight.inflight("k")
+
+
+def test_async_client_coalesces_and_caches():
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.params["page"])
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"results": [request.url.params["page"]]})
+
+    client = AsyncTMDBClient(TMDBClient(cache=TTLCache(maxsize=10, ttl=60)),
+                             max_concurrency=2, transport=httpx.MockTransport(handler))
+
+    async def run():
+        first = await asyncio.gather(*(client.discover(page=p) for p in (1, 1, 1, 2, 3)))
+        return first, await client.discover(page=1)
+
+    first, again = asyncio.run(run())
+    assert [r["results"] for r in first] == [["1"], ["1"], ["1"], ["2"], ["3"]]
+    assert again == {"results": ["1"]}
+    assert sorted(calls) == ["1", "2", "3"]
+
+
+def test_async_client_followers_survive_a_cancelled_leader():
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.params["page"])
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"results": ["ok"]})
+
+    client = AsyncTMDBClient(TMDBClient(cache=TTLCache(maxsize=10, ttl=60)), transport=httpx.MockTransport(handler))
+
+    async def run():
+        leader = asyncio.ensure_future(client.discover(page=1))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(client.discover(page=1))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower, leader.cancelled()
+
+    assert asyncio.run(run()) == ({"results": ["ok"]}, True)
+    assert calls == ["1"]
+
+
+def test_async_client_is_closed_with_its_event_loop():
+    client = AsyncTMDBClient(TMDBClient(cache=TTLCache(maxsize=10, ttl=60)),
+                             transport=httpx.MockTransport(lambda request: httpx.Response(200, json={})))
+
+    asyncio.run(client.discover(page=1))
+    first = client._client
+    asyncio.run(client.discover(page=2))
+    assert first.is_closed and client._client is not first and client._client.is_closed
+    assert not client._closers
+
+
+def test_background_work_does_not_count_for_the_request():
+    client = AsyncTMDBClient(TMDBClient(cache=TTLCache(maxsize=10, ttl=60)),
+                             transport=httpx.MockTransport(lambda request: httpx.Response(200, json={})))
+
+    async def run():
+        timings = metrics.RequestTimings()
+        token = metrics._current.set(timings)
+        try:
+            assert client.prefetch_page(2)
+            await client.spawn(client.discover(page=3))
+            await client.discover(page=1)
+        finally:
+            metrics._current.reset(token)
+        await asyncio.gather(*client._background)
+        return timings.upstream_calls
+
+    assert asyncio.run(run()) == 1         # solo la de la propia petición
+
+
+def test_async_client_raises_requests_errors():
+    client = AsyncTMDBClient(TMDBClient(cache=TTLCache(maxsize=10, ttl=60)),
+                             transport=httpx.MockTransport(lambda request: httpx.Response(404)))
+
+    async def run():
+        try:
+            await client.movie_details(1)
+        except requests.HTTPError:
+            return True
+
+    assert asyncio.run(run())
+    assert asyncio.run(client.movies([1, 2])) == {1: None, 2: None}
+
+
+def test_retries_then_opens_circuit_and_serves_stale():
+    client = TMDBClient(cache=TTLCache(maxsize=10, ttl=60), breaker=CircuitBreaker(threshold=3, reset_timeout=60))
+    with patch.object(client.session, "get", return_value=fake_response({"results": [1]})):
+        client.discover(page=1)
+    client.cache._data[next(iter(client.cache._data))] = (0, {"results": [1]})     # caducada
+
+    failing = fake_response(None, status=503)
+    failing.headers = {}
+    with patch.object(client.session, "get", return_value=failing) as get, \
+            patch("psoftware.tmdb_client.time.sleep") as sleep:
+        # 1 intento + 2 reintentos con espera; como hay versión caducada, se sirve esa
+        assert client.discover(page=1) == {"results": [1]}
+        assert get.call_count == 3 and sleep.call_count == 2
+        assert client.breaker.state == "open"
+
+        # Circuito abierto: ni se intenta
+        assert client.discover(page=1) == {"results": [1]}
+        with pytest.raises(UpstreamUnavailable):
+            client.discover(page=2)
+        assert get.call_count == 3
+
+    upstream = client.stats()["upstream"]
+    assert upstream["stale_served"] == 2
+    assert upstream["breaker"]["state"] == "open"
+
+
+def test_client_errors_are_not_retried():
+    client = TMDBClient(cache=TTLCache(maxsize=10, ttl=60))
+    missing = fake_response(None, status=404)
+    missing.raise_for_status.side_effect = requests.HTTPError("404")
+    with patch.object(client.session, "get", return_value=missing) as get:
+        with pytest.raises(requests.HTTPError):
+            client.movie(1)
+        assert get.call_count == 1
+    assert client.breaker.state == "closed"
+
+
+def test_token_bucket_and_jitter():
+    bucket = TokenBucket(rate=10, burst=2, max_wait=0.05)
+    bucket.acquire()
+    bucket.acquire()
+    with pytest.raises(UpstreamUnavailable):
+        bucket.acquire()        # tocaría esperar 0.1 s
+    assert bucket.stats["rejected"] == 1
+
+    assert all(0 <= retry_delay(3) <= 1.6 for _ in range(100))
+    assert retry_delay(0, retry_after=1) == 1
+    assert retry_delay(0, retry_after=60) is None
+
+
+def test_async_client_serves_stale_when_upstream_fails():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(200 if len(calls) == 1 else 502, json={"results": ["ok"]})
+
+    sync = TMDBClient(cache=TTLCache(maxsize=10, ttl=-1))       # todo caduca al momento
+    client = AsyncTMDBClient(sync, transport=httpx.MockTransport(handler))
+
+    async def run():
+        first = await client.discover(page=1)
+        return first, await client.discover(page=1)
+
+    with patch("psoftware.tmdb_client.retry_delay", return_value=0):
+        assert asyncio.run(run()) == ({"results": ["ok"]}, {"results": ["ok"]})
+    assert len(calls) == 4
+    assert sync.upstream_stats["stale_served"] == 1
+
+
+def test_breaker_trial_is_released_when_it_does_not_finish():
+    breaker = CircuitBreaker(threshold=1, reset_timeout=0, trial_timeout=60)
+    breaker.failure()
+    assert breaker.allow() and breaker.state == "half_open"
+    assert not breaker.allow()          # una sola prueba a la vez
+    breaker.record(None)                # cancelada: no cuenta ni bloquea
+    assert breaker.allow()
+
+    stuck = CircuitBreaker(threshold=1, reset_timeout=0, trial_timeout=0)
+    stuck.failure()
+    assert stuck.allow() and stuck.allow()      # la prueba anterior ha caducado
+
+
+def test_saturated_limiter_does_not_hold_the_breaker_trial():
+    breaker = CircuitBreaker(threshold=1, reset_timeout=0)
+    client = TMDBClient(cache=TTLCache(maxsize=10, ttl=60), breaker=breaker,
+                        limiter=TokenBucket(rate=1, burst=1, max_wait=0))
+    breaker.failure()
+    client.limiter.acquire()            # el siguiente tendría que esperar 1 s
+    with pytest.raises(UpstreamUnavailable):
+        client.discover(page=1)
+
+    client.limiter = TokenBucket(rate=100, burst=100)
+    with patch.object(client.session, "get", return_value=fake_response({"results": [1]})):
+        assert client.discover(page=1) == {"results": [1]}
+    assert breaker.state == "closed"
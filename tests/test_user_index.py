@@ -0,0 +1,43 @@
+from psoftware.data_base import UserIndex
+import csv
+import os
+from unittest.mock import patch
+
+
+def make_index(tmp_path):
+    path = tmp_path / "users.csv"
+    path.write_text("username,email,password\nnico,Nico@Mail.com,1234\n", encoding="utf-8")
+    return UserIndex(str(path)), path
+
+
+def test_lookup_by_username_and_lowercase_email(tmp_path):
+    index, _ = make_index(tmp_path)
+    assert [u["username"] for u in index.find("nico")] == ["nico"]
+    assert [u["username"] for u in index.find("nico@mail.com")] == ["nico"]
+    assert index.exists("otro", "NICO@MAIL.COM")
+    assert not index.exists("otro", "otro@mail.com")
+
+
+def test_append_does_not_reparse_file(tmp_path):
+    index, path = make_index(tmp_path)
+    index.refresh()
+
+    with patch("csv.DictReader", wraps=csv.DictReader) as reader:
+        index.append("ana", "ana@mail.com", "abcd")
+        for _ in range(100):
+            assert index.find("ana@mail.com")
+        assert reader.call_count == 0
+
+    # El fichero queda con la fila nueva
+    assert "ana,ana@mail.com,abcd" in path.read_text(encoding="utf-8")
+
+
+def test_external_change_reloads(tmp_path):
+    index, path = make_index(tmp_path)
+    assert not index.exists("luis", "luis@mail.com")
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("luis,luis@mail.com,pw\n")
+    os.utime(path, ns=(0, 1))
+
+    assert index.exists("luis", "luis@mail.com")
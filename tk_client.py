@@ -1,49 +1,287 @@
+"""
+Cliente de escritorio (Tk) del catálogo de películas propias.
+
+La red nunca se toca desde el hilo de Tk: un hilo de trabajo ejecuta las
+peticiones y devuelve los resultados por una cola que la ventana vacía cada
+POLL_MS. El catálogo se pide por páginas (/api/movies?after=&limit=) y cada
+página se guarda en disco con su ETag: al abrir se pinta lo guardado al
+instante y luego se revalida (304 si no ha cambiado nada).
+"""
+import hashlib
+import json
+import os
+import queue
+import threading
 import tkinter as tk
 from tkinter import messagebox, simpledialog
+
 import requests
 
 
-API = 'http://127.0.0.1:5000'
+API = os.environ.get('CINE_API', 'http://127.0.0.1:5000')
+PAGE_SIZE = 500             # películas por petición
+TIMEOUT = 10                # segundos por petición
+POLL_MS = 50                # cada cuánto mira la ventana la cola de resultados
+ROW_HEIGHT = 20             # píxeles por fila de la lista
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'cine-tk')
+
+
+# ================================
+# CACHÉ EN DISCO (ETag)
+# ================================
+class ResponseCache:
+    """Última respuesta de cada URL con su ETag: {dir}/{sha256(url)}.json."""
+
+    def __init__(self, directory=CACHE_DIR):
+        self.directory = directory
+
+    def _path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, url):
+        """(etag, datos) o None."""
+        try:
+            with open(self._path(url), encoding='utf-8') as f:
+                entry = json.load(f)
+            return entry['etag'], entry['data']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, url, etag, data):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(url)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'etag': etag, 'data': data}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+
+def page_url(after):
+    return f'{API}/api/movies?after={after}&limit={PAGE_SIZE}'
+
+
+def cached_pages(cache):
+    """Páginas guardadas en disco, siguiendo la cadena de cursores; sin red."""
+    after = 0
+    while after is not None:
+        entry = cache.get(page_url(after))
+        if entry is None:
+            return
+        page = entry[1]
+        yield page['movies']
+        after = page.get('next_after')
+
+
+def fetch_pages(session, cache):
+    """
+    Revalida las páginas del catálogo contra la API y las devuelve como
+    (posición de la primera película, películas, ha cambiado). Las que no
+    cambiaron (304) salen de la caché.
+    """
+    after, offset = 0, 0
+    while after is not None:
+        url = page_url(after)
+        entry = cache.get(url)
+        headers = {'If-None-Match': entry[0]} if entry else {}
+        r = session.get(url, headers=headers, timeout=TIMEOUT)
+        if r.status_code == 304 and entry:
+            page, changed = entry[1], False
+        else:
+            r.raise_for_status()
+            page, changed = r.json(), True
+            if r.headers.get('ETag'):
+                cache.put(url, r.headers['ETag'], page)
+        yield offset, page['movies'], changed
+        offset += len(page['movies'])
+        after = page.get('next_after')
+
+
+# ================================
+# HILO DE TRABAJO
+# ================================
+class Worker(threading.Thread):
+    """
+    Ejecuta trabajos job(emit) de uno en uno fuera del hilo de Tk. emit(fn, *args)
+    deja fn(*args) en la cola; la ventana lo ejecuta en su propio hilo (drain).
+    """
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+
+    def submit(self, job):
+        self.jobs.put(job)
+
+    def emit(self, fn, *args):
+        self.results.put((fn, args))
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                job(self.emit)
+            except Exception as e:      # un trabajo roto no puede matar el hilo
+                self.emit(messagebox.showerror, 'Error', str(e))
+
+    def drain(self):
+        while True:
+            try:
+                fn, args = self.results.get_nowait()
+            except queue.Empty:
+                return
+            fn(*args)
 
 
+# ================================
+# LISTA VIRTUAL
+# ================================
+class VirtualList(tk.Frame):
+    """
+    Lista sobre un Canvas que solo dibuja las filas visibles: con 100.000
+    películas hay tantos items de Tk como filas caben en la ventana. Las
+    filas son datos (dicts); el texto se genera al dibujarlas con `format_row`.
+    """
+
+    def __init__(self, master, format_row, **kwargs):
+        super().__init__(master, **kwargs)
+        self.format_row = format_row
+        self.rows = []
+        self.first = 0          # índice de la primera fila visible
+        self._items = []        # textos del canvas reutilizados entre repintados
+
+        self.canvas = tk.Canvas(self, background='white', highlightthickness=0)
+        self.scrollbar = tk.Scrollbar(self, orient='vertical', command=self._on_scroll)
+        self.scrollbar.pack(side='right', fill='y')
+        self.canvas.pack(side='left', fill='both', expand=True)
+        self.canvas.bind('<Configure>', lambda e: self.redraw())
+        self.canvas.bind('<MouseWheel>', lambda e: self.scroll_rows(-1 if e.delta > 0 else 1, 3))
+        self.canvas.bind('<Button-4>', lambda e: self.scroll_rows(-1, 3))       # rueda en X11
+        self.canvas.bind('<Button-5>', lambda e: self.scroll_rows(1, 3))
+
+    def visible_count(self):
+        return max(1, self.canvas.winfo_height() // ROW_HEIGHT)
+
+    def set_rows(self, rows):
+        self.rows = rows
+        self.redraw()
+
+    def replace_from(self, offset, rows):
+        """Sustituye las filas desde `offset` (página que ha cambiado)."""
+        del self.rows[offset:]
+        self.rows.extend(rows)
+        self.redraw()
+
+    def scroll_rows(self, direction, amount):
+        self._scroll_to(self.first + direction * amount)
+
+    def _on_scroll(self, action, value, unit=None):
+        if action == 'moveto':
+            self._scroll_to(int(float(value) * len(self.rows)))
+        elif action == 'scroll':
+            step = self.visible_count() if unit == 'pages' else 1
+            self.scroll_rows(int(value), step)
+
+    def _scroll_to(self, first):
+        self.first = max(0, min(first, len(self.rows) - self.visible_count()))
+        self.redraw()
+
+    def redraw(self):
+        count = self.visible_count()
+        self.first = max(0, min(self.first, len(self.rows) - count))
+        while len(self._items) < count:
+            y = len(self._items) * ROW_HEIGHT + 2
+            self._items.append(self.canvas.create_text(6, y, anchor='nw', text=''))
+        for i, item in enumerate(self._items):
+            index = self.first + i
+            text = self.format_row(self.rows[index]) if i < count and index < len(self.rows) else ''
+            self.canvas.itemconfigure(item, text=text)
+
+        total = len(self.rows) or 1
+        self.scrollbar.set(self.first / total, min(1.0, (self.first + count) / total))
+
+
+# ================================
+# VENTANA
+# ================================
 class App(tk.Tk):
-def __init__(self):
-super().__init__()
-self.title('TMDB Desktop Client')
-self.geometry('700x500')
-self.create_widgets()
-
-
-def create_widgets(self):
-self.login_btn = tk.Button(self, text='Login', command=self.login)
-self.login_btn.pack(pady=8)
-self.listbox = tk.Listbox(self, width=100)
-self.listbox.pack(fill='both', expand=True)
-
-
-def login(self):
-username = simpledialog.askstring('Usuario', 'Usuario:')
-password = simpledialog.askstring('Contraseña', 'Contraseña:', show='*')
-if not username or not password:
-return
-r = requests.post(API + '/api/login', json={'username':username,'password':password})
-if r.ok and r.json().get('ok'):
-messagebox.showinfo('OK','Login correcto')
-self.load_movies()
-else:
-messagebox.showerror('Error','Login fallido')
-
-
-def load_movies(self):
-r = requests.get(API + '/api/movies')
-if r.ok:
-self.listbox.delete(0, tk.END)
-for m in r.json():
-self.listbox.insert(tk.END, f"{m['id']} - {m['title']} ({m.get('release_date')})")
-else:
-messagebox.showerror('Error','No se pudieron obtener películas')
+    def __init__(self):
+        super().__init__()
+        self.title('TMDB Desktop Client')
+        self.geometry('700x500')
+        self.session = requests.Session()
+        self.cache = ResponseCache()
+        self.worker = Worker()
+        self.worker.start()
+        self.create_widgets()
+        self.after(POLL_MS, self.poll)
+
+    def create_widgets(self):
+        bar = tk.Frame(self)
+        bar.pack(fill='x', pady=8)
+        self.login_btn = tk.Button(bar, text='Login', command=self.login)
+        self.login_btn.pack(side='left', padx=8)
+        self.reload_btn = tk.Button(bar, text='Recargar', command=self.load_movies)
+        self.reload_btn.pack(side='left')
+        self.status = tk.Label(bar, anchor='w')
+        self.status.pack(side='left', fill='x', expand=True, padx=8)
+        self.movie_list = VirtualList(self, format_row=lambda m: f"{m['id']} - {m['title']} ({m.get('release_date')})")
+        self.movie_list.pack(fill='both', expand=True)
+
+    def poll(self):
+        self.worker.drain()
+        self.after(POLL_MS, self.poll)
+
+    def login(self):
+        username = simpledialog.askstring('Usuario', 'Usuario:')
+        password = simpledialog.askstring('Contraseña', 'Contraseña:', show='*')
+        if not username or not password:
+            return
+
+        def job(emit):
+            r = self.session.post(API + '/api/login', json={'username': username, 'password': password},
+                                  timeout=TIMEOUT)
+            emit(self.on_login, r.ok and r.json().get('ok'))
+
+        self.set_status('Entrando…')
+        self.worker.submit(job)
+
+    def on_login(self, ok):
+        if ok:
+            messagebox.showinfo('OK', 'Login correcto')
+            self.load_movies()
+        else:
+            self.set_status('')
+            messagebox.showerror('Error', 'Login fallido')
+
+    def set_status(self, text):
+        self.status.config(text=text)
+
+    def load_movies(self):
+        def job(emit):
+            # Lo que haya en disco se pinta antes de tocar la red
+            cached = [m for page in cached_pages(self.cache) for m in page]
+            if cached:
+                emit(self.movie_list.set_rows, cached)
+                emit(self.set_status, f'{len(cached)} películas (caché), revalidando…')
+            try:
+                total, dirty = 0, False
+                for offset, movies, changed in fetch_pages(self.session, self.cache):
+                    # Desde la primera página distinta se repinta todo lo que sigue
+                    dirty = dirty or changed
+                    if dirty:
+                        emit(self.movie_list.replace_from, offset, movies)
+                    total = offset + len(movies)
+                emit(self.movie_list.replace_from, total, [])     # el catálogo pudo encoger
+                emit(self.set_status, f'{total} películas')
+            except requests.RequestException:
+                emit(self.set_status, 'Sin conexión: mostrando la caché' if cached else '')
+                if not cached:
+                    emit(messagebox.showerror, 'Error', 'No se pudieron obtener películas')
 
+        self.set_status('Cargando…')
+        self.worker.submit(job)
 
 if __name__ == '__main__':
-app = App()
-app.mainloop()
\ No newline at end of file
+    app = App()
+    app.mainloop()
@@ -0,0 +1,734 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from resilience import CircuitBreaker, TokenBucket, UpstreamUnavailable, retry_after_seconds, retry_delay
+
+# ---------------------------
+# CONFIG
+# ---------------------------
+TMDB_API_KEY = "41d18781051e38c1a3a35fa10bfbc9b2"
+TMDB_BASE_URL = "https://api.themoviedb.org/3"
+TMDB_IMAGE_URL = "https://image.tmdb.org/t/p"
+DEFAULT_LANGUAGE = "es-ES"
+
+CACHE_MAXSIZE = 1024      # entradas
+CACHE_TTL = 600           # segundos
+STALE_TTL = 24 * 3600     # segundos que una entrada caducada aún puede servirse si TMDB falla
+POOL_SIZE = 20            # conexiones keep-alive por host
+TITLE_WORKERS = 8         # peticiones paralelas al resolver títulos
+PREFETCH_WORKERS = 4      # hilos dedicados a precargar páginas
+PREFETCH_MAX_INFLIGHT = 8 # precargas simultáneas como máximo (el resto se descarta)
+DETAIL_APPEND = "videos,similar"    # lo que necesita la página de una película
+
+# Peticiones simultáneas a TMDB desde los handlers async
+ASYNC_CONCURRENCY = int(os.environ.get("CINE_TMDB_CONCURRENCY", "64"))
+
+# Resiliencia frente a TMDB (límite de su API: ~50 peticiones/s por IP)
+RATE_LIMIT = float(os.environ.get("CINE_TMDB_RATE", "40"))   # peticiones/s
+RATE_BURST = 20
+RATE_MAX_WAIT = 1.0       # segundos de cola en el limitador antes de rendirse
+CONNECT_TIMEOUT = 3.05    # segundos
+READ_TIMEOUT = 6
+RETRIES = 2               # reintentos tras el primer intento
+RETRY_STATUS = {429, 500, 502, 503, 504}
+BREAKER_THRESHOLD = 5     # fallos seguidos que abren el circuito
+BREAKER_RESET = 30        # segundos abierto antes de probar otra vez
+BREAKER_TRIAL_TIMEOUT = CONNECT_TIMEOUT + READ_TIMEOUT     # prueba sin resultado: se permite otra
+
+
+# ================================
+# TTL + LRU CACHE
+# ================================
+class TTLCache:
+    """
+    Cache acotada: expulsa la entrada menos usada al llenarse. Pasado el
+    TTL get() ya no la devuelve, pero se conserva `stale_ttl` segundos más
+    para get_stale() (servirla caducada si TMDB no responde).
+    """
+
+    def __init__(self, maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL, stale_ttl=STALE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale_hits = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                if expires + self.stale_ttl <= time.monotonic():
+                    del self._data[key]
+            self.misses += 1
+            return None
+
+    def get_stale(self, key):
+        """Valor aunque haya caducado (dentro de stale_ttl), o None."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] + self.stale_ttl <= time.monotonic():
+                return None
+            self.stale_hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def peek(self, key):
+        """Como get(), pero sin tocar contadores ni orden LRU."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                return None
+            return entry[1]
+
+    def __contains__(self, key):
+        return self.peek(key) is not None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "stale_hits": self.stale_hits,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# ================================
+# SINGLE-FLIGHT
+# ================================
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Agrupa llamadas idénticas concurrentes: el primero ejecuta fn() y el resto
+    espera y comparte su resultado (o su excepción). Con la cache fría, N
+    peticiones iguales a la vez hacen una sola llamada a TMDB.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {"leaders": 0, "shared": 0}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats["leaders"] += 1
+            else:
+                self.stats["shared"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def inflight(self, key):
+        with self._lock:
+            return key in self._calls
+
+
+def pick_trailer(videos):
+    """Clave de YouTube del primer tráiler de una respuesta /videos, o None."""
+    for v in (videos or {}).get("results", []):
+        if v.get("type") == "Trailer" and v.get("site") == "YouTube":
+            return v["key"]
+    return None
+
+
+def _is_client_error(error):
+    # 4xx (p. ej. 404): TMDB respondió bien, la versión caducada no aplica
+    response = getattr(error, "response", None)
+    return response is not None and 400 <= response.status_code < 500 and response.status_code != 429
+
+
+def cache_key(endpoint, params):
+    # api_key no forma parte de la identidad de la respuesta
+    return endpoint, tuple(sorted((k, str(v)) for k, v in params.items() if k != "api_key"))
+
+
+# ================================
+# TMDB CLIENT
+# ================================
+class TMDBClient:
+
+    def __init__(self, api_key=TMDB_API_KEY, base_url=TMDB_BASE_URL,
+                 cache=None, pool_size=POOL_SIZE, limiter=None, breaker=None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.cache = cache if cache is not None else TTLCache()
+
+        # Cuota de TMDB y estado de salud, compartidos con el cliente async
+        self.limiter = limiter or TokenBucket(RATE_LIMIT, RATE_BURST, RATE_MAX_WAIT)
+        self.breaker = breaker or CircuitBreaker(BREAKER_THRESHOLD, BREAKER_RESET, BREAKER_TRIAL_TIMEOUT)
+        self.upstream_stats = {"retries": 0, "stale_served": 0, "revalidations": 0}
+
+        # Una sola Session reutiliza conexiones TLS entre peticiones
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # Peticiones iguales en curso se comparten (ver SingleFlight)
+        self._flight = SingleFlight()
+
+        # Precarga en segundo plano (ver prefetch)
+        self._prefetch_pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS,
+                                                 thread_name_prefix="tmdb-prefetch")
+        self._prefetch_lock = threading.Lock()
+        self._prefetch_inflight = set()
+        # Claves precargadas que aún nadie ha leído. LRU del tamaño de la cache:
+        # las que no se leen acaban expulsadas o caducadas y no pueden acumularse
+        self._prefetched = OrderedDict()
+        self.prefetch_stats = {
+            "scheduled": 0,
+            "completed": 0,
+            "failed": 0,
+            "skipped_cached": 0,
+            "skipped_duplicate": 0,
+            "dropped_cap": 0,
+            "hits": 0,
+        }
+
+    def _send(self, url, params):
+        """
+        Un GET con timeout, pasando por el limitador y el circuito. Los fallos
+        de red, 429 y 5xx se reintentan (RETRIES veces, con jitter) y cuentan
+        para abrir el circuito; un 4xx es una respuesta válida y no se repite.
+        """
+        for attempt in range(RETRIES + 1):
+            # Primero el token: si el limitador se rinde no queda ocupada la prueba del circuito
+            self.limiter.acquire()
+            if not self.breaker.allow():
+                raise UpstreamUnavailable("TMDB no disponible (circuito abierto)")
+
+            ok, error, retry_after = None, None, None
+            try:
+                with metrics.timed("upstream"):
+                    r = self.session.get(url, params=params, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+                ok = r.status_code not in RETRY_STATUS
+            except requests.RequestException as e:
+                ok, error = False, e
+            finally:
+                self.breaker.record(ok)     # None: interrumpida, libera la prueba
+
+            if ok:
+                r.raise_for_status()
+                return r
+            if error is None:
+                error = requests.HTTPError(f"{r.status_code} de TMDB", response=r)
+                retry_after = retry_after_seconds(r.headers.get("Retry-After"))
+
+            delay = retry_delay(attempt, retry_after)
+            if attempt == RETRIES or delay is None:
+                raise error
+            self.upstream_stats["retries"] += 1
+            time.sleep(delay)
+
+    def _fetch(self, endpoint, params):
+        return self._send(f"{self.base_url}{endpoint}", {"api_key": self.api_key, **params}).json()
+
+    def get(self, endpoint, **params):
+        """
+        GET a TMDB con cache. Lanza requests.HTTPError si TMDB no responde 2xx
+        (los errores no se guardan en cache).
+
+        Si la entrada ha caducado pero TMDB va mal (circuito no cerrado) se
+        sirve la versión caducada y se refresca en segundo plano; si la
+        petición falla y hay versión caducada, también se sirve esa.
+        """
+        key = cache_key(endpoint, params)
+        data = self.cache.get(key)
+        if data is not None:
+            if self._prefetched:
+                self._note_prefetch_hit(key)
+            return data
+
+        stale = self.cache.get_stale(key)
+        if stale is not None and not self.breaker.healthy:
+            self._revalidate(key, endpoint, params)
+            return self._serve_stale(stale)
+
+        try:
+            return self._flight.do(key, lambda: self._fetch_and_store(key, endpoint, params))
+        except requests.RequestException as e:
+            if stale is None or _is_client_error(e):
+                raise
+            return self._serve_stale(stale)
+
+    def _serve_stale(self, data):
+        self.upstream_stats["stale_served"] += 1
+        return data
+
+    def _revalidate(self, key, endpoint, params):
+        with self._prefetch_lock:
+            if key in self._prefetch_inflight:
+                return
+            self._prefetch_inflight.add(key)
+            self.upstream_stats["revalidations"] += 1
+        self._prefetch_pool.submit(self._run_revalidate, key, endpoint, params)
+
+    def _run_revalidate(self, key, endpoint, params):
+        try:
+            self._flight.do(key, lambda: self._fetch_and_store(key, endpoint, params))
+        except requests.RequestException:
+            pass
+        finally:
+            with self._prefetch_lock:
+                self._prefetch_inflight.discard(key)
+
+    def _fetch_and_store(self, key, endpoint, params):
+        # Otro hilo pudo llenar la cache justo antes de tomar el turno (get()
+        # ya contó el fallo: esta consulta no cuenta)
+        data = self.cache.peek(key)
+        if data is not None:
+            return data
+        data = self._fetch(endpoint, params)
+        self.cache.set(key, data)
+        return data
+
+    # ---------------------------
+    # PREFETCH
+    # ---------------------------
+    def _note_prefetch_hit(self, key):
+        with self._prefetch_lock:
+            if key in self._prefetched:
+                del self._prefetched[key]
+                self.prefetch_stats["hits"] += 1
+
+    def _claim_prefetch(self, key, running=False):
+        """
+        Reserva `key` para precargarla (también la usa AsyncTMDBClient.prefetch).
+        `running`: ya hay una descarga de esa clave en curso fuera de la precarga.
+        """
+        with self._prefetch_lock:
+            stats = self.prefetch_stats
+            if running or key in self._prefetch_inflight:
+                stats["skipped_duplicate"] += 1
+                return False
+            if key in self.cache:
+                stats["skipped_cached"] += 1
+                return False
+            if len(self._prefetch_inflight) >= PREFETCH_MAX_INFLIGHT:
+                stats["dropped_cap"] += 1
+                return False
+            self._prefetch_inflight.add(key)
+            stats["scheduled"] += 1
+            return True
+
+    def _finish_prefetch(self, key, ok):
+        """ok: True, False o None (cancelada: no cuenta)."""
+        with self._prefetch_lock:
+            if ok:
+                self._prefetched[key] = None
+                self._prefetched.move_to_end(key)
+                if len(self._prefetched) > self.cache.maxsize:
+                    self._prefetched.popitem(last=False)
+                self.prefetch_stats["completed"] += 1
+            elif ok is not None:
+                self.prefetch_stats["failed"] += 1
+            self._prefetch_inflight.discard(key)
+
+    def _run_prefetch(self, key, endpoint, params):
+        ok = None
+        try:
+            # Pasa por el single-flight: una petición que llegue mientras tanto se une
+            self._flight.do(key, lambda: self._fetch_and_store(key, endpoint, params))
+            ok = True
+        except requests.RequestException:
+            ok = False
+        finally:
+            self._finish_prefetch(key, ok)
+
+    def prefetch(self, endpoint, **params):
+        """
+        Programa la descarga de una respuesta en la cache sin bloquear.
+        Se ignora si ya está en cache o en curso, y se descarta si hay
+        PREFETCH_MAX_INFLIGHT precargas pendientes.
+        """
+        key = cache_key(endpoint, params)
+        if not self._claim_prefetch(key):
+            return False
+        self._prefetch_pool.submit(self._run_prefetch, key, endpoint, params)
+        return True
+
+    def discover(self, page=1, language=DEFAULT_LANGUAGE):
+        return self.get("/discover/movie", language=language, page=page)
+
+    def search(self, query, page=1, language=DEFAULT_LANGUAGE):
+        return self.get("/search/movie", language=language, page=page, query=query)
+
+    def prefetch_page(self, page, query="", language=DEFAULT_LANGUAGE):
+        if query:
+            return self.prefetch("/search/movie", language=language, page=page, query=query)
+        return self.prefetch("/discover/movie", language=language, page=page)
+
+    def movie(self, movie_id, language=DEFAULT_LANGUAGE):
+        return self.get(f"/movie/{movie_id}", language=language)
+
+    def videos(self, movie_id, language=DEFAULT_LANGUAGE):
+        return self.get(f"/movie/{movie_id}/videos", language=language)
+
+    def movie_details(self, movie_id, language=DEFAULT_LANGUAGE):
+        """
+        Detalle + vídeos + similares en una sola petición (append_to_response),
+        cacheado como una única entrada. Añade "trailer_key" (o None).
+        """
+        data = self.get(f"/movie/{movie_id}", language=language, append_to_response=DETAIL_APPEND)
+        if "trailer_key" not in data:
+            # Se calcula una vez: el dict cacheado se comparte entre peticiones
+            data["trailer_key"] = pick_trailer(data.get("videos"))
+        return data
+
+    def movies(self, movie_ids, language=DEFAULT_LANGUAGE, max_workers=TITLE_WORKERS):
+        """
+        Detalle de varias películas en paralelo (máx. max_workers a la vez).
+        Cada id se pide una sola vez, y si otra petición ya lo está pidiendo se
+        comparte (single-flight). Los que fallan quedan en None.
+        """
+        ids = list(dict.fromkeys(movie_ids))
+        if not ids:
+            return {}
+
+        def fetch(mid):
+            try:
+                return mid, self.movie(mid, language)
+            except requests.RequestException:
+                return mid, None
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(ids))) as pool:
+            # Cada tarea hereda el contexto de la petición (métricas de upstream)
+            futures = [pool.submit(contextvars.copy_context().run, fetch, mid) for mid in ids]
+            return dict(f.result() for f in futures)
+
+    def titles(self, movie_ids, language=DEFAULT_LANGUAGE, max_workers=TITLE_WORKERS):
+        """Títulos en paralelo; los que fallan quedan en None."""
+        movies = self.movies(movie_ids, language, max_workers)
+        return {mid: m.get("title") if m else None for mid, m in movies.items()}
+
+    def cached_poster_paths(self, movie_ids, language=DEFAULT_LANGUAGE):
+        """
+        poster_path de las películas cuya ficha (movie o movie_details) ya está
+        en la cache. No llama a TMDB ni cuenta como consulta.
+        """
+        found = {}
+        for mid in movie_ids:
+            for params in ({"language": language}, {"language": language, "append_to_response": DETAIL_APPEND}):
+                data = self.cache.peek(cache_key(f"/movie/{mid}", params))
+                if data and data.get("poster_path"):
+                    found[mid] = data["poster_path"]
+                    break
+        return found
+
+    def stats(self):
+        with self._prefetch_lock:
+            prefetch = dict(self.prefetch_stats, inflight=len(self._prefetch_inflight))
+        done = prefetch["completed"]
+        prefetch["hit_ratio"] = round(prefetch["hits"] / done, 4) if done else 0.0
+        return {**self.cache.stats(), "prefetch": prefetch, "single_flight": dict(self._flight.stats),
+                "upstream": {**self.upstream_stats, "breaker": self.breaker.snapshot(),
+                             "limiter": dict(self.limiter.stats)}}
+
+
+# ================================
+# ASYNC TMDB CLIENT
+# ================================
+class AsyncTMDBClient:
+    """
+    Versión no bloqueante para los handlers async (httpx.AsyncClient).
+    Comparte cache, api_key y base_url con el cliente síncrono, y lanza las
+    mismas excepciones (requests.HTTPError / RequestException).
+
+    Como máximo `max_concurrency` peticiones a TMDB a la vez; las peticiones
+    iguales en curso se comparten (single-flight con tareas de asyncio).
+    Limitador, circuito y reintentos son los del cliente síncrono.
+    """
+
+    def __init__(self, sync_client, max_concurrency=ASYNC_CONCURRENCY, transport=None):
+        self.sync = sync_client
+        self.cache = sync_client.cache
+        self.max_concurrency = max_concurrency
+        self.transport = transport
+        self.image_url = TMDB_IMAGE_URL
+        self._loop = None
+        self._closers = set()       # una tarea por loop que cierra su cliente al acabar
+
+    def _bind_loop(self):
+        # httpx.AsyncClient, Semaphore y tareas pertenecen a un event loop:
+        # se crean de nuevo si cambia (p. ej. TestClient usa uno por petición)
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._client = httpx.AsyncClient(
+                transport=self.transport,
+                timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+                limits=httpx.Limits(max_connections=self.max_concurrency,
+                                    max_keepalive_connections=POOL_SIZE),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._inflight = {}
+            self._background = set()
+            closer = loop.create_task(self._close_with_loop(self._client))
+            self._closers.add(closer)
+            closer.add_done_callback(self._closers.discard)
+
+    @staticmethod
+    async def _close_with_loop(client):
+        # Al terminar, asyncio.run (y uvicorn, y el portal de TestClient)
+        # cancela las tareas pendientes: es el último momento en que el loop
+        # puede cerrar las conexiones del cliente; después ya no se puede
+        try:
+            await asyncio.Future()
+        finally:
+            await client.aclose()
+
+    async def _attempt(self, url, params):
+        async with self._semaphore:
+            with metrics.timed("upstream"):
+                try:
+                    return await self._client.get(url, params=params)
+                except httpx.TimeoutException as e:
+                    raise requests.Timeout(str(e)) from e
+                except httpx.RequestError as e:
+                    raise requests.ConnectionError(str(e)) from e
+
+    async def _request(self, url, params=None, guarded=True):
+        """
+        Como TMDBClient._send. Las imágenes (guarded=False) salen del CDN de
+        TMDB: se reintentan, pero no gastan cuota ni cuentan para el circuito.
+        """
+        breaker = self.sync.breaker
+        for attempt in range(RETRIES + 1):
+            if guarded:
+                await self.sync.limiter.acquire_async()
+                if not breaker.allow():
+                    raise UpstreamUnavailable("TMDB no disponible (circuito abierto)")
+
+            ok, error, retry_after = None, None, None
+            try:
+                r = await self._attempt(url, params)
+                ok = r.status_code not in RETRY_STATUS
+            except requests.RequestException as e:
+                ok, error = False, e
+            finally:
+                if guarded:
+                    breaker.record(ok)      # None: cancelada, libera la prueba
+
+            if ok:
+                try:
+                    r.raise_for_status()
+                except httpx.HTTPStatusError as e:
+                    raise requests.HTTPError(str(e), response=r) from e
+                return r
+            if error is None:
+                error = requests.HTTPError(f"{r.status_code} de TMDB", response=r)
+                retry_after = retry_after_seconds(r.headers.get("Retry-After"))
+
+            delay = retry_delay(attempt, retry_after)
+            if attempt == RETRIES or delay is None:
+                raise error
+            self.sync.upstream_stats["retries"] += 1
+            await asyncio.sleep(delay)
+
+    async def _fetch(self, endpoint, params):
+        r = await self._request(f"{self.sync.base_url}{endpoint}", {"api_key": self.sync.api_key, **params})
+        return r.json()
+
+    async def get(self, endpoint, **params):
+        """Igual que TMDBClient.get (cache, versión caducada si TMDB va mal)."""
+        self._bind_loop()
+        key = cache_key(endpoint, params)
+        data = self.cache.get(key)
+        if data is not None:
+            if self.sync._prefetched:
+                self.sync._note_prefetch_hit(key)
+            return data
+
+        stale = self.cache.get_stale(key)
+        if stale is not None and not self.sync.breaker.healthy:
+            self._revalidate(key, endpoint, params)
+            return self.sync._serve_stale(stale)
+
+        try:
+            return await self._fetch_shared(key, endpoint, params)
+        except requests.RequestException as e:
+            if stale is None or _is_client_error(e):
+                raise
+            return self.sync._serve_stale(stale)
+
+    def _revalidate(self, key, endpoint, params):
+        if key in self._inflight:
+            return
+        self.sync.upstream_stats["revalidations"] += 1
+
+        async def refresh():
+            try:
+                await self._fetch_shared(key, endpoint, params)
+            except requests.RequestException:
+                pass
+
+        self.spawn(refresh())
+
+    async def _fetch_shared(self, key, endpoint, params):
+        """
+        Single-flight: la descarga va en su propia tarea y cada llamada espera
+        una copia protegida (shield). Si quien la lanzó se cancela (cliente
+        desconectado), los demás reciben igualmente el resultado.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = self._loop.create_task(self._fetch_and_store(key, endpoint, params))
+            task.add_done_callback(lambda t: self._fetch_done(key, t))
+        return await asyncio.shield(task)
+
+    async def _fetch_and_store(self, key, endpoint, params):
+        data = await self._fetch(endpoint, params)
+        self.cache.set(key, data)
+        return data
+
+    def _fetch_done(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()        # sin esperas pendientes no es un error "no recogido"
+
+    async def _run_prefetch(self, key, endpoint, params):
+        ok = None
+        try:
+            await self._fetch_shared(key, endpoint, params)
+            ok = True
+        except requests.RequestException:
+            ok = False
+        finally:
+            self.sync._finish_prefetch(key, ok)
+
+    def prefetch(self, endpoint, **params):
+        """
+        Como TMDBClient.prefetch, pero la descarga es una tarea del loop que
+        pasa por el mismo single-flight que get(): si el dashboard pide esa
+        página mientras tanto, se une a ella en vez de repetirla. Mismos
+        límites y estadísticas que el cliente síncrono.
+        """
+        self._bind_loop()
+        key = cache_key(endpoint, params)
+        if not self.sync._claim_prefetch(key, running=key in self._inflight):
+            return False
+        self.spawn(self._run_prefetch(key, endpoint, params))
+        return True
+
+    def spawn(self, coro):
+        """
+        Lanza `coro` en segundo plano sin esperarla. Corre fuera de la petición
+        que la lanza: su tiempo y sus llamadas a TMDB no cuentan en la ruta.
+        """
+        self._bind_loop()
+        task = self._loop.create_task(coro, context=metrics.detached_context())
+        self._background.add(task)      # referencia fuerte hasta que termine
+        task.add_done_callback(self._background.discard)
+        return task
+
+    async def discover(self, page=1, language=DEFAULT_LANGUAGE):
+        return await self.get("/discover/movie", language=language, page=page)
+
+    async def search(self, query, page=1, language=DEFAULT_LANGUAGE):
+        return await self.get("/search/movie", language=language, page=page, query=query)
+
+    def prefetch_page(self, page, query="", language=DEFAULT_LANGUAGE):
+        if query:
+            return self.prefetch("/search/movie", language=language, page=page, query=query)
+        return self.prefetch("/discover/movie", language=language, page=page)
+
+    def prefetch_movie(self, movie_id, language=DEFAULT_LANGUAGE):
+        return self.prefetch(f"/movie/{movie_id}", language=language)
+
+    async def movie(self, movie_id, language=DEFAULT_LANGUAGE):
+        return await self.get(f"/movie/{movie_id}", language=language)
+
+    async def movie_details(self, movie_id, language=DEFAULT_LANGUAGE):
+        """Igual que TMDBClient.movie_details (misma entrada de cache)."""
+        data = await self.get(f"/movie/{movie_id}", language=language, append_to_response=DETAIL_APPEND)
+        if "trailer_key" not in data:
+            data["trailer_key"] = pick_trailer(data.get("videos"))
+        return data
+
+    async def image(self, size, path):
+        """Bytes de una imagen de TMDB (p. ej. "w300", "abc.jpg"); sin cache, la guarda posters.py."""
+        self._bind_loop()
+        r = await self._request(f"{self.image_url}/{size}/{path}", guarded=False)
+        return r.content
+
+    async def movies(self, movie_ids, language=DEFAULT_LANGUAGE):
+        """Varias películas a la vez (acotadas por el semáforo); las que fallan quedan en None."""
+        ids = list(dict.fromkeys(movie_ids))
+
+        async def fetch(mid):
+            try:
+                return mid, await self.movie(mid, language)
+            except requests.RequestException:
+                return mid, None
+
+        return dict(await asyncio.gather(*(fetch(mid) for mid in ids)))
+
+
+# Instancias compartidas por app.py y api.py
+tmdb = TMDBClient()
+atmdb = AsyncTMDBClient(tmdb)